@@ -7,9 +7,10 @@ class parse_args():
     - Creates Arguments Parser object
     - Creates a dictory with the folder name specified by --folder argument
     - Creates a json file with the same name as the folder and stores the arguments as
+    - argv: arguments to parse instead of the command line (used by the batch runner, see script.py)
     """
     
-    def __init__(self):
+    def __init__(self,argv=None):
         argParser = argparse.ArgumentParser(description='arguments')
         argParser.add_argument('--feeder', default='123Bus', type=str, 
                                help='name of the feeder system')
@@ -33,7 +34,75 @@ class parse_args():
                                help='if the load value is to be changed, the lower end of the uniform distribution from which load value will be sampled')
         argParser.add_argument('--load-value-KW-upper-end', default=80.00, type=float,
                                help='if the load value is to be changed, the upper end of the uniform distribution from which load value will be sampled')
-        self.args = argParser.parse_args()
+        argParser.add_argument('--sampling', choices=["random", "lhs", "sobol", "halton"], default='random', type=str,
+                               help='how the variable fault resistances and the load values are sampled from their ranges: random: uniform draws, lhs: Latin hypercube (one sample in each of the equal strata of the range), sobol/halton: scrambled low-discrepancy sequences')
+        argParser.add_argument('--joint-sampling', choices=["no", "yes"], default='no', type=str,
+                               help='with --fault-resistance-type variable, yes: sample a (fault resistance, load value) pair for each sample of a node from a two-dimensional design, the loads are set to the load value before the fault is solved')
+        argParser.add_argument('--backend', choices=["py_dss_interface", "dss_python"], default='py_dss_interface', type=str,
+                               help='binding used to run OpenDSS: py_dss_interface (DSSDLL) or dss_python (in-process DSS-Python engine, also used by OpenDSSDirect.py, with numpy array results)')
+        argParser.add_argument('--feeder-cache', choices=["yes", "no"], default='yes', type=str,
+                               help='whether to load the feeder information from the feeder cache (it is computed and cached when a .dss file of the feeder changes)')
+        argParser.add_argument('--load-sampling', choices=["same", "per-load"], default='same', type=str,
+                               help='load values of a non-fault event: same: the sampled load value for all the loads, per-load: a value drawn from the sampled load values for each load')
+        argParser.add_argument('--feature-channels', choices=["sequence_voltages", "branch_currents", "branch_powers"], default=[], nargs='*', type=str,
+                               help='extra channels added to the 6 voltage channels of each bus: sequence_voltages: zero, positive and negative sequence voltage magnitudes (three-phase buses), branch_currents: current of each phase flowing into the bus through its feeding branches, branch_powers: active and reactive power flowing into the bus')
+        argParser.add_argument('--solve-cache', choices=["yes", "no"], default='yes', type=str,
+                               help='whether to copy the sample of a scenario identical to the last solved one (e.g. the repeats of a fixed fault resistance) instead of solving it again')
+        argParser.add_argument('--fault-sweep', choices=["no", "yes", "validate"], default='no', type=str,
+                               help='yes: compute the samples of all the fault resistances of a fault location from a few probe solves instead of solving each of them, validate: solve each sample and check it against the sweep')
+        argParser.add_argument('--fault-sweep-tolerance', default=1e-6, type=float,
+                               help='with --fault-sweep validate, largest accepted difference of the features (and relative difference of the fault current) between the sweep and the full solves')
+        argParser.add_argument('--standardization', choices=["in-place", "lazy"], default='in-place', type=str,
+                               help='in-place: dataset.npy is standardized, lazy: dataset.npy keeps the raw features and is standardized with standardization_stats.npz when it is loaded')
+        argParser.add_argument('--profile', action='store_true',
+                               help='record the time and number of calls of the stages of the run (compile, solves, feature extraction, ...) and write performance_report.json to --folder')
+        argParser.add_argument('--profile-interval', default=0, type=float,
+                               help='with --profile, number of seconds between two live summaries printed during the run (0 disables them)')
+        argParser.add_argument('--output-mode',choices=["memory", "memmap"], default='memory', type=str,
+                               help='keep the dataset and labels in memory until the export, or write every sample straight to memory-mapped .npy files in the dataset folder')
+        argParser.add_argument('--dataset-format',choices=["npy", "sharded"], default='npy', type=str,
+                               help='npy: dataset.npy and one .npy file per label, sharded: shards of --shard-size samples with a manifest.json (shapes, types, class counts and checksums of the shards)')
+        argParser.add_argument('--shard-size', default=1024, type=int,
+                               help='with --dataset-format sharded, number of samples in each shard')
+        argParser.add_argument('--k-hops', default=2, type=int,
+                               help='largest number of hops of the neighborhoods stored in topology.npz (CSR index arrays of the buses within 1 to k hops of each bus)')
+        argParser.add_argument('--feature-dtype',choices=["float64", "float32", "float16"], default='float64', type=str,
+                               help='type the features are stored with, the error of the conversion is printed and recorded with the dataset')
+        argParser.add_argument('--compact-labels',choices=["yes", "no"], default='no', type=str,
+                               help='whether to store the fault detection, class and location labels with the smallest integer type holding their values (int8/int16)')
+        argParser.add_argument('--compression',choices=["yes", "no"], default='no', type=str,
+                               help='with --dataset-format sharded, whether to compress the shards')
+        argParser.add_argument('--checkpoint-every', default=0, type=int,
+                               help='number of samples simulated between two checkpoints of the completed scenarios (0 disables checkpointing), the dataset is then written in memmap output mode')
+        argParser.add_argument('--resume', action='store_true',
+                               help='resume an interrupted checkpointed run from the checkpoint in the dataset folder')
+        argParser.add_argument('--append', action='store_true',
+                               help='add the scenarios of this run missing from the dataset in --folder to it instead of overwriting it (the dataset must be generated with --standardization lazy)')
+        argParser.add_argument('--seed', default=None, type=int,
+                               help='seed of the random number generators used to sample the fault resistances and load values')
+        argParser.add_argument('--workers', default=1, type=int,
+                               help='number of worker processes for the fault simulation, each worker compiles its own copy of the feeder (1 runs the simulation serially)')
+        argParser.add_argument('--queue-dir', default=None, type=str,
+                               help='directory on a shared filesystem to write the work units of the run to, the units are simulated by workers started with job_queue.py on any machine and merged by this run')
+        argParser.add_argument('--queue-unit-size', default=1000, type=int,
+                               help='with --queue-dir, number of samples in each work unit')
+        argParser.add_argument('--queue-local-workers', default=0, type=int,
+                               help='with --queue-dir, number of workers to start on this machine')
+        argParser.add_argument('--queue-stale-seconds', default=600, type=float,
+                               help='with --queue-dir, number of seconds without a heartbeat after which a claimed work unit is given to another worker')
+        argParser.add_argument('--queue-poll-interval', default=5, type=float,
+                               help='with --queue-dir, number of seconds between two checks of the queue')
+        self.args = argParser.parse_args(argv)
+        if self.args.compression=='yes' and self.args.dataset_format!='sharded':
+            argParser.error('--compression yes requires --dataset-format sharded')
+        if self.args.joint_sampling=='yes' and self.args.fault_resistance_type!='variable':
+            argParser.error('--joint-sampling yes requires --fault-resistance-type variable')
+        if self.args.append and (self.args.checkpoint_every>0 or self.args.resume):
+            argParser.error('--append cannot be combined with --checkpoint-every or --resume')
+        if self.args.queue_dir is not None:
+            if self.args.checkpoint_every>0 or self.args.resume:
+                argParser.error('--queue-dir cannot be combined with --checkpoint-every or --resume (rerun with the same --queue-dir to resume)')
+            self.args.queue_dir=os.path.abspath(self.args.queue_dir)                                                  # Compiling the feeder changes the working directory
     
     def get_args(self):
         return self.args
@@ -0,0 +1,294 @@
+#Imports
+# Python Imports
+import os
+import argparse
+import json
+import subprocess
+import tempfile
+import time
+
+# Additional Library Imports
+import numpy as np
+
+# Local Imports
+from opendss_utils import DSS_BACKENDS, compile_feeder, exclude_buses, get_connectivity_info
+from fault_simulation import FaultSimulation
+from main_dataset_generation import FaultInformation, generate_feeder_infos
+from scenarios import FAULT_TYPES
+from utils import dataset_export
+from fake_dss import FakeDSS
+
+# Main file of each bundled feeder system
+BUNDLED_FEEDERS={'13Bus':'IEEE13Nodeckt.dss',
+                 '34Bus':'Run_IEEE34Mod1.dss',
+                 '37Bus':'ieee37.dss',
+                 '123Bus':'IEEE123Master.dss',
+                 '8500-Node':'Run_8500Node.dss'}
+
+
+def get_bench_args():
+    argParser = argparse.ArgumentParser(description='benchmark of the fault simulation')
+    argParser.add_argument('--benchmark', default='fault_pool', type=str, choices=['fault_pool','connectivity','suite','backend'],
+                           help='fault_pool: solves per second of the fault simulation, connectivity: time of get_connectivity_info on every bundled feeder, '
+                                'suite: time of each stage of the dataset generation pipeline on the feeders of --suite-feeders, '
+                                'backend: solves per second of the fault simulation with each OpenDSS backend of --backends')
+    argParser.add_argument('--feeder', default='123Bus', type=str,
+                           help='name of the feeder system')
+    argParser.add_argument('--feeder-file', default='IEEE123Master.dss', type=str,
+                           help='main file of the feeder system')
+    argParser.add_argument('--num-samples', default=20000, type=int,
+                           help='number of LG fault solves performed in each mode')
+    argParser.add_argument('--window', default=1000, type=int,
+                           help='number of solves over which the solves per second are reported')
+    argParser.add_argument('--max-pairwise-buses', default=3000, type=int,
+                           help='largest number of buses for which the pairwise connectivity extraction is timed (it needs hours on 8500-Node)')
+    argParser.add_argument('--suite-feeders', default=['13Bus','34Bus','37Bus','123Bus','fake'], nargs='+', type=str,
+                           help='feeders of the benchmark suite, fake is a synthetic feeder simulated by FakeDSS (no OpenDSS library needed)')
+    argParser.add_argument('--fake-buses', default=10000, type=int,
+                           help='number of buses of the synthetic feeder')
+    argParser.add_argument('--max-scenarios', default=100, type=int,
+                           help='number of scenarios of each fault type (and of non-fault events) simulated by the benchmark suite')
+    argParser.add_argument('--feature-repeats', default=100, type=int,
+                           help='number of feature extractions timed by the benchmark suite')
+    argParser.add_argument('--backends', default=DSS_BACKENDS, nargs='+', type=str, choices=DSS_BACKENDS,
+                           help='OpenDSS backends compared by the backend benchmark (the first one is the reference of the dataset check)')
+    argParser.add_argument('--report', default='benchmark_report.json', type=str,
+                           help='JSON file the results of the benchmark suite are written to')
+    return argParser.parse_args()
+
+
+def benchmark_fault_pool(args):
+    """Compare the solves per second of LG fault simulations over a long run
+        - new_fault: a new Fault element is created (and then disabled) for every sample, so the circuit grows with the number of samples
+        - fault_pool: the pooled Fault element of FaultSimulation is re-targeted for every sample
+       Returns the solves per second of each window of args.window samples for both modes
+    """
+    results={}
+    for mode in ['new_fault','fault_pool']:
+        # Start each mode from a freshly compiled circuit
+        dss,_=compile_feeder(args.feeder,args.feeder_file)
+        fault_simulator=FaultSimulation(dss,feeder=None,fault_information=None)
+
+        # Three-phase bus nodes of the feeder (same nodes as the LG scenarios)
+        fault_nodes=[]
+        for bus in dss.circuit_all_bus_names():
+            dss.circuit_set_active_bus(bus)
+            if len(dss.bus_nodes())==3:
+                fault_nodes.extend(f'{bus}.{node}' for node in dss.bus_nodes())
+
+        solves_per_second=[]
+        start=time.perf_counter()
+        for sample in range(args.num_samples):
+            fault_node=fault_nodes[sample%len(fault_nodes)]
+            if mode=='new_fault':
+                dss.text(f'New Fault.bench_{sample} Bus1={fault_node} Phases=1 r=1')
+                dss.text(f'Solve mode=direct')
+                dss.text(f'Fault.bench_{sample}.enabled=NO')
+            else:
+                fault_simulator.set_fault('LG',f'Bus1={fault_node} Phases=1 r=1')
+                dss.text(f'Solve mode=direct')
+
+            if (sample+1)%args.window==0:
+                solves_per_second.append(args.window/(time.perf_counter()-start))
+                start=time.perf_counter()
+        fault_simulator.release_fault_pool()
+        results[mode]=solves_per_second
+    return results
+
+
+def get_connectivity_info_pairwise(dss,bus_list):
+    """Pairwise connectivity extraction (previous implementation of get_connectivity_info)
+       Every bus is compared with every other bus through the power delivery elements connected to them
+    """
+    edge_list_by_bus_name=[]
+    edge_list_by_bus_id=[]
+    bus_id_map=dict(zip(bus_list,range(len(bus_list))))
+
+    for active_bus1 in bus_list:
+        dss.circuit_set_active_bus(active_bus1)
+        pde_bus1=dss.bus_all_pde_active_bus()
+        for active_bus2 in bus_list:
+            dss.circuit_set_active_bus(active_bus2)
+            pde_bus2=dss.bus_all_pde_active_bus()
+            if any(element in pde_bus1 for element in pde_bus2) and active_bus1!=active_bus2:
+                edge_list_by_bus_name.append((active_bus1,active_bus2))
+                edge_list_by_bus_id.append((bus_id_map[active_bus1],bus_id_map[active_bus2]))
+
+    return edge_list_by_bus_id,edge_list_by_bus_name,bus_id_map
+
+
+def benchmark_connectivity(args):
+    """Time get_connectivity_info against the pairwise extraction on every bundled feeder
+       and check that both return the same edge lists and bus id map
+       Returns a dict with the number of buses, the time of each implementation (None if skipped) and the check result
+    """
+    results={}
+    for feeder_name,feeder_file in BUNDLED_FEEDERS.items():
+        dss,_=compile_feeder(feeder_name,feeder_file)
+        _,bus_list=exclude_buses(feeder_name,dss.circuit_all_bus_names())
+
+        start=time.perf_counter()
+        connectivity_info=get_connectivity_info(dss,bus_list)
+        walk_time=time.perf_counter()-start
+
+        pairwise_time=None
+        identical=None
+        if len(bus_list)<=args.max_pairwise_buses:
+            start=time.perf_counter()
+            connectivity_info_pairwise=get_connectivity_info_pairwise(dss,bus_list)
+            pairwise_time=time.perf_counter()-start
+            identical=connectivity_info==connectivity_info_pairwise
+
+        results[feeder_name]={'buses':len(bus_list),'pde_walk':walk_time,'pairwise':pairwise_time,'identical':identical}
+    return results
+
+
+def benchmark_backend(args):
+    """Compare the solves per second of the fault simulation with each OpenDSS backend of args.backends
+       The first args.num_samples scenarios of the feeder are simulated with each backend (fault commands, solve, current readout
+       and feature extraction) and the raw features are compared with the ones of the first backend
+       Returns a dict with the solves per second of each backend and the largest difference to the reference features
+    """
+    results={}
+    reference=None
+    for backend in args.backends:
+        dss,_=compile_feeder(args.feeder,args.feeder_file,backend)
+        feeder=generate_feeder_infos(argparse.Namespace(feeder=args.feeder,feeder_file=args.feeder_file,feeder_cache='no'),dss)
+
+        # Fixed fault resistances and load values, so every backend simulates the same scenarios
+        fault_information=FaultInformation(fault_resistances=[0.05,5.0,20.0],load_values=np.round(np.linspace(20,80,100),2).tolist())
+        fault_simulator=FaultSimulation(dss,feeder,fault_information,show_progress=False)
+        fault_simulator.scenarios=fault_simulator.get_scenarios()[:args.num_samples]
+        fault_simulator.allocate(fault_simulator.get_num_samples())
+
+        start=time.perf_counter()
+        fault_simulator.simulate_scenarios(fault_simulator.get_scenarios())
+        seconds=time.perf_counter()-start
+
+        dataset=fault_simulator.get_results()['dataset']
+        reference=dataset if reference is None else reference
+        results[backend]={'samples':len(dataset),'seconds':seconds,'solves_per_second':len(dataset)/seconds,
+                          'max_difference':float(np.abs(dataset-reference).max(initial=0))}
+    return results
+
+
+def get_git_commit():
+    """Return the commit the benchmark is run on (None outside of a git repository)
+    """
+    try:
+        result=subprocess.run(['git','rev-parse','HEAD'],capture_output=True,text=True,cwd=os.path.dirname(os.path.abspath(__file__)))
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def time_stage(stages,stage,function,samples=None):
+    """Run function, record its time in stages[stage] and return its result
+    """
+    start=time.perf_counter()
+    result=function()
+    seconds=time.perf_counter()-start
+    stages[stage]={'seconds':round(seconds,6),'samples':samples,
+                   'ms_per_sample':round(1000*seconds/samples,6) if samples else None}
+    return result
+
+
+def benchmark_pipeline(args,feeder_name,dss):
+    """Time each stage of the dataset generation on a compiled feeder (or a FakeDSS)
+        - topology: generate_feeder_infos (without the feeder cache), connectivity: get_connectivity_info alone
+        - features: get_features of the solved circuit (args.feature_repeats times)
+        - simulation_<fault type>: simulation of the first args.max_scenarios scenarios of each fault type
+        - standardization: get_dataset, export: dataset_export to a temporary folder
+       Returns a dictionary with the time of each stage
+    """
+    stages={}
+    feeder_args=argparse.Namespace(feeder=feeder_name,feeder_file=None,feeder_cache='no')
+    feeder=time_stage(stages,'topology',lambda: generate_feeder_infos(feeder_args,dss))
+    time_stage(stages,'connectivity',lambda: get_connectivity_info(dss,feeder.bus_list))
+
+    # Fixed fault resistances and load values, so every run simulates the same scenarios
+    fault_information=FaultInformation(fault_resistances=[0.05,5.0,20.0],
+                                       load_values=np.round(np.linspace(20,80,args.max_scenarios),2).tolist())
+    fault_simulator=FaultSimulation(dss,feeder,fault_information,show_progress=False)
+    fault_simulator.scenarios=np.concatenate([fault_simulator.get_scenarios(fault_type)[:args.max_scenarios] for fault_type in FAULT_TYPES])
+    fault_simulator.allocate(fault_simulator.get_num_samples())
+
+    def extract_features():
+        for _ in range(args.feature_repeats):
+            fault_simulator.get_features()
+    time_stage(stages,'features',extract_features,samples=args.feature_repeats)
+
+    for fault_type in FAULT_TYPES:
+        scenarios=fault_simulator.get_scenarios(fault_type)
+        time_stage(stages,f'simulation_{fault_type}',lambda: fault_simulator.simulate_scenarios(scenarios),samples=len(scenarios))
+
+    num_samples=fault_simulator.num_simulated
+    results=time_stage(stages,'standardization',lambda: fault_simulator.get_dataset(print_info=False),samples=num_samples)
+
+    with tempfile.TemporaryDirectory() as folder:
+        export_args=argparse.Namespace(folder=folder)
+        time_stage(stages,'export',lambda: dataset_export(export_args,results[0],feeder.edge_list_by_bus_id,*results[1:],
+                                                          feeder.neighborhood_dict_1_hop_by_bus_name,feeder.neighborhood_dict_2_hop_by_bus_name,
+                                                          feeder.bus_id_map,statistics=fault_simulator.statistics),samples=num_samples)
+    return stages
+
+
+def benchmark_suite(args):
+    """Run benchmark_pipeline on every feeder of args.suite_feeders and write a JSON report to args.report
+       The report contains the commit, the benchmark settings and the time of each stage, so the reports of two commits can be diffed
+    """
+    report={'commit':get_git_commit(),
+            'settings':{'max_scenarios':args.max_scenarios,'feature_repeats':args.feature_repeats,'fake_buses':args.fake_buses},
+            'feeders':{}}
+    for feeder_name in args.suite_feeders:
+        if feeder_name=='fake':
+            stages={}
+            dss=time_stage(stages,'compile',lambda: FakeDSS(args.fake_buses,seed=0))
+            feeder_name=f'fake-{args.fake_buses}'
+        else:
+            stages={}
+            dss,_=time_stage(stages,'compile',lambda: compile_feeder(feeder_name,BUNDLED_FEEDERS[feeder_name]))
+        stages.update(benchmark_pipeline(args,feeder_name,dss))
+        report['feeders'][feeder_name]={'buses':len(dss.circuit_all_bus_names()),'stages':stages}
+
+    with open(args.report,'w') as json_file:
+        json.dump(report,json_file,indent=4)
+    return report
+
+
+if __name__ == "__main__":
+    args=get_bench_args()
+    if args.benchmark=='fault_pool':
+        results=benchmark_fault_pool(args)
+
+        print(f'Solves per second on {args.feeder} (window of {args.window} samples)')
+        print(f"{'samples':>10} {'new_fault':>12} {'fault_pool':>12}")
+        for window_idx,(new_fault,fault_pool) in enumerate(zip(results['new_fault'],results['fault_pool'])):
+            print(f'{(window_idx+1)*args.window:>10} {new_fault:>12.1f} {fault_pool:>12.1f}')
+
+    elif args.benchmark=='connectivity':
+        results=benchmark_connectivity(args)
+
+        print('Time of the connectivity extraction in seconds')
+        print(f"{'feeder':>10} {'buses':>8} {'pde_walk':>10} {'pairwise':>10} {'identical':>10}")
+        for feeder_name,result in results.items():
+            pairwise=f"{result['pairwise']:>10.3f}" if result['pairwise'] is not None else f"{'skipped':>10}"
+            identical=f"{str(result['identical']):>10}" if result['identical'] is not None else f"{'-':>10}"
+            print(f"{feeder_name:>10} {result['buses']:>8} {result['pde_walk']:>10.3f} {pairwise} {identical}")
+
+    elif args.benchmark=='suite':
+        report=benchmark_suite(args)
+
+        print(f'Time of each stage in seconds (report written to {args.report})')
+        feeder_names=list(report['feeders'])
+        print(f"{'stage':>22}"+''.join(f'{feeder_name:>14}' for feeder_name in feeder_names))
+        for stage in report['feeders'][feeder_names[0]]['stages']:
+            print(f'{stage:>22}'+''.join(f"{report['feeders'][feeder_name]['stages'][stage]['seconds']:>14.4f}" for feeder_name in feeder_names))
+
+    elif args.benchmark=='backend':
+        results=benchmark_backend(args)
+
+        print(f'Solves per second of the fault simulation on {args.feeder}')
+        print(f"{'backend':>18} {'samples':>8} {'seconds':>9} {'solves/s':>10} {'max_difference':>15}")
+        for backend,result in results.items():
+            print(f"{backend:>18} {result['samples']:>8} {result['seconds']:>9.2f} {result['solves_per_second']:>10.1f} {result['max_difference']:>15.3g}")
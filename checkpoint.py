@@ -0,0 +1,165 @@
+#Imports
+# Python Imports
+import os
+import json
+import glob
+
+# Additional Library Imports
+import numpy as np
+from tqdm import tqdm
+
+# Local Imports
+from fault_simulation import RESULT_ARRAYS
+from normalization import RunningStatistics
+from instrumentation import timed
+from parallel_simulation import build_shards, simulate_shard, run_parallel_simulation
+
+CHECKPOINT_FILE='checkpoint.json'          # Completed shards and standardization progress
+SCENARIO_PLAN_FILE='scenario_plan.npy'     # Scenario table of the run (see scenarios.build_scenario_table)
+STANDARDIZED_FILE='dataset_standardized.npy'   # Standardized copy of dataset.npy, moved over it once every bus is standardized
+
+
+def save_checkpoint(folder,checkpoint,statistics=None):
+    """Write the checkpoint to a temporary file and move it over the previous one, so a kill never leaves a partial checkpoint
+       - statistics: statistics of the completed shards, stored in a new file referenced by the checkpoint
+         (the file of the previous checkpoint is removed once the new checkpoint is written)
+    """
+    previous_statistics_file=checkpoint.get('statistics_file')
+    if statistics is not None:
+        checkpoint['statistics_file']=f"checkpoint_stats_{len(checkpoint['completed_shards'])}.npz"
+        statistics.save(folder,checkpoint['statistics_file'])
+
+    checkpoint_path=os.path.join(folder,CHECKPOINT_FILE)
+    with open(checkpoint_path+'.tmp','w') as json_file:
+        json.dump(checkpoint,json_file,indent=4)
+    os.replace(checkpoint_path+'.tmp',checkpoint_path)
+
+    if previous_statistics_file is not None and previous_statistics_file!=checkpoint.get('statistics_file'):
+        os.remove(os.path.join(folder,previous_statistics_file))
+
+
+def remove_checkpoint(folder):
+    """Remove checkpoint.json and the statistics of the checkpoints once the dataset is exported, so the dataset folder only
+       holds the dataset (a resumed run then finds the dataset complete from dataset_info.json)
+    """
+    checkpoint_path=os.path.join(folder,CHECKPOINT_FILE)
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)                                                                                      # Removed first, so an interrupted removal never leaves a checkpoint without its statistics
+    for statistics_path in glob.glob(os.path.join(folder,'checkpoint_stats_*.npz')):
+        os.remove(statistics_path)
+
+
+def load_checkpoint(folder):
+    checkpoint_path=os.path.join(folder,CHECKPOINT_FILE)
+    if not os.path.exists(checkpoint_path):
+        raise FileNotFoundError(f'No checkpoint to resume from in {folder}')
+    with open(checkpoint_path) as json_file:
+        return json.load(json_file)
+
+
+def save_scenario_plan(folder,scenarios):
+    """Store the scenario table so a resumed run simulates exactly the same scenarios
+    """
+    np.save(os.path.join(folder,SCENARIO_PLAN_FILE),scenarios)
+
+
+def load_scenario_plan(folder):
+    return np.load(os.path.join(folder,SCENARIO_PLAN_FILE))
+
+
+def flush_results(fault_simulator):
+    for name in RESULT_ARRAYS:
+        getattr(fault_simulator,name).flush()
+
+
+def run_checkpointed_simulation(args,fault_simulator):
+    """Simulate all the fault types with periodic checkpoints (the dataset is written in memmap output mode)
+        - The scenarios are split into shards of about args.checkpoint_every samples
+        - Once a shard is written, the memory-mapped arrays are flushed and the shard is recorded in checkpoint.json
+        - With args.resume, the scenario plan and the arrays of the previous run are reopened and only the
+          shards missing from the checkpoint are simulated (the run must use the shard size of the checkpoint)
+        - The statistics of the completed shards are stored with each checkpoint, so a resumed run standardizes
+          the dataset with the same statistics as an uninterrupted run
+    """
+    folder=fault_simulator.output_folder
+
+    if args.resume:
+        # Simulate the same scenarios (fault resistances and load values) as the interrupted run
+        fault_simulator.scenarios=load_scenario_plan(folder)
+        checkpoint=load_checkpoint(folder)
+    else:
+        save_scenario_plan(folder,fault_simulator.get_scenarios())
+        checkpoint={'feeder':args.feeder,'num_samples':None,'shard_size':None,'completed_shards':[],'standardized_buses':0}
+
+    num_samples=fault_simulator.get_num_samples()
+    shard_size=args.checkpoint_every if args.checkpoint_every>0 else num_samples
+    if args.resume and (checkpoint['feeder']!=args.feeder or checkpoint['num_samples']!=num_samples):
+        raise ValueError(f"The checkpoint in {folder} is for {checkpoint['num_samples']} samples of {checkpoint['feeder']}, "
+                         f"this run has {num_samples} samples of {args.feeder}")
+    if args.resume and checkpoint.get('shard_size') is None and checkpoint['completed_shards']:
+        start,stop=min(checkpoint['completed_shards'])
+        checkpoint['shard_size']=stop-start if stop<num_samples else shard_size                                        # Checkpoint written before the shard size was recorded
+    if args.resume and checkpoint['completed_shards'] and checkpoint['shard_size']!=shard_size:
+        # The completed shards would not match the shards of this run, their samples would be simulated and added to the statistics again
+        raise ValueError(f"The checkpoint in {folder} was written with --checkpoint-every {checkpoint['shard_size']}, "
+                         f"resume with the same value (this run has {args.checkpoint_every})")
+    checkpoint['num_samples']=num_samples
+    checkpoint['shard_size']=shard_size
+    if not args.resume:
+        save_checkpoint(folder,checkpoint)                                                                              # Marks the folder as a run in progress until the dataset is exported
+    fault_simulator.allocate(num_samples,resume=args.resume)
+    if 'statistics_file' in checkpoint:
+        fault_simulator.statistics=RunningStatistics.load(folder,checkpoint['statistics_file'])
+
+    # Shards which are not in the checkpoint yet
+    shards=build_shards(fault_simulator,shard_samples=shard_size)
+    completed=set(tuple(shard) for shard in checkpoint['completed_shards'])
+    pending_shards=[shard for shard in shards if tuple(shard) not in completed]
+
+    def on_shard_done(shard):
+        flush_results(fault_simulator)
+        checkpoint['completed_shards'].append(list(shard))
+        save_checkpoint(folder,checkpoint,fault_simulator.statistics)
+
+    if args.workers>1:
+        run_parallel_simulation(args,fault_simulator,args.workers,shards=pending_shards,on_shard_done=on_shard_done)
+    else:
+        fault_simulator.show_progress=False
+        for shard in tqdm(pending_shards,desc="Fault Simulation (checkpointed)",initial=len(shards)-len(pending_shards),total=len(shards)):
+            fault_simulator.num_simulated=shard[0]
+            simulate_shard(fault_simulator,shard)
+            on_shard_done(shard)
+
+    fault_simulator.num_simulated=num_samples
+    if args.standardization=='in-place':
+        standardize_with_checkpoint(fault_simulator,checkpoint)
+
+
+def standardize_with_checkpoint(fault_simulator,checkpoint):
+    """Standardize the dataset bus by bus with the statistics collected during the simulation, recording
+       the standardized buses in the checkpoint so a resumed run does not standardize a bus again
+        - The buses are standardized from the raw features of dataset.npy into a copy (STANDARDIZED_FILE), so a bus
+          standardized again after a kill between its write and its checkpoint gets the same values
+        - The copy is moved over dataset.npy once every bus is standardized
+    """
+    folder=fault_simulator.output_folder
+    dataset=fault_simulator.dataset
+    dataset_path=os.path.join(folder,'dataset.npy')
+    standardized_path=os.path.join(folder,STANDARDIZED_FILE)
+    if checkpoint['standardized_buses']==dataset.shape[1] and not os.path.exists(standardized_path):
+        return                                                                                                          # dataset.npy was already replaced by the standardized copy
+
+    standardized=np.lib.format.open_memmap(standardized_path,mode='r+' if checkpoint['standardized_buses']>0 else 'w+',
+                                           dtype=dataset.dtype,shape=dataset.shape)
+    for bus in range(checkpoint['standardized_buses'],dataset.shape[1]):
+        with timed('standardization'):
+            fault_simulator.statistics.transform(dataset,out=standardized,buses=[bus])
+        standardized.flush()
+        checkpoint['standardized_buses']=bus+1
+        save_checkpoint(folder,checkpoint)
+
+    # Close the memory-mapped files before moving the standardized copy over dataset.npy
+    del standardized,dataset
+    fault_simulator.dataset=None
+    os.replace(standardized_path,dataset_path)
+    fault_simulator.dataset=np.lib.format.open_memmap(dataset_path,mode='r+')
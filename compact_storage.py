@@ -0,0 +1,140 @@
+#Imports
+# Python Imports
+import os
+
+# Additional Library Imports
+import numpy as np
+from print_color import print
+
+# Storage types of the features (--feature-dtype)
+FEATURE_DTYPES=['float64','float32','float16']
+
+# Labels stored with the smallest integer type holding their values with --compact-labels yes
+COMPACT_LABELS=['fault_detection_labels','fault_class_labels','fault_location_labels']
+INTEGER_DTYPES=[np.int8,np.int16,np.int32,np.int64]
+
+# Types and conversion errors of a dataset exported with --dataset-format npy (recorded in manifest.json with sharded)
+STORAGE_REPORT_FILE='storage_report.json'
+
+
+class CastError:
+    """Error introduced by storing an array with another type, collected chunk by chunk
+      - update --> Adds a chunk of original values and the values they are stored as
+      - report --> Largest absolute error, root mean square error and largest relative error (of the non-zero values)
+    """
+
+    def __init__(self):
+        self.count=0
+        self.sum_squares=0.0
+        self.max_abs_error=0.0
+        self.max_rel_error=0.0
+
+    def update(self,values,stored):
+        values=np.asarray(values,dtype=np.float64)
+        errors=np.abs(np.asarray(stored,dtype=np.float64)-values)
+        if errors.size==0:
+            return
+        self.count+=errors.size
+        self.sum_squares+=float(np.sum(errors**2))
+        self.max_abs_error=max(self.max_abs_error,float(errors.max()))
+        nonzero=values!=0
+        if nonzero.any():
+            self.max_rel_error=max(self.max_rel_error,float((errors[nonzero]/np.abs(values[nonzero])).max()))
+
+    def report(self):
+        return {'max_abs_error':self.max_abs_error,
+                'rms_error':float(np.sqrt(self.sum_squares/self.count)) if self.count else 0.0,
+                'max_rel_error':self.max_rel_error}
+
+
+def get_smallest_integer_dtype(array,chunk_size=1<<20):
+    """Smallest signed integer type holding all the values of an integer array (read chunk by chunk)
+    """
+    low,high=0,0
+    for start in range(0,len(array),chunk_size):
+        chunk=np.asarray(array[start:start+chunk_size])
+        if chunk.size:
+            low,high=min(low,int(chunk.min())),max(high,int(chunk.max()))
+    for dtype in INTEGER_DTYPES:
+        if np.iinfo(dtype).min<=low and high<=np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def get_storage_dtypes(arrays,feature_dtype='float64',compact_labels=False):
+    """Type each array of the dataset is stored with
+        - dataset: feature_dtype
+        - detection, class and location labels: smallest integer type holding their values if compact_labels is set
+        - the other arrays keep their type
+    """
+    dtypes={name:np.dtype(array.dtype) for name,array in arrays.items()}
+    if 'dataset' in arrays:
+        dtypes['dataset']=np.dtype(feature_dtype)
+    if compact_labels:
+        for name in COMPACT_LABELS:
+            if name in arrays:
+                dtypes[name]=get_smallest_integer_dtype(arrays[name])
+    return dtypes
+
+
+def cast_array(values,dtype,cast_error=None):
+    """Values converted to dtype, with the error recorded in cast_error
+    """
+    stored=np.asarray(values).astype(dtype,copy=False)
+    if cast_error is not None and stored.dtype!=np.asarray(values).dtype:
+        cast_error.update(values,stored)
+    return stored
+
+
+def save_cast_array(path,array,dtype,cast_error=None,chunk_size=4096):
+    """Write an array to a .npy file with another type, chunk by chunk so a memory-mapped array is never loaded as a whole
+       The file is written next to path and moved over it at the end (path can be the file of the memory-mapped array)
+    """
+    stored=np.lib.format.open_memmap(path+'.tmp',mode='w+',dtype=dtype,shape=array.shape)
+    for start in range(0,len(array),chunk_size):
+        rows=slice(start,start+chunk_size)
+        stored[rows]=cast_array(array[rows],dtype,cast_error)
+    stored.flush()
+    del stored
+    os.replace(path+'.tmp',path)
+
+
+def get_storage_report(arrays,dtypes,cast_errors):
+    """Type, size and error of each stored array (see CastError)
+    """
+    report={}
+    for name,array in arrays.items():
+        dtype=np.dtype(dtypes[name])
+        report[name]={'original_dtype':np.dtype(array.dtype).str,
+                      'dtype':dtype.str,
+                      'original_bytes':int(array.size*np.dtype(array.dtype).itemsize),
+                      'bytes':int(array.size*dtype.itemsize),
+                      **cast_errors[name].report()}
+    return report
+
+
+def merge_storage_reports(report,new_report,num_samples,new_num_samples):
+    """Storage report of a dataset after new_num_samples samples (new_report) are added to its num_samples samples (report)
+    """
+    merged={}
+    for name,info in report.items():
+        new_info=new_report[name]
+        total=max(num_samples+new_num_samples,1)
+        merged[name]={'original_dtype':info['original_dtype'],
+                      'dtype':info['dtype'],
+                      'original_bytes':info['original_bytes']+new_info['original_bytes'],
+                      'bytes':info['bytes']+new_info['bytes'],
+                      'max_abs_error':max(info['max_abs_error'],new_info['max_abs_error']),
+                      'rms_error':float(np.sqrt((num_samples*info['rms_error']**2+new_num_samples*new_info['rms_error']**2)/total)),
+                      'max_rel_error':max(info['max_rel_error'],new_info['max_rel_error'])}
+    return merged
+
+
+def print_storage_report(report):
+    print('Storage Information',color='yellow',format='bold')
+    print('---------------------------------',color='yellow')
+    for name,info in report.items():
+        print(f"{np.dtype(info['original_dtype']).name} -> {np.dtype(info['dtype']).name}, {info['original_bytes']/2**20:.2f} MB -> {info['bytes']/2**20:.2f} MB, "
+              f"max error {info['max_abs_error']:.3g}, rms error {info['rms_error']:.3g}, max relative error {info['max_rel_error']:.3g}",
+              tag=name, tag_color='yellow', color='white')
+    print('')
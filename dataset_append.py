@@ -0,0 +1,256 @@
+#Imports
+# Python Imports
+import io
+import os
+import json
+import shutil
+import hashlib
+from collections import Counter
+
+# Additional Library Imports
+import numpy as np
+
+# Local Imports
+from normalization import STATISTICS_FILE, RunningStatistics
+from checkpoint import SCENARIO_PLAN_FILE, save_scenario_plan, load_scenario_plan
+from dataset_shards import MANIFEST_FILE, append_shards
+from compact_storage import STORAGE_REPORT_FILE, CastError, cast_array, get_storage_report, merge_storage_reports, print_storage_report
+from feature_extractors import VOLTAGE_CHANNELS
+from instrumentation import timed
+
+DATASET_INFO_FILE='dataset_info.json'      # Number of samples, buses, format and standardization of the dataset (checked by append mode)
+APPEND_JOURNAL_FILE='append_journal.json'  # State of the dataset before the append in progress (see recover_append)
+
+# Files rewritten by an append, copied before it starts so an interrupted append can be undone
+APPEND_BACKUP_FILES=[STATISTICS_FILE,SCENARIO_PLAN_FILE,STORAGE_REPORT_FILE,MANIFEST_FILE]
+
+# Fields of the scenario table identifying a scenario (the fault location label follows from them)
+SCENARIO_KEY_FIELDS=['fault_class','bus_id','node1','node2','resistance','load_value']
+
+
+def get_bus_list_hash(bus_id_map):
+    bus_list=sorted(bus_id_map,key=bus_id_map.get)
+    return hashlib.sha256('\n'.join(bus_list).encode()).hexdigest()
+
+
+def save_dataset_info(folder,num_samples,bus_id_map,dataset_format,standardized,feature_channels=None):
+    write_dataset_info(folder,{'num_samples':int(num_samples),
+                               'num_buses':len(bus_id_map),
+                               'bus_list_sha256':get_bus_list_hash(bus_id_map),
+                               'dataset_format':dataset_format,
+                               'standardized':standardized,
+                               'feature_channels':list(VOLTAGE_CHANNELS if feature_channels is None else feature_channels)})
+
+
+def write_dataset_info(folder,info):
+    info_path=os.path.join(folder,DATASET_INFO_FILE)
+    with open(info_path+'.tmp','w') as json_file:
+        json.dump(info,json_file,indent=4)
+    os.replace(info_path+'.tmp',info_path)
+
+
+def load_dataset_info(folder):
+    info_path=os.path.join(folder,DATASET_INFO_FILE)
+    if not os.path.exists(info_path):
+        raise FileNotFoundError(f'No {DATASET_INFO_FILE} in {folder}, the dataset was generated without the scenario plan append mode needs')
+    with open(info_path) as json_file:
+        return json.load(json_file)
+
+
+def get_missing_scenarios(scenarios,existing_scenarios):
+    """Rows of the scenario table which are not in the existing scenarios, in the order of the table
+       The scenarios are compared on SCENARIO_KEY_FIELDS, a key found n times in the existing scenarios removes its first
+       n occurrences from the table (e.g. the repeats of a fixed fault resistance already simulated)
+    """
+    remaining=Counter(existing_scenarios[SCENARIO_KEY_FIELDS].tolist())
+    missing=np.ones(len(scenarios),dtype=bool)
+    for idx,key in enumerate(scenarios[SCENARIO_KEY_FIELDS].tolist()):
+        if remaining[key]>0:
+            remaining[key]-=1
+            missing[idx]=False
+    return scenarios[missing]
+
+
+def plan_append(folder,scenarios,bus_id_map,feature_channels=VOLTAGE_CHANNELS):
+    """Scenarios of the run which are missing from the dataset in folder (see get_missing_scenarios)
+       The dataset must have been generated for the same buses and feature channels and with --standardization lazy, so
+       the new samples can be added without changing the existing ones
+    """
+    recover_append(folder)
+    info=load_dataset_info(folder)
+    if info['bus_list_sha256']!=get_bus_list_hash(bus_id_map):
+        raise ValueError(f'The dataset in {folder} was generated for other buses ({info["num_buses"]} buses), this run has {len(bus_id_map)} buses')
+    if info.get('feature_channels',VOLTAGE_CHANNELS)!=list(feature_channels):
+        raise ValueError(f"The dataset in {folder} has the feature channels {info.get('feature_channels',VOLTAGE_CHANNELS)}, this run has {list(feature_channels)}")
+    if info['standardized']:
+        raise ValueError(f'The dataset in {folder} is standardized in place, append mode needs a dataset generated with --standardization lazy')
+    existing_scenarios=load_scenario_plan(folder)
+    if len(existing_scenarios)!=info['num_samples']:
+        raise ValueError(f"The scenario plan in {folder} has {len(existing_scenarios)} rows for {info['num_samples']} samples")
+    return get_missing_scenarios(scenarios,existing_scenarios)
+
+
+def begin_append(folder,info,array_names):
+    """Record the number of samples of the dataset and the arrays about to be extended in APPEND_JOURNAL_FILE, with a copy
+       of each file of APPEND_BACKUP_FILES, before an append changes any file
+    """
+    backups={}
+    for file_name in APPEND_BACKUP_FILES:
+        path=os.path.join(folder,file_name)
+        if os.path.exists(path):
+            shutil.copyfile(path,path+'.bak')
+            backups[file_name]=file_name+'.bak'
+    journal_path=os.path.join(folder,APPEND_JOURNAL_FILE)
+    with open(journal_path+'.tmp','w') as json_file:
+        json.dump({'num_samples':info['num_samples'],'dataset_format':info['dataset_format'],'arrays':list(array_names),'backups':backups},json_file,indent=4)
+    os.replace(journal_path+'.tmp',journal_path)
+
+
+def recover_append(folder):
+    """Finish or undo the append recorded in APPEND_JOURNAL_FILE, if any
+        - The append is complete once dataset_info.json has a new number of samples (written last), the copies and the
+          journal are then removed
+        - Otherwise the .npy files are truncated back to the number of samples of the journal and the rewritten files are
+          restored from their copies (the shards written after the ones of the restored manifest are overwritten by the next append)
+       The recovery can itself be interrupted and run again
+    """
+    journal_path=os.path.join(folder,APPEND_JOURNAL_FILE)
+    if not os.path.exists(journal_path):
+        return
+    with open(journal_path) as json_file:
+        journal=json.load(json_file)
+    committed=load_dataset_info(folder)['num_samples']!=journal['num_samples']
+    if not committed and journal['dataset_format']!='sharded':
+        for name in journal['arrays']:
+            truncate_npy(os.path.join(folder,f'{name}.npy'),journal['num_samples'])
+    for file_name,backup_name in journal['backups'].items():
+        backup_path=os.path.join(folder,backup_name)
+        if not os.path.exists(backup_path):
+            continue                                                                                                    # Already restored by an interrupted recovery
+        if committed:
+            os.remove(backup_path)
+        else:
+            os.replace(backup_path,os.path.join(folder,file_name))
+    os.remove(journal_path)
+
+
+def truncate_npy(path,num_rows,chunk_size=4096):
+    """Keep the first num_rows rows of a .npy file (the rows after them were added by an interrupted append, whether or not
+       the header was updated with them)
+    """
+    with open(path,'r+b') as file:
+        version=np.lib.format.read_magic(file)
+        read_header=np.lib.format.read_array_header_1_0 if version==(1,0) else np.lib.format.read_array_header_2_0
+        shape,fortran_order,dtype=read_header(file)
+        header_size=file.tell()
+        row_bytes=int(np.prod(shape[1:]))*dtype.itemsize
+        header=np.lib.format.header_data_from_array_1_0(np.empty((0,)+tuple(shape[1:]),dtype=dtype))
+        header['shape']=(num_rows,)+tuple(shape[1:])
+        buffer=io.BytesIO()
+        write_header=np.lib.format.write_array_header_1_0 if version==(1,0) else np.lib.format.write_array_header_2_0
+        write_header(buffer,header)
+        if len(buffer.getvalue())==header_size:
+            file.truncate(header_size+num_rows*row_bytes)
+            file.seek(0)
+            file.write(buffer.getvalue())
+            return
+
+    # The header of the new shape has another size, the rows are copied to a new file moved over the previous one
+    existing=np.load(path,mmap_mode='r')
+    stored=np.lib.format.open_memmap(path+'.tmp',mode='w+',dtype=existing.dtype,shape=(num_rows,)+existing.shape[1:])
+    for start in range(0,num_rows,chunk_size):
+        rows=slice(start,min(start+chunk_size,num_rows))
+        stored[rows]=existing[rows]
+    stored.flush()
+    del stored,existing
+    os.replace(path+'.tmp',path)
+
+
+def append_npy(path,values,cast_error=None,chunk_size=4096):
+    """Add rows at the end of a .npy file, converted to the type of the file, without rewriting the existing rows
+       The rows are written before the header with the new shape, so an interrupted append leaves the previous array readable
+       (a file whose header has no room for the new shape is rewritten, see rewrite_npy)
+    """
+    with open(path,'r+b') as file:
+        version=np.lib.format.read_magic(file)
+        read_header=np.lib.format.read_array_header_1_0 if version==(1,0) else np.lib.format.read_array_header_2_0
+        shape,fortran_order,dtype=read_header(file)
+        header_size=file.tell()
+        if fortran_order or tuple(shape[1:])!=tuple(values.shape[1:]):
+            raise ValueError(f'Cannot append samples of shape {values.shape[1:]} to {path} (shape {shape})')
+
+        # Header with the new number of rows, it has the size of the previous one as numpy leaves room for the first axis to grow
+        header=np.lib.format.header_data_from_array_1_0(np.empty((0,)+tuple(shape[1:]),dtype=dtype))
+        header['shape']=(shape[0]+len(values),)+tuple(shape[1:])
+        buffer=io.BytesIO()
+        write_header=np.lib.format.write_array_header_1_0 if version==(1,0) else np.lib.format.write_array_header_2_0
+        write_header(buffer,header)
+
+        if len(buffer.getvalue())==header_size:
+            file.seek(header_size+int(np.prod(shape))*dtype.itemsize)
+            for start in range(0,len(values),chunk_size):
+                file.write(np.ascontiguousarray(cast_array(values[start:start+chunk_size],dtype,cast_error)).tobytes())
+            file.truncate()
+            file.flush()
+            os.fsync(file.fileno())
+            file.seek(0)
+            file.write(buffer.getvalue())
+            return
+    rewrite_npy(path,values,cast_error,chunk_size)
+
+
+def rewrite_npy(path,values,cast_error=None,chunk_size=4096):
+    """Write the rows of a .npy file followed by new rows to a new file moved over it, chunk by chunk
+    """
+    existing=np.load(path,mmap_mode='r')
+    stored=np.lib.format.open_memmap(path+'.tmp',mode='w+',dtype=existing.dtype,shape=(len(existing)+len(values),)+existing.shape[1:])
+    for start in range(0,len(existing),chunk_size):
+        rows=slice(start,min(start+chunk_size,len(existing)))
+        stored[rows]=existing[rows]
+    for start in range(0,len(values),chunk_size):
+        chunk=cast_array(values[start:start+chunk_size],existing.dtype,cast_error)
+        stored[len(existing)+start:len(existing)+start+len(chunk)]=chunk
+    stored.flush()
+    del stored,existing
+    os.replace(path+'.tmp',path)
+
+
+def append_dataset(folder,arrays,scenarios,statistics):
+    """Add the samples of the missing scenarios (see plan_append) to the dataset in folder
+        - npy: the rows are appended to dataset.npy and to the label files (with their types)
+        - sharded: new shards are written after the last one and the manifest is updated (see dataset_shards.append_shards)
+        - The statistics of the new samples are merged into standardization_stats.npz, the scenarios are appended to the
+          scenario plan and the number of samples of dataset_info.json is updated last
+        - The append is recorded in a journal first, so an interrupted append is undone by the next one (see recover_append)
+    """
+    recover_append(folder)
+    info=load_dataset_info(folder)
+    num_samples=len(arrays['dataset'])
+    with timed('append'):
+        begin_append(folder,info,arrays)
+        if info['dataset_format']=='sharded':
+            append_shards(folder,arrays)
+        else:
+            cast_errors={name:CastError() for name in arrays}
+            for name,array in arrays.items():
+                append_npy(os.path.join(folder,f'{name}.npy'),array,cast_errors[name])
+            report_path=os.path.join(folder,STORAGE_REPORT_FILE)
+            if os.path.exists(report_path):
+                with open(report_path) as json_file:
+                    report=json.load(json_file)
+                dtypes={name:np.dtype(report[name]['dtype']) for name in arrays}
+                report=merge_storage_reports(report,get_storage_report(arrays,dtypes,cast_errors),info['num_samples'],num_samples)
+                with open(report_path,'w') as json_file:
+                    json.dump(report,json_file,indent=4)
+                print_storage_report(report)
+
+        # Statistics of the existing samples merged with the ones of the new samples
+        dataset_statistics=RunningStatistics.load(folder)
+        dataset_statistics.merge(statistics)
+        dataset_statistics.save(folder)
+
+        save_scenario_plan(folder,np.concatenate([load_scenario_plan(folder),scenarios]))
+        info['num_samples']+=num_samples
+        write_dataset_info(folder,info)
+        recover_append(folder)                                                                                          # Remove the copies and the journal of the completed append
+    return info['num_samples']
@@ -0,0 +1,220 @@
+#Imports
+# Python Imports
+import os
+import json
+
+# Additional Library Imports
+import numpy as np
+
+# Local Imports
+from normalization import STATISTICS_FILE, RunningStatistics
+from dataset_shards import MANIFEST_FILE, GRAPH_FILE, EDGE_LIST_FILE, load_manifest, load_shard
+from sparse_topology import TOPOLOGY_FILE, load_csr
+from dataset_append import DATASET_INFO_FILE
+from feature_extractors import VOLTAGE_CHANNELS
+
+# Arrays of a generated dataset (see utils.dataset_export), the features first
+DATASET_ARRAYS=['dataset','fault_detection_labels','fault_location_labels','fault_class_labels','fault_resistance_labels','fault_currents_labels']
+
+
+class GraphDataset:
+    """Read-only access to a generated dataset folder (--dataset-format npy or sharded) without loading it in memory
+      - __getitem__ --> Features and labels of a sample or of a slice of samples, as views of the memory-mapped arrays
+      - batches --> Iterates over mini-batches in order (views) or shuffled (only the batch is copied)
+      - edge_index --> Edge list of the feeder as a (2, num_edges) array, loaded once
+      - adjacency/get_neighborhood --> Adjacency matrix and k-hop neighborhoods of topology.npz as CSR matrices
+      - standardize --> Standardizes features with standardization_stats.npz (for datasets written with --standardization lazy)
+      - feature_channels --> Names of the channels of the features (last axis of dataset)
+    The npy layout is memory-mapped as a single block, the shards of the sharded layout are blocks loaded when they are first
+    accessed (the last loaded shard is kept)
+    """
+
+    def __init__(self,folder,names=None):
+        self.folder=folder
+        self.names=list(DATASET_ARRAYS if names is None else names)
+        self._edge_index=None
+        self._bus_id_map=None
+        self._topology=None
+        self._statistics=None
+        self._cached_block=(None,None)                                                                                 # (block index, arrays) of the last loaded shard
+
+        # Description of the dataset (see dataset_append.save_dataset_info), None for datasets written without it
+        info_path=os.path.join(folder,DATASET_INFO_FILE)
+        self.info=None
+        if os.path.exists(info_path):
+            with open(info_path) as json_file:
+                self.info=json.load(json_file)
+
+        if os.path.exists(os.path.join(folder,MANIFEST_FILE)):
+            self.manifest=load_manifest(folder)
+            self.shards=self.manifest['shards']
+            self.block_starts=np.array([shard['start'] for shard in self.shards],dtype=np.int64)
+            self.block_stops=np.array([shard['stop'] for shard in self.shards],dtype=np.int64)
+            self.num_samples=self.manifest['num_samples']
+            self.arrays=None
+            self.standardized=self.manifest['standardized']
+        else:
+            self.manifest=None
+            self.arrays={name:np.load(os.path.join(folder,f'{name}.npy'),mmap_mode='r') for name in self.names}
+            self.num_samples=len(self.arrays[self.names[0]])
+            self.block_starts=np.zeros(1,dtype=np.int64)
+            self.block_stops=np.array([self.num_samples],dtype=np.int64)
+            self.standardized=self.info is not None and self.info['standardized']                                       # dataset.npy standardized in place (--standardization in-place)
+
+    def __len__(self):
+        return self.num_samples
+
+    @property
+    def num_blocks(self):
+        return len(self.block_starts)
+
+    def get_block(self,block):
+        """Arrays of a block (memory-mapped arrays of the npy layout, or the arrays of a shard)
+        """
+        if self.arrays is not None:
+            return self.arrays
+        cached_idx,cached_arrays=self._cached_block
+        if cached_idx!=block:
+            cached_arrays=load_shard(self.folder,self.shards[block],names=self.names)
+            self._cached_block=(block,cached_arrays)
+        return cached_arrays
+
+    def __getitem__(self,idx):
+        """Features and labels of the sample idx, or of the samples of a slice (views if they are in the same block)
+        """
+        if isinstance(idx,slice):
+            start,stop,step=idx.indices(self.num_samples)
+            if step!=1:
+                return self.take(np.arange(start,stop,step))
+            if stop<=start:
+                return self.take(np.zeros(0,dtype=np.int64))
+            block=int(np.searchsorted(self.block_stops,start,side='right'))
+            if stop<=self.block_stops[block]:
+                offset=self.block_starts[block]
+                return {name:array[start-offset:stop-offset] for name,array in self.get_block(block).items()}
+            return self.take(np.arange(start,stop))
+
+        idx=int(idx)
+        if idx<0:
+            idx+=self.num_samples
+        if not 0<=idx<self.num_samples:
+            raise IndexError(f'Sample {idx} is out of range for a dataset of {self.num_samples} samples')
+        block=int(np.searchsorted(self.block_stops,idx,side='right'))
+        return {name:array[idx-self.block_starts[block]] for name,array in self.get_block(block).items()}
+
+    def take(self,indices):
+        """Copy of the features and labels of the samples at indices (read block by block, in the order of indices)
+        """
+        indices=np.asarray(indices,dtype=np.int64)
+        blocks=np.searchsorted(self.block_stops,indices,side='right')
+        batch=None
+        for block in np.unique(blocks):
+            positions=np.flatnonzero(blocks==block)
+            arrays=self.get_block(int(block))
+            if batch is None:
+                batch={name:np.empty((len(indices),)+array.shape[1:],dtype=array.dtype) for name,array in arrays.items()}
+            for name,array in arrays.items():
+                batch[name][positions]=array[indices[positions]-self.block_starts[block]]
+        if batch is None:
+            batch={name:np.empty((0,)+tuple(self.get_sample_shape(name)),dtype=self.get_dtype(name)) for name in self.names}
+        return batch
+
+    def get_sample_shape(self,name):
+        if self.arrays is not None:
+            return self.arrays[name].shape[1:]
+        return tuple(self.manifest['arrays'][name]['sample_shape'])
+
+    def get_dtype(self,name):
+        if self.arrays is not None:
+            return self.arrays[name].dtype
+        return np.dtype(self.manifest['arrays'][name]['dtype'])
+
+    def batches(self,batch_size,shuffle=False,seed=None,drop_last=False,standardize=False):
+        """Iterate over mini-batches of the dataset (dictionaries with the features and labels)
+           - shuffle=False: consecutive samples, the batches are views of the arrays
+           - shuffle=True: the blocks are visited in a random order and the samples of each block are shuffled,
+             the samples of a batch are read in increasing order (sequential reads of the memory-mapped files)
+           - drop_last: skip the last batch of each block if it has less than batch_size samples
+           - standardize: standardize the features of the batches (copies) with standardization_stats.npz
+           The batches never span two blocks, so only one shard is loaded at a time with the sharded layout
+        """
+        rng=np.random.default_rng(seed)
+        block_order=rng.permutation(self.num_blocks) if shuffle else range(self.num_blocks)
+        for block in block_order:
+            start,stop=int(self.block_starts[block]),int(self.block_stops[block])
+            if shuffle:
+                samples=start+rng.permutation(stop-start)
+            for batch_start in range(0,stop-start,batch_size):
+                batch_stop=min(batch_start+batch_size,stop-start)
+                if drop_last and batch_stop-batch_start<batch_size:
+                    continue
+                if shuffle:
+                    batch=self.take(np.sort(samples[batch_start:batch_stop]))
+                else:
+                    batch=self[start+batch_start:start+batch_stop]
+                if standardize:
+                    batch['dataset']=self.standardize(batch['dataset'])
+                yield batch
+
+    @property
+    def edge_index(self):
+        """Edge list of the feeder as a (2, num_edges) int64 array (the layout of torch_geometric)
+        """
+        if self._edge_index is None:
+            edge_list=np.load(os.path.join(self.folder,EDGE_LIST_FILE))
+            self._edge_index=np.ascontiguousarray(np.asarray(edge_list,dtype=np.int64).reshape(-1,2).T)
+        return self._edge_index
+
+    @property
+    def topology(self):
+        """Arrays of topology.npz (see sparse_topology.save_topology), loaded once
+        """
+        if self._topology is None:
+            with np.load(os.path.join(self.folder,TOPOLOGY_FILE)) as saved:
+                self._topology={name:saved[name] for name in saved.files}
+        return self._topology
+
+    @property
+    def adjacency(self):
+        return load_csr(self.topology,'adjacency')
+
+    def get_neighborhood(self,k):
+        """Buses within k hops of each bus (the bus itself included) as a CSR bool matrix, k up to the --k-hops of the run
+        """
+        if f'hop_{k}_indptr' not in self.topology:
+            raise ValueError(f'The neighborhoods of {k} hops are not stored in {TOPOLOGY_FILE}, rerun with --k-hops {k}')
+        return load_csr(self.topology,f'hop_{k}')
+
+    @property
+    def bus_id_map(self):
+        """Bus name -> bus id, from graph.json (sharded layout) or bus_id_map.npy (npy layout)
+        """
+        if self._bus_id_map is None:
+            graph_path=os.path.join(self.folder,GRAPH_FILE)
+            if os.path.exists(graph_path):
+                with open(graph_path) as json_file:
+                    self._bus_id_map=json.load(json_file)['bus_id_map']
+            else:
+                self._bus_id_map=np.load(os.path.join(self.folder,'bus_id_map.npy'),allow_pickle=True).item()
+        return self._bus_id_map
+
+    @property
+    def feature_channels(self):
+        """Names of the feature channels from dataset_info.json (the 6 voltage channels for datasets written without it)
+        """
+        if self.info is None:
+            return list(VOLTAGE_CHANNELS)
+        return self.info.get('feature_channels',list(VOLTAGE_CHANNELS))
+
+    @property
+    def statistics(self):
+        if self._statistics is None:
+            self._statistics=RunningStatistics.load(self.folder,STATISTICS_FILE)
+        return self._statistics
+
+    def standardize(self,features):
+        """Standardized copy of the features (num_samples, num_buses, num_features) with the statistics of the dataset
+        """
+        if self.standardized:
+            raise ValueError(f'The dataset in {self.folder} is already standardized')
+        return self.statistics.transform(features)
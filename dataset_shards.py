@@ -0,0 +1,162 @@
+#Imports
+# Python Imports
+import os
+import json
+import hashlib
+
+# Additional Library Imports
+import numpy as np
+
+# Local Imports
+from scenarios import FAULT_TYPES
+from instrumentation import timed
+from compact_storage import CastError, cast_array, get_storage_report, merge_storage_reports
+
+MANIFEST_FILE='manifest.json'       # Shards of the dataset, shapes and types of the arrays, class counts and checksums
+GRAPH_FILE='graph.json'             # Bus id map and one-hop/two-hop neighborhoods (plain JSON instead of pickled object arrays)
+EDGE_LIST_FILE='edge_list.npy'
+SHARD_FOLDER='shards'
+MANIFEST_VERSION=1
+
+
+def get_file_sha256(path,chunk_size=1<<20):
+    sha256=hashlib.sha256()
+    with open(path,'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size),b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_class_counts(fault_class_labels):
+    """Number of samples of each fault type (see scenarios.FAULT_CLASS_MAP)
+    """
+    counts=np.bincount(np.asarray(fault_class_labels,dtype=np.int64),minlength=len(FAULT_TYPES))
+    return {fault_type:int(count) for fault_type,count in zip(FAULT_TYPES,counts)}
+
+
+def save_graph(folder,edge_list_by_bus_id,neighborhood_dict_1_hop_by_bus_name,neighborhood_dict_2_hop_by_bus_name,bus_id_map):
+    """Store the edge list as an integer .npy array and the dictionaries of the feeder in graph.json
+    """
+    np.save(os.path.join(folder,EDGE_LIST_FILE),np.asarray(edge_list_by_bus_id,dtype=np.int64).reshape(-1,2))
+    graph={'bus_id_map':{str(bus):int(bus_id) for bus,bus_id in bus_id_map.items()},
+           '1_hop_by_bus_name':{str(bus):[str(neighbor) for neighbor in neighbors] for bus,neighbors in neighborhood_dict_1_hop_by_bus_name.items()},
+           '2_hop_by_bus_name':{str(bus):[str(neighbor) for neighbor in neighbors] for bus,neighbors in neighborhood_dict_2_hop_by_bus_name.items()}}
+    with open(os.path.join(folder,GRAPH_FILE),'w') as json_file:
+        json.dump(graph,json_file)
+
+
+def export_shards(folder,arrays,shard_size,standardized=True,statistics_file=None,dtypes=None,compressed=False):
+    """Write the dataset and the labels in shards of shard_size samples and the manifest describing them
+        - arrays: dictionary of the arrays to shard (dataset and labels, same number of samples), memory-mapped arrays
+          are read one shard at a time
+        - dtypes: type each array is stored with (see compact_storage.get_storage_dtypes), the type of the array by default
+        - Each shard is a .npz file (shards/shard_XXXXX.npz) with one entry per array, compressed if compressed is set
+        - The manifest records the stored types and the error of the conversions (see compact_storage.get_storage_report)
+        - The manifest is written last (to a temporary file moved over the previous one), so it only lists complete shards
+       Returns the manifest
+    """
+    if shard_size<=0:
+        raise ValueError(f'The shard size must be positive, got {shard_size}')
+    num_samples=len(arrays['dataset'])
+    dtypes={name:np.dtype(array.dtype) for name,array in arrays.items()} if dtypes is None else dtypes
+    cast_errors={name:CastError() for name in arrays}
+    shards=write_shards(folder,arrays,shard_size,dtypes,compressed,cast_errors)
+
+    manifest={'version':MANIFEST_VERSION,
+              'num_samples':num_samples,
+              'shard_size':shard_size,
+              'standardized':standardized,
+              'statistics_file':statistics_file,
+              'graph_file':GRAPH_FILE,
+              'edge_list_file':EDGE_LIST_FILE,
+              'compressed':compressed,
+              'arrays':{name:{'dtype':np.dtype(dtypes[name]).str,'sample_shape':list(array.shape[1:])} for name,array in arrays.items()},
+              'storage':get_storage_report(arrays,dtypes,cast_errors),
+              'fault_types':FAULT_TYPES,
+              'class_counts':get_class_counts(arrays['fault_class_labels'][:num_samples]),
+              'shards':shards}
+    save_manifest(folder,manifest)
+    return manifest
+
+
+def write_shards(folder,arrays,shard_size,dtypes,compressed,cast_errors,first_shard=0,first_row=0):
+    """Write the arrays in shards of shard_size samples, numbered from first_shard, the rows of the dataset starting at first_row
+       Returns the entries of the shards for the manifest
+    """
+    num_samples=len(arrays['dataset'])
+    save=np.savez_compressed if compressed else np.savez
+    os.makedirs(os.path.join(folder,SHARD_FOLDER),exist_ok=True)
+
+    shards=[]
+    for shard_idx,start in enumerate(range(0,num_samples,shard_size),start=first_shard):
+        stop=min(start+shard_size,num_samples)
+        shard_file=os.path.join(SHARD_FOLDER,f'shard_{shard_idx:05d}.npz')
+        shard_path=os.path.join(folder,shard_file)
+        with timed('shard_export'):
+            with open(shard_path+'.tmp','wb') as file:
+                save(file,**{name:cast_array(array[start:stop],dtypes[name],cast_errors[name]) for name,array in arrays.items()})
+            os.replace(shard_path+'.tmp',shard_path)
+        shards.append({'file':shard_file,
+                       'start':first_row+start,
+                       'stop':first_row+stop,
+                       'num_samples':stop-start,
+                       'size_bytes':os.path.getsize(shard_path),
+                       'class_counts':get_class_counts(arrays['fault_class_labels'][start:stop]),
+                       'sha256':get_file_sha256(shard_path)})
+    return shards
+
+
+def append_shards(folder,arrays):
+    """Add samples to a sharded dataset: new shards after the last one (with the types, shard size and compression of the
+       manifest) and the manifest updated with them (number of samples, class counts and conversion errors)
+       Returns the updated manifest
+    """
+    manifest=load_manifest(folder)
+    num_samples=len(arrays['dataset'])
+    dtypes={name:np.dtype(manifest['arrays'][name]['dtype']) for name in arrays}
+    cast_errors={name:CastError() for name in arrays}
+    manifest['shards']+=write_shards(folder,arrays,manifest['shard_size'],dtypes,manifest['compressed'],cast_errors,
+                                     first_shard=len(manifest['shards']),first_row=manifest['num_samples'])
+    manifest['storage']=merge_storage_reports(manifest['storage'],get_storage_report(arrays,dtypes,cast_errors),
+                                              manifest['num_samples'],num_samples)
+    new_counts=get_class_counts(arrays['fault_class_labels'])
+    manifest['class_counts']={fault_type:manifest['class_counts'].get(fault_type,0)+new_counts[fault_type] for fault_type in FAULT_TYPES}
+    manifest['num_samples']+=num_samples
+    save_manifest(folder,manifest)
+    return manifest
+
+
+def save_manifest(folder,manifest):
+    manifest_path=os.path.join(folder,MANIFEST_FILE)
+    with open(manifest_path+'.tmp','w') as json_file:
+        json.dump(manifest,json_file,indent=4)
+    os.replace(manifest_path+'.tmp',manifest_path)
+
+
+def load_manifest(folder):
+    manifest_path=os.path.join(folder,MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        raise FileNotFoundError(f'No {MANIFEST_FILE} in {folder}, the dataset was not exported with --dataset-format sharded')
+    with open(manifest_path) as json_file:
+        return json.load(json_file)
+
+
+def load_shard(folder,shard,names=None,verify=False):
+    """Load the arrays of one shard of the manifest
+        - names: arrays to load (all the arrays of the shard by default)
+        - verify: check the sha256 checksum of the shard file first
+    """
+    shard_path=os.path.join(folder,shard['file'])
+    if verify and get_file_sha256(shard_path)!=shard['sha256']:
+        raise ValueError(f"Checksum mismatch for {shard['file']}, the shard is corrupted or incomplete")
+    with np.load(shard_path) as saved:
+        return {name:saved[name] for name in (saved.files if names is None else names)}
+
+
+def load_graph(folder):
+    """Load the edge list and the dictionaries stored by save_graph
+       Returns (edge_list_by_bus_id, neighborhood_dict_1_hop_by_bus_name, neighborhood_dict_2_hop_by_bus_name, bus_id_map)
+    """
+    with open(os.path.join(folder,GRAPH_FILE)) as json_file:
+        graph=json.load(json_file)
+    return np.load(os.path.join(folder,EDGE_LIST_FILE)),graph['1_hop_by_bus_name'],graph['2_hop_by_bus_name'],graph['bus_id_map']
@@ -0,0 +1,191 @@
+#Imports
+# Additional Library Imports
+import numpy as np
+
+
+class FakeDSS:
+    """Deterministic in-process stand-in for the py_dss_interface.DSSDLL methods used by the dataset generation
+      - Synthesizes a radial feeder with num_buses buses (a mix of one, two and three-phase buses), one line per bus
+        to its parent bus and loads on part of the buses
+      - The text commands of the fault simulation (New/Edit Fault, enabled=NO, load KW, Solve) and the kW written through
+        the Loads interface are interpreted, every solve computes synthetic node voltages from the enabled faults and the load values
+      - The same num_buses and seed always give the same feeder and the same voltages
+    It is only meant to time the Python side of the pipeline without the OpenDSS library (see benchmark.py)
+    """
+
+    def __init__(self,num_buses=10000,seed=0,load_ratio=0.4):
+        rng=np.random.default_rng(seed)
+        self.bus_names=['sourcebus']+[f'bus{idx}' for idx in range(1,num_buses)]
+        self.bus_index={bus:idx for idx,bus in enumerate(self.bus_names)}
+
+        # Radial feeder: every bus is connected to one of the few buses created before it
+        self.parents=np.array([-1]+[int(rng.integers(max(0,idx-8),idx)) for idx in range(1,num_buses)])
+        self.depth=np.zeros(num_buses,dtype=np.int64)
+        for idx in range(1,num_buses):
+            self.depth[idx]=self.depth[self.parents[idx]]+1
+
+        # Nodes of each bus: the first buses form a three-phase trunk, the laterals have one, two or three phases
+        self.bus_nodes_list=[]
+        for idx in range(num_buses):
+            num_phases=3 if idx<max(1,num_buses//10) else int(rng.choice([1,2,3],p=[0.4,0.2,0.4]))
+            self.bus_nodes_list.append(sorted(rng.choice([1,2,3],size=num_phases,replace=False).tolist()))
+
+        # Lines (power delivery elements) and loads
+        self.lines=[(f'Line.l{idx}',self.bus_names[self.parents[idx]],self.bus_names[idx]) for idx in range(1,num_buses)]
+        self.bus_lines={bus:[] for bus in self.bus_names}
+        for line,bus1,bus2 in self.lines:
+            self.bus_lines[bus1].append(line)
+            self.bus_lines[bus2].append(line)
+        self.loads={f'Load.ld{idx}':idx for idx in range(1,num_buses) if rng.random()<load_ratio}
+        self.load_names=list(self.loads)
+        self.bus_loads={bus:[] for bus in self.bus_names}
+        for load,idx in self.loads.items():
+            self.bus_loads[self.bus_names[idx]].append(load)
+        self.compile()
+
+    def compile(self):
+        """Reset the circuit to the synthesized feeder (what compiling the feeder does in OpenDSS)
+        """
+        self.extra_nodes={}                                                                                             # Nodes added to a bus by a fault (e.g. node 4 of the LLL faults)
+        self.faults={}                                                                                                  # Fault name -> (bus index, nodes, resistance, enabled)
+        self.load_kw={load:50.0 for load in self.loads}
+        self.active_bus=0
+        self.active_element=None
+        self.active_pde=0
+        self.active_load=0
+        self.update_node_index()
+        self.solve()
+
+    def update_node_index(self):
+        self.node_bus=[]
+        self.node_phase=[]
+        self.node_names=[]
+        for idx,bus in enumerate(self.bus_names):
+            for node in self.bus_nodes_list[idx]+self.extra_nodes.get(idx,[]):
+                self.node_bus.append(idx)
+                self.node_phase.append(node)
+                self.node_names.append(f'{bus}.{node}')
+        self.node_bus=np.array(self.node_bus)
+        self.node_phase=np.array(self.node_phase)
+
+    def add_node(self,bus_idx,node):
+        """Add a node to a bus (after its last node) like OpenDSS does when an element is connected to a new node
+        """
+        self.extra_nodes.setdefault(bus_idx,[]).append(node)
+        position=int(np.searchsorted(self.node_bus,bus_idx,side='right'))
+        self.node_bus=np.insert(self.node_bus,position,bus_idx)
+        self.node_phase=np.insert(self.node_phase,position,node)
+        self.node_names.insert(position,f'{self.bus_names[bus_idx]}.{node}')
+
+    # Text interface
+    def text(self,command):
+        command_lower=command.strip().lower()
+        if command_lower.startswith('compile'):
+            self.compile()
+        elif command_lower.startswith('solve'):
+            self.solve()
+        elif command_lower.startswith('new fault.') or command_lower.startswith('edit fault.'):
+            self.set_fault(command_lower)
+        elif command_lower.startswith('fault.') and command_lower.endswith('.enabled=no'):
+            name=command_lower.split('.enabled')[0]
+            if name in self.faults:
+                self.faults[name]=self.faults[name][:3]+(False,)
+        elif command_lower.startswith('get loadmult'):
+            return '1'
+        elif command_lower.startswith('load.') and '.kw=' in command_lower:
+            load,kw=command.split('=')
+            self.load_kw[load.rsplit('.',1)[0]]=float(kw)
+        return ''
+
+    def set_fault(self,command):
+        tokens=command.split()
+        name=tokens[1]
+        settings=dict(token.split('=',1) for token in tokens[2:])
+        bus,*nodes=settings['bus1'].split('.')
+        bus_idx=self.bus_index[bus]
+        for node in settings.get('bus2','').split('.')[1:]+nodes:
+            if int(node)>3 and int(node) not in self.extra_nodes.get(bus_idx,[]):
+                self.add_node(bus_idx,int(node))
+        self.faults[name]=(bus_idx,[int(node) for node in nodes if 0<int(node)<=3],float(settings.get('r',0)),settings.get('enabled','yes')=='yes')
+
+    def solve(self):
+        """Synthetic power flow: the voltage drops with the depth of the bus and the load, and an enabled fault
+           depresses the voltage of its phases around the faulted bus (the lower the resistance, the deeper the dip)
+        """
+        load_factor=sum(self.load_kw.values())/(50.0*max(1,len(self.load_kw)))
+        depth=self.depth[self.node_bus]
+        vmag=1.0-0.0005*depth*load_factor
+        for bus_idx,nodes,resistance,enabled in self.faults.values():
+            if not enabled:
+                continue
+            distance=np.abs(depth-self.depth[bus_idx])
+            dip=np.exp(-distance/10.0)/(1.0+resistance)
+            vmag=vmag*(1.0-0.9*dip*np.isin(self.node_phase,nodes))
+        angle=np.radians(-120.0*(self.node_phase-1)-0.01*depth)
+        self.vmag_pu=vmag
+        self.volts=np.empty(2*len(vmag))
+        self.volts[0::2]=vmag*2400*np.cos(angle)
+        self.volts[1::2]=vmag*2400*np.sin(angle)
+
+    # Circuit interface
+    def circuit_all_bus_names(self):
+        return list(self.bus_names)
+
+    def circuit_all_node_names(self):
+        return list(self.node_names)
+
+    def circuit_all_bus_vmag_pu(self):
+        return self.vmag_pu.tolist()
+
+    def circuit_all_bus_volts(self):
+        return self.volts.tolist()
+
+    def circuit_set_active_bus(self,bus):
+        self.active_bus=self.bus_index.get(bus.split('.')[0].lower(),-1)
+        return self.active_bus
+
+    def circuit_set_active_element(self,element):
+        self.active_element=element.lower()
+        return 0
+
+    # Bus interface
+    def bus_nodes(self):
+        return self.bus_nodes_list[self.active_bus]+self.extra_nodes.get(self.active_bus,[])
+
+    def bus_load_list(self):
+        return list(self.bus_loads[self.bus_names[self.active_bus]])
+
+    def bus_all_pde_active_bus(self):
+        return list(self.bus_lines[self.bus_names[self.active_bus]])
+
+    # Loads interface
+    def loads_all_names(self):
+        return [load.split('.',1)[1] for load in self.load_names]
+    
+    def loads_write_idx(self,idx):
+        self.active_load=idx-1
+    
+    def loads_read_kw(self):
+        return self.load_kw[self.load_names[self.active_load]]
+    
+    def loads_write_kw(self,kw):
+        self.load_kw[self.load_names[self.active_load]]=float(kw)
+    
+    # Power delivery elements and circuit elements interface
+    def pdelements_first(self):
+        self.active_pde=1 if self.lines else 0
+        return self.active_pde
+
+    def pdelements_next(self):
+        self.active_pde=self.active_pde+1 if self.active_pde<len(self.lines) else 0
+        return self.active_pde
+
+    def cktelement_read_bus_names(self):
+        _,bus1,bus2=self.lines[self.active_pde-1]
+        return [f'{bus1}.1.2.3',f'{bus2}.1.2.3']
+
+    def cktelement_currents(self):
+        bus_idx,nodes,resistance,enabled=self.faults.get(self.active_element,(0,[],0.0,False))
+        current=2400.0/(resistance+0.1+0.01*self.depth[bus_idx]) if enabled else 0.0
+        return [current,0.0]*max(1,len(nodes))
+
@@ -1,359 +1,634 @@
 import py_dss_interface    
 
 # Python Built-in Modules Import
-import itertools
+import os
 from collections import Counter
 
 # Additional Library Imports
 import numpy as np
 from tqdm import tqdm
-from sklearn.preprocessing import StandardScaler
 from print_color import print
 
+# Local Imports
+from normalization import RunningStatistics
+from scenarios import FAULT_CLASS_MAP, FAULT_TYPES, FAULT_SETTINGS, build_scenario_table
+from fault_sweep import PROBE_RESISTANCE, get_fault_branches, sweep_fault_resistances
+from feature_extractors import get_feature_channels, build_feature_extractors
+from instrumentation import timed
+
  
 
+# Dataset and label arrays filled by the simulation
+RESULT_ARRAYS=['dataset','fault_detection_labels','fault_location_labels','fault_class_labels','fault_resistance_labels','fault_currents_labels']
+
+
 class FaultSimulation:
     
     """Fault Simulation Class 
-      - get_features --> Gets the voltage magnitude and phase values of all the buses in the feeder system 
-      - standardize --> Perform standarization to the feature matrix with StandardScaler()
+      - allocate --> Allocates the dataset and label arrays for all the samples before the simulation starts
+      - get_features --> Gets the voltage magnitude and phase values of all the buses in the feeder system (and the extra channels of feature_channels)
+      - standardize --> Perform standarization to the feature matrix (same as StandardScaler() for each bus)
+      - get_scenarios --> Gets the scenario table (one row per sample) of all the fault types or of a single one
+      - simulate_scenarios --> Simulates rows of the scenario table (a repeated scenario is copied instead of solved again)
+      - set_load_kw --> Writes the kW of the connected loads through the Loads interface (restore_base_loads writes back the original ones)
+      - sweep_fault_location --> Computes the samples of all the fault resistances of a fault location from a few probe solves
+      - set_fault --> Moves the pooled Fault element of a fault type to a new location
       - fault_simulation_lg --> Perform Line to Ground Fault Simulation 
       - fault_simulation_ll --> Perform Line to Line Fault Simulation 
       - non_fault_simulation --> Perform a simulation for non-fault events
       
     """
     
-    def __init__(self,dss,feeder,fault_information):
+    def __init__(self,dss,feeder,fault_information,show_progress=True,output_folder=None,solve_cache=True,fault_sweep='no',sweep_tolerance=1e-6,
+                 load_sampling='same',feature_channels=()):
         
         self.dss=dss
         self.feeder=feeder
         self.fault_information=fault_information
+        self.show_progress=show_progress                                                                                 # Disabled inside the worker processes of the parallel engine
+        self.output_folder=output_folder                                                                                 # Folder of the memory-mapped dataset and labels (kept in memory if None)
         
         # Dictionary that maps fault types to a integer number
-        self.fault_class_map={'LG':0,'LL':1,'LLG':2,'LLL':3,'LLLG':4,'Non_Fault':5}  
-        
-        # Separate lists to contain the feature matrics by fault type                
-        self.dataset_lg=[]                                                                                                                  
-        self.dataset_ll=[]                                                                                                                 
-        self.dataset_llg=[]                                                                                                                      
-        self.dataset_lll=[] 
-        self.dataset_lllg=[] 
-        self.dataset_non_fault=[] 
-        
-        # List to contain the entire fault dataset
-        self.dataset=[]
-        
-        # Separate lists to hold the labels for the fault 
-        self.fault_detection_labels=[]
-        self.fault_location_labels=[]    
-        self.fault_class_labels=[]  
-        self.labels_by_fault_node_name=[]                                                                                                                                                                                                                    
-        self.fault_resistance_labels=[]                                                                                                               
-        self.fault_currents_labels=[]
+        self.fault_class_map=FAULT_CLASS_MAP
+        
+        # Scenario table of all the fault types (built once on first use, see get_scenarios)
+        self.scenarios=None
+        
+        # Pooled Fault element of each fault type (see set_fault)
+        self.fault_pool={}
+        
+        # Last solved scenario and its row in the dataset (see simulate_scenarios)
+        self.solve_cache=solve_cache                                                                                     # Copy the sample of a scenario identical to the last solved one instead of solving it again
+        self.cached_sample=None
+        self.skipped_solves=0
+        
+        # Loads of the non-fault events (see set_load_kw)
+        self.load_sampling=load_sampling                                                                                 # same: the load value of the event for all the loads, per-load: a value of load_values for each load
+        self.load_indices=None                                                                                           # Index of each connected load in the Loads interface
+        self.base_load_kw=None                                                                                           # kW of the connected loads before the first non-fault event
+        self.load_mult=None                                                                                              # Load multiplier of the circuit (see set_load_kw)
+        self.loads_changed=False
+        
+        # Analytical fault resistance sweep (see sweep_fault_location)
+        self.fault_sweep=fault_sweep                                                                                     # no: full solves, yes: sweep, validate: full solves checked against the sweep
+        self.sweep_tolerance=sweep_tolerance                                                                             # Largest difference of the features (and relative difference of the fault current) in validate mode
+        self.sweep_max_error=0.0
+        self.sweep_fallbacks=0                                                                                           # Fault locations solved sample by sample because the check of their sweep failed
+        self.base_voltages=None                                                                                          # Node voltages without fault and volts per unit of each node
+        
+        # Position of the nodes in the feature matrix and in the circuit (see build_feature_index_map and get_features)
+        self.feature_index_map_built=False
+        self.circuit_node_names=None
+        self.circuit_voltages=None                                                                                       # Complex voltage of all the nodes of the circuit at the last read (see read_node_voltages)
+        self.voltage_reads=0
+        
+        # Extra channels of the features after the 6 voltage channels (see feature_extractors), built on first use
+        self.feature_channels=list(feature_channels)
+        self.num_features=len(get_feature_channels(self.feature_channels))
+        self.feature_extractors=None
+        self.branch_network=None
+        
+        # Preallocated dataset and label arrays (see allocate)
+        self.dataset=None
+        
+    def allocate(self,num_samples,resume=False):
+        """Allocate the dataset and label arrays for num_samples samples
+           Each solve writes its features and labels in place at the next row (see store_sample)
+           If output_folder is set the arrays are memory-mapped .npy files (dataset.npy, fault_detection_labels.npy, ...)
+           so the samples are written straight to disk. With resume the existing files are opened instead of created
+        """
+        # Shape and type of the dataset and of the labels for the fault 
+        result_arrays={'dataset':((num_samples,len(self.feeder.bus_list),self.num_features),np.float64),
+                       'fault_detection_labels':((num_samples,),np.int64),
+                       'fault_location_labels':((num_samples,),np.int64),
+                       'fault_class_labels':((num_samples,),np.int64),
+                       'fault_resistance_labels':((num_samples,),np.float64),
+                       'fault_currents_labels':((num_samples,),np.float64)}
+        
+        for name,(shape,dtype) in result_arrays.items():
+            if self.output_folder is None:
+                array=np.zeros(shape,dtype=dtype)
+            elif resume:
+                array=np.lib.format.open_memmap(os.path.join(self.output_folder,f'{name}.npy'),mode='r+')
+                if array.shape!=shape or array.dtype!=dtype:
+                    raise ValueError(f'{name}.npy has shape {array.shape} and type {array.dtype}, expected {shape} and {np.dtype(dtype)}')
+            else:
+                array=np.lib.format.open_memmap(os.path.join(self.output_folder,f'{name}.npy'),mode='w+',dtype=dtype,shape=shape)
+            setattr(self,name,array)
+        
+        # Number of samples written so far and their per-bus mean and variance (updated with each sample)
+        self.num_simulated=0
+        self.statistics=RunningStatistics((len(self.feeder.bus_list),self.num_features))
+        self.cached_sample=None                                                                                          # The cached row belongs to the previous arrays
+        self.skipped_solves=0
+        self.sweep_max_error=0.0
+        self.sweep_fallbacks=0
     
+    def get_solve_counters(self):
+        return {'skipped_solves':self.skipped_solves,'sweep_max_error':self.sweep_max_error,'sweep_fallbacks':self.sweep_fallbacks}
+    
+    def merge_solve_counters(self,solve_counters):
+        """Add the counters of a shard simulated by a worker process (see get_solve_counters)
+        """
+        self.skipped_solves+=solve_counters['skipped_solves']
+        self.sweep_max_error=max(self.sweep_max_error,solve_counters['sweep_max_error'])
+        self.sweep_fallbacks+=solve_counters['sweep_fallbacks']
+    
+    def get_load_indices(self):
+        """Index of each load of feeder.connected_loads_name in the Loads interface of OpenDSS (computed once)
+        """
+        if self.load_indices is None:
+            load_index={load.lower():idx for idx,load in enumerate(self.dss.loads_all_names(),start=1)}
+            self.load_indices=[load_index[load.split('.',1)[1].lower()] for load in self.feeder.connected_loads_name]
+        return self.load_indices
+    
+    def set_load_kw(self,kw_values):
+        """Write the kW of the connected loads (a single value for all of them or one value per load)
+           The values are written through the Loads interface, the text commands (one Load.<name>.KW=... per load) are parsed much slower
+        """
+        load_indices=self.get_load_indices()
+        if self.base_load_kw is None:
+            self.base_load_kw=self.get_load_kw()
+            self.load_mult=float(self.dss.text('Get LoadMult'))
+        with timed('load_commands'):
+            for idx,kw in zip(load_indices,np.broadcast_to(np.asarray(kw_values,dtype=np.float64),len(load_indices)).tolist()):
+                self.dss.loads_write_idx(idx)
+                self.dss.loads_write_kw(kw)
+            
+            # The Loads interface does not invalidate the admittance of the loads, which Solve mode=direct is solved with.
+            # Changing the load multiplier (and setting it back) makes OpenDSS rebuild the admittances of all the loads
+            self.dss.text(f'Set LoadMult={self.load_mult+1}')
+            self.dss.text(f'Set LoadMult={self.load_mult}')
+        self.loads_changed=True
+        self.base_voltages=None                                                                                          # The voltages without fault change with the loads
+    
+    def get_load_kw(self):
+        kw_values=[]
+        for idx in self.get_load_indices():
+            self.dss.loads_write_idx(idx)
+            kw_values.append(self.dss.loads_read_kw())
+        return kw_values
+    
+    def restore_base_loads(self):
+        """Write back the kW the connected loads had before the first non-fault event, so the next faults are simulated on the original circuit
+        """
+        if self.loads_changed:
+            self.set_load_kw(self.base_load_kw)
+            self.loads_changed=False
+    
+    def get_event_load_kw(self,load_value):
+        """kW of the connected loads for a non-fault event
+            - same: the load value of the event for all the loads
+            - per-load: a value of fault_information.load_values (or of the load values of the faults) drawn for each load, the
+              draws are seeded with the load value of the event so they are the same in serial, parallel and resumed runs
+        """
+        if self.load_sampling=='same':
+            return load_value
+        rng=np.random.default_rng(int(np.float64(load_value).view(np.uint64)))
+        load_values=self.fault_information.load_values if self.fault_information.load_values is not None else self.fault_information.fault_load_values
+        return rng.choice(np.asarray(load_values,dtype=np.float64),size=len(self.get_load_indices()))
+    
+    def store_sample(self,fault_type,fault_location,fault_resistance,fault_current,features=None):
+        """Write the features of the last solve (or the given features) and its labels at the next row of the preallocated arrays
+        """
+        row=self.num_simulated
+        if features is None:
+            self.get_features(out=self.dataset[row])
+        else:
+            self.dataset[row]=features
+        self.statistics.update(self.dataset[row])
+        self.fault_detection_labels[row]=0 if fault_type=='Non_Fault' else 1
+        self.fault_class_labels[row]=self.fault_class_map[fault_type]
+        self.fault_location_labels[row]=fault_location
+        self.fault_resistance_labels[row]=fault_resistance
+        self.fault_currents_labels[row]=fault_current
+        self.num_simulated+=1
+    
+    def get_results(self):
+        """Return the dataset and label arrays of the samples simulated so far (views, no copy)
+        """
+        return {name:getattr(self,name)[:self.num_simulated] for name in RESULT_ARRAYS}
+    
+    def store_results(self,results,row):
+        """Copy the dataset and label arrays of a shard (see get_results) starting at a row of the preallocated arrays
+        """
+        for name in RESULT_ARRAYS:
+            values=results[name]
+            getattr(self,name)[row:row+len(values)]=values
+        self.num_simulated=max(self.num_simulated,row+len(results['dataset']))
+    
+    def get_fault_type_dataset(self,fault_type):
+        """Return the samples of a fault type (copy)
+        """
+        return self.dataset[:self.num_simulated][self.fault_class_labels[:self.num_simulated]==self.fault_class_map[fault_type]]
                                                                                                                                                     
-    def get_features(self):    
+    def build_feature_index_map(self):
+        """Map every node of feeder.nodes to its position in the feature matrix (computed once)
+           - feature_rows/feature_cols: row (bus) and column (magnitude, the angle is the next column) of the node
+           - angle_conversions: number of degree to radian conversions applied to the angle of the node. The 
+             per-bus loop this replaces converted the angles of a bus again after inserting each of its nodes,
+             the conversions are kept so the features stay the same as in the previously generated datasets
+        """
+        mapping_dict={1:0,2:2,3:4}                                                                                       # Column of the magnitude of each phase
+        bus_index={bus:idx for idx,bus in enumerate(self.feeder.bus_list)}
+        
+        # Phases (node 1, 2, 3) of each bus in the order the nodes are returned by OpenDSS
+        bus_phases={}
+        for node in self.feeder.nodes:
+            bus,phase=node.rsplit('.',1)
+            if int(phase) in mapping_dict:
+                bus_phases.setdefault(bus,[]).append(node)
+        
+        self.feature_nodes=[]                                                                                            # Nodes of the features, also the node order of read_node_voltages
+        feature_rows,feature_cols,angle_conversions=[],[],[]
+        for bus,phase_nodes in bus_phases.items():
+            for position,node in enumerate(phase_nodes):
+                self.feature_nodes.append(node)
+                feature_rows.append(bus_index[bus])
+                feature_cols.append(mapping_dict[int(node.rsplit('.',1)[1])])
+                angle_conversions.append(len(phase_nodes)-position)
+                
+        self.feature_rows=np.array(feature_rows)
+        self.feature_cols=np.array(feature_cols)
+        self.angle_conversions=np.array(angle_conversions)
+        self.feature_node_index={node:idx for idx,node in enumerate(self.feature_nodes)}
+        self.feature_index_map_built=True
+    
+    def read_node_voltages(self):
+        """Return the voltage amplitude (in per unit) and the complex voltage of the nodes of feature_nodes after the last solve
+           The voltages of all the nodes are read with circuit-wide queries
+        """
+        if not self.feature_index_map_built:
+            self.build_feature_index_map()
+        
+        # Position of the feeder nodes in the node order of the circuit (changes when a fault adds a node to a bus)
+        node_names=self.dss.circuit_all_node_names()
+        if node_names!=self.circuit_node_names:
+            circuit_node_index={node:idx for idx,node in enumerate(node_names)}
+            self.circuit_node_positions=np.array([circuit_node_index[node] for node in self.feature_nodes])
+            self.circuit_node_names=node_names
+            
+        vmag_pu=np.asarray(self.dss.circuit_all_bus_vmag_pu())[self.circuit_node_positions]                                   # Voltage amplitude (in per unit) of all the nodes
+        volts=np.asarray(self.dss.circuit_all_bus_volts(),dtype=np.float64)                                                   # Complex voltage (real and imaginary parts) of all the nodes
+        self.circuit_voltages=volts.view(np.complex128)                                                                       # Kept for the extractors of the branch channels
+        self.voltage_reads+=1
+        return vmag_pu,self.circuit_voltages[self.circuit_node_positions]
+    
+    def get_features(self,out=None):    
         """
         Get features of all the buses in the feeder system
+         - out: zero-initialized (num_buses, num_features) array to write the features into (a new matrix is allocated by default)
         """                                                                                
-        feature_vec_dim=6                                                                                                    # Dimension of the feature vectors
-        mapping_dict={1:0,2:2,3:4}                                                                                      
-        data_template= np.zeros((len(self.feeder.bus_list),feature_vec_dim),dtype=np.float64)                                # Initialize the feature matrix each time
-        
-        for data_index,active_bus in enumerate(self.feeder.bus_list):                                                        # Enumerate over all the buses 
-            self.dss.circuit_set_active_bus(active_bus)                                                                      # Set a active bus 
-            active_bus_feature=self.dss.bus_pu_vmag_angle()                                                                  # Get the voltage amplitude (in per unit) and angle (in degrees) of the active bus
-            count=0                                                                                                          # Set count variable to 0
-                                                                                                                                                
-            for node in self.dss.bus_nodes():                                                                                # Loop over the nodes of the bus
-                if node !=4: 
-                    data_template[data_index,mapping_dict[node]:mapping_dict[node]+2]=active_bus_feature[count:count+2]          # Insert features in appropriate positions
-                    count=count+2                                                                                                # Increase count variable
-                    data_template[data_index,1::2]=np.radians(data_template[data_index,1::2])                                    # Convert the angle from degree unit to radian unit
+        vmag_pu,voltages=self.read_node_voltages()
+        angles=np.degrees(np.arctan2(voltages.imag,voltages.real))                                                           # Voltage angle (in degrees) of all the nodes
+        features=self.fill_features(vmag_pu,angles,out)
+        self.fill_extra_features(voltages,features)
+        return features
+    
+    def get_feature_extractors(self):
+        """Return the extractors of the extra channels with their columns (see feature_extractors.build_feature_extractors), built once
+        """
+        if self.feature_extractors is None:
+            if not self.feature_index_map_built:
+                self.build_feature_index_map()
+            self.feature_extractors=build_feature_extractors(self)
+        return self.feature_extractors
+    
+    def fill_extra_features(self,voltages,features):
+        """Write the extra channels computed from the complex voltages of the nodes of feature_nodes (and from the voltages of all
+           the nodes of the circuit for the branch channels) after the voltage channels of the features
+        """
+        for extractor,columns in self.get_feature_extractors():
+            extractor.fill(self,voltages,features[...,columns])
+    
+    def fill_features(self,vmag_pu,angles,out=None):
+        """Scatter the voltage amplitude and angle (in degrees) of the nodes of feature_nodes into the feature matrix
+           The node axis is the last axis, a leading sample axis gives a (num_samples, num_buses, num_features) array
+           The extra channels are left at 0 (see fill_extra_features)
+        """
+        feature_vec_dim=self.num_features                                                                                    # Dimension of the feature vectors
+        
+        # Convert the angle from degree unit to radian unit
+        for conversion in range(1,self.angle_conversions.max(initial=0)+1):
+            converted=self.angle_conversions>=conversion
+            angles[...,converted]=np.radians(angles[...,converted])
+        
+        data_template= np.zeros(vmag_pu.shape[:-1]+(len(self.feeder.bus_list),feature_vec_dim),dtype=np.float64) if out is None else out
+        data_template[...,self.feature_rows,self.feature_cols]=vmag_pu                                                       # Insert features in appropriate positions
+        data_template[...,self.feature_rows,self.feature_cols+1]=angles
                     
         return  data_template    
     
+    def sweep_fault_location(self,fault_type,bus_id,node1,node2,resistances):
+        """Return the features and fault current labels of a fault location for a vector of fault resistances (see fault_sweep)
+            - The voltages without fault are solved once (again after a non-fault event changed the loads)
+            - Each branch of the Fault element is solved once alone with the probe resistance, which gives the voltage change
+              of all the nodes for a unit current in the branch
+            - The voltages for all the resistances are then computed at once, without solving the power flow
+            - The sample of the smallest resistance (largest fault current, where the sweep is the least accurate, e.g. the
+              angles of the nearly zero voltages of a bolted fault) is checked against a full solve
+           Returns None if a faulted node is not a node of the features, if an extra channel needs the voltages of all the
+           nodes of the circuit or if the check differs by more than sweep_tolerance (the fault location is solved sample by sample)
+        """
+        if not self.feature_index_map_built:
+            self.build_feature_index_map()
+        if any(extractor.needs_circuit_voltages for extractor,_ in self.get_feature_extractors()):
+            return None
+        bus=self.feeder.bus_list[bus_id]
+        branches,conductance_factor,current_weights=get_fault_branches(fault_type,node1,node2)
+        if any(f'{bus}.{node}' not in self.feature_node_index for branch in branches for node in branch if node!=0):
+            return None
+        
+        self.release_fault_pool()                                                                                        # The probes are solved without any other fault
+        if self.base_voltages is None:
+            self.dss.text(f'Solve mode=direct')
+            vmag_pu,voltages=self.read_node_voltages()
+            magnitudes=np.abs(voltages)
+            self.base_voltages=(voltages,np.divide(magnitudes,vmag_pu,out=np.ones_like(magnitudes),where=vmag_pu>0))
+        base_voltages,volts_per_unit=self.base_voltages
+        
+        incidence=np.zeros((len(base_voltages),len(branches)))
+        transfer_impedances=np.zeros((len(base_voltages),len(branches)),dtype=np.complex128)
+        for branch,(node_a,node_b) in enumerate(branches):
+            incidence[self.feature_node_index[f'{bus}.{node_a}'],branch]=1
+            if node_b!=0:
+                incidence[self.feature_node_index[f'{bus}.{node_b}'],branch]=-1
+            fault_obj=self.set_fault('Probe',f'Bus1={bus}.{node_a} Bus2={bus}.{node_b} Phases=1 r={PROBE_RESISTANCE}')
+            self.dss.text(f'Solve mode=direct')
+            self.dss.circuit_set_active_element(fault_obj)
+            currents=self.dss.cktelement_currents()
+            _,voltages=self.read_node_voltages()
+            transfer_impedances[:,branch]=-(voltages-base_voltages)/complex(currents[0],currents[1])
+        self.dss.text(f'{fault_obj}.enabled=NO')
+        
+        voltages,fault_currents=sweep_fault_resistances(base_voltages,transfer_impedances,incidence,conductance_factor,current_weights,resistances)
+        features=self.fill_features(np.abs(voltages)/volts_per_unit,np.degrees(np.arctan2(voltages.imag,voltages.real)))
+        self.fill_extra_features(voltages,features)
+        fault_currents=np.abs(fault_currents.real)
+        
+        # Full solve of the smallest resistance to check the sweep
+        check=int(np.argmin(resistances))
+        fault_settings=FAULT_SETTINGS[fault_type].format(bus=bus,node1=node1,node2=node2)
+        fault_obj=self.set_fault(fault_type,f'{fault_settings} r={resistances[check]}')
+        self.dss.text(f'Solve mode=direct')
+        self.dss.circuit_set_active_element(fault_obj)
+        fault_current=abs(self.dss.cktelement_currents()[0])
+        check_error=max(np.abs(self.get_features()-features[check]).max(),abs(fault_current-fault_currents[check])/max(1.0,fault_current))
+        self.dss.text(f'{fault_obj}.enabled=NO')
+        if check_error>self.sweep_tolerance:
+            self.sweep_fallbacks+=1
+            return None
+        return features,fault_currents
+    
+    def validate_sweep(self,row,features,fault_current):
+        """Compare the sample of a full solve (row of the dataset) with the sample computed by sweep_fault_location
+        """
+        feature_error=np.abs(self.dataset[row]-features).max()
+        current_error=abs(self.fault_currents_labels[row]-fault_current)/max(1.0,abs(self.fault_currents_labels[row]))
+        self.sweep_max_error=max(self.sweep_max_error,feature_error,current_error)
+        if max(feature_error,current_error)>self.sweep_tolerance:
+            raise ValueError(f'The fault resistance sweep differs from the full solve of sample {row} (feature error {feature_error:.3g}, '
+                             f'relative current error {current_error:.3g}, tolerance {self.sweep_tolerance:.3g})')
     
     def standardize(self,final_dataset):
-        scalers = {}
-        for i in range(final_dataset.shape[1]):
-            scalers[i] = StandardScaler()
-            final_dataset[:, i, :] = scalers[i].fit_transform(final_dataset[:, i, :])         
-            
-        return final_dataset                                                                               
+        """Standardize the features of each bus (in place) with the mean and variance of final_dataset
+        """
+        statistics=RunningStatistics(final_dataset.shape[1:])
+        statistics.update(final_dataset)
+        return statistics.transform(final_dataset,out=final_dataset)                                                                               
 
+    def get_scenarios(self,fault_type=None):
+        """Return the scenario table (see scenarios.build_scenario_table) of all the fault types, or the rows of a 
+           fault type (view). The table is built once, the parallel engine and the checkpoints slice it into shards
+        """
+        if self.scenarios is None:
+            self.scenarios=build_scenario_table(self.feeder,self.fault_information)
+        if fault_type is None:
+            return self.scenarios
         
-    def fault_simulation_lg(self):
-        """Perform LG Fault Simulation
+        # The rows are sorted by fault class
+        fault_class=self.fault_class_map[fault_type]
+        start,stop=np.searchsorted(self.scenarios['fault_class'],[fault_class,fault_class+1])
+        return self.scenarios[start:stop]
+    
+    def set_fault(self,fault_type,fault_settings):
+        """Re-target the pooled Fault element of a fault type and return its name
+           A single Fault element is created for each fault type and edited for every sample, 
+           so the circuit does not grow with the number of simulated samples
         """
-        # Keep track of number of simulations (for debugging purpose)
-        count_lg=0
-
-        # Enumerate over the fault name and fault nodes
-        for fault_name,fault_node in tqdm(zip(self.feeder.nodes_by_name,self.feeder.nodes),desc="LG Fault Simulation",total=len(self.feeder.nodes)): 
-            self.dss.circuit_set_active_bus(fault_name.split('_')[0])                                                       # Set a particular bus to be active
-            if len(self.dss.bus_nodes())==3:                                                                                # Check if the bus has 3 nodes | If the bus has 3 nodes only then we create the fault   
-                for idx,fr in enumerate(self.fault_information.fault_resistances):                                          # Enumerate over the fault resistnace                              
-                    fault_obj=f'Fault.{fault_name}_{str(idx)}'
-                    
-                    fault_command = f'New Fault.{fault_name}_{str(idx)} Bus1={fault_node} Phases=1 r={fr}'                  # Command for the LG Fault
-                    fault_obj_deactivate_command=f'Fault.{fault_name}_{str(idx)}.enabled=NO'                                # Command for the Fault Object Deactivation
-                     
-                    self.dss.text(fault_command)                                                                            # Execute the LG Fault command
-                    self.dss.text(f'Solve mode=direct')                                                                     # Run Power Flow in Direct mode
-                    
-                    # Get the features of the buses 
-                    self.dataset.append(self.get_features())                                                        
-                    self.dataset_lg.append(self.get_features())              
-                                                    
-                    # Get the labels 
-                    self.fault_detection_labels.append(1)                                                                                      
-                    self.fault_class_labels.append(self.fault_class_map['LG'])                                             
-                    self.fault_location_labels.append(self.feeder.bus_id_map[fault_name.split('_')[0]])                                 
-                    self.fault_resistance_labels.append(fr)                                                                 
-                    self.dss.circuit_set_active_element(fault_obj)                                                         # Set the fault object as active element to get the current 
-                    self.fault_currents_labels.append(abs(self.dss.cktelement_currents()[0]))
-                    
-                    # Execute the fault object deactivation command
-                    self.dss.text(fault_obj_deactivate_command)      
+        fault_obj=self.fault_pool.get(fault_type)
+        if fault_obj is None:
+            fault_obj=f'Fault.pool_{fault_type.lower()}'
+            self.dss.text(f'New {fault_obj} {fault_settings}')                                                           # Create the Fault element the first time the fault type is simulated
+            self.fault_pool[fault_type]=fault_obj
+        else:
+            self.dss.text(f'Edit {fault_obj} {fault_settings} enabled=yes')                                              # Move the Fault element to the new location
+        return fault_obj
+    
+    def release_fault_pool(self):
+        """Disable the pooled Fault elements once a fault simulation is done
+        """
+        for fault_obj in self.fault_pool.values():
+            self.dss.text(f'{fault_obj}.enabled=NO')
+    
+    def get_num_samples(self,fault_type=None,shard=slice(None)):
+        """Return the number of samples produced by simulating a shard of the scenarios of a fault type
+           (all the samples of all the fault types if fault_type is None)
+        """
+        return len(self.get_scenarios(fault_type)[shard])
+    
+    def simulate_scenarios(self,scenarios,desc="Fault Simulation"):
+        """Simulate rows of the scenario table in order, the samples are written starting at the current row of the dataset
+            - Faults: the pooled Fault element of the fault type is moved to the faulted nodes and the power flow is solved
+            - Non-fault events: the load value is set to the loads (see get_event_load_kw) and the power flow is solved,
+              the original loads are restored before the next fault and at the end
+            - Faults with a load value (--joint-sampling) are solved with the load value set to the loads, their fault
+              location is not swept
+           With solve_cache a scenario identical to the last solved one (fault type, nodes, resistance and load value) is not 
+           solved again, its features and labels are copied from the row of the last solve. The scenario table keeps the repeats 
+           of a fault location together, so with a fixed fault resistance only the first of them is solved (see skipped_solves)
+           With fault_sweep the samples of all the fault resistances of a fault location are computed from a few probe solves
+           (see sweep_fault_location), in validate mode they are compared with the full solves instead
+        """
+        if self.dataset is None:
+            self.allocate(self.get_num_samples())
+        
+        # Row after the last row of the same fault location (fault type, bus and nodes) for every row
+        location_start=np.arange(len(scenarios))==0
+        for field in ['fault_class','bus_id','node1','node2']:
+            location_start[1:]|=scenarios[field][1:]!=scenarios[field][:-1]
+        starts=np.append(np.flatnonzero(location_start),len(scenarios))
+        location_stops=np.repeat(starts[1:],np.diff(starts))
+        
+        previous_fault_class=None
+        sweep=None                                                                                                      # (first row, last row + 1, features and fault currents) of the swept fault location
+        for idx,(fault_class,bus_id,node1,node2,fr,load_value,fault_location) in enumerate(tqdm(scenarios.tolist(),desc=desc,disable=not self.show_progress)):
+            fault_type=FAULT_TYPES[fault_class]
+            if fault_class!=previous_fault_class:
+                self.release_fault_pool()                                                                               # Deactivate the fault object of the previous fault type
+                previous_fault_class=fault_class
+            if fault_type!='Non_Fault' and load_value==0:
+                self.restore_base_loads()
+            
+            # Same circuit as the last solve, copy its sample
+            scenario=(fault_class,bus_id,node1,node2,fr,load_value)
+            if self.solve_cache and self.cached_sample is not None and self.cached_sample[0]==scenario:
+                cached_row=self.cached_sample[1]
+                self.store_sample(fault_type,fault_location,self.fault_resistance_labels[cached_row],self.fault_currents_labels[cached_row],
+                                  features=self.dataset[cached_row])
+                self.skipped_solves+=1
+                continue
+            
+            # Samples of all the fault resistances of the fault location computed at its first row
+            swept_sample=None
+            if self.fault_sweep!='no' and fault_type!='Non_Fault':
+                if sweep is None or idx>=sweep[1]:
+                    stop=location_stops[idx]
+                    if scenarios['load_value'][idx:stop].any():
+                        sweep=(idx,stop,None)                                                                           # The loads change between the samples of the fault location (--joint-sampling)
+                    else:
+                        sweep=(idx,stop,self.sweep_fault_location(fault_type,bus_id,node1,node2,scenarios['resistance'][idx:stop]))
+                if sweep[2] is not None:
+                    swept_sample=(sweep[2][0][idx-sweep[0]],sweep[2][1][idx-sweep[0]])
+                if swept_sample is not None and self.fault_sweep=='yes':
+                    self.store_sample(fault_type,fault_location,fr,swept_sample[1],features=swept_sample[0])
+                    self.cached_sample=(scenario,self.num_simulated-1)
+                    continue
+                
+            if fault_type=='Non_Fault':
+                self.set_load_kw(self.get_event_load_kw(load_value))
+                self.dss.text(f'Solve mode=direct')                                                                     # Run Power Flow in Direct mode
+                self.store_sample(fault_type,fault_location,0,0)
+            else:
+                if load_value!=0:
+                    self.set_load_kw(self.get_event_load_kw(load_value))                                                # Load value of the fault sample (--joint-sampling)
+                fault_settings=FAULT_SETTINGS[fault_type].format(bus=self.feeder.bus_list[bus_id],node1=node1,node2=node2)
+                fault_obj=self.set_fault(fault_type,f'{fault_settings} r={fr}')                                         # Execute the Fault command
+                self.dss.text(f'Solve mode=direct')                                                                     # Run Power Flow in Direct mode
+                self.dss.circuit_set_active_element(fault_obj)                                                          # Set the fault object as active element to get the current 
                     
-                    # Increment count of simulations performed
-                    count_lg+=1  
+                # Get the features of the buses and the labels
+                self.store_sample(fault_type,fault_location,fr,abs(self.dss.cktelement_currents()[0]))
+                if swept_sample is not None:
+                    self.validate_sweep(self.num_simulated-1,*swept_sample)
+            self.cached_sample=(scenario,self.num_simulated-1)
         
-         # Convert the list of 2D dataset matrices into 3D matrix and standarize it 
-        final_dataset_lg= self.standardize(np.stack(self.dataset_lg))
+        # Deactivate the fault object and restore the loads
+        self.release_fault_pool()
+        self.restore_base_loads()
+        
+    def fault_simulation_lg(self,shard=slice(None),return_dataset=True):
+        """Perform LG Fault Simulation
+           - shard: slice of the LG scenarios to simulate (all of them by default)
+           - return_dataset: return the standardized LG samples (skipped when the simulation is run shard by shard)
+        """
+        self.simulate_scenarios(self.get_scenarios('LG')[shard],desc="LG Fault Simulation")
+        
+        if not return_dataset:
+            return
+        
+         # Standarize the LG samples
+        final_dataset_lg= self.standardize(self.get_fault_type_dataset('LG'))
         
         # Return LG dataset only (Only needed if partial dataset need to be exported)  
         return final_dataset_lg                                         
              
-    def fault_simulation_ll(self):
+    def fault_simulation_ll(self,shard=slice(None),return_dataset=True):
         """Perform LL Fault Simulation
+           - shard: slice of the LL scenarios to simulate (all of them by default)
+           - return_dataset: return the standardized LL samples (skipped when the simulation is run shard by shard)
         """
+        self.simulate_scenarios(self.get_scenarios('LL')[shard],desc="LL Fault Simulation")
         
-        # Create a list of node pairs for LL fault simulation
-        ll_nodes=[]
-        for fault_node1, fault_node2 in itertools.permutations(self.feeder.nodes, 2):
-            if fault_node1.split('.')[0] == fault_node2.split('.')[0] and fault_node1.split('.')[1] != fault_node2.split('.')[1] and int(fault_node1.split('.')[1]) < int(fault_node2.split('.')[1])  :
-                ll_nodes.append((fault_node1, fault_node2))
-                
-        # Keep track of number of simulations (for debugging purpose)
-        count_ll=0
-
-        for ll_node in tqdm(ll_nodes,desc="LL Fault Simulation"):
-            self.dss.circuit_set_active_bus(ll_node[0].split('.')[0])
-            
-            fault_name= ll_node[0].split('.')[0]+'_'+ll_node[0].split('.')[1]+ll_node[1].split('.')[1]
-            
-            if len(self.dss.bus_nodes())==3:
-                for idx,fr in enumerate(self.fault_information.fault_resistances):                    
-                    fault_obj=f'Fault.{fault_name}_{str(idx)}'
-                    fault_command = f'New Fault.{fault_name}_{str(idx)} Bus1={ll_node[0]} Bus2={ll_node[1]} Phases=1 r={fr}'                   
-                    fault_obj_deactivate_command=f'Fault.{fault_name}_{str(idx)}.enabled=NO'                                                   
-                
-                    self.dss.text(fault_command)                                                                                              
-                    self.dss.text(f'Solve mode=direct')                                                                                       
-                    
-                    # Get the features of the buses 
-                    self.dataset.append(self.get_features())                                                                                  
-                    self.dataset_ll.append(self.get_features())
-                    
-                    self.fault_detection_labels.append(1)
-                    self.fault_class_labels.append(self.fault_class_map['LL'])                                                                                                                        
-                    self.fault_location_labels.append(self.feeder.bus_id_map[ll_node[0].split('.')[0]])                                       
-                    self.fault_resistance_labels.append(fr)                                                                                    
-                    self.dss.circuit_set_active_element(fault_obj)
-                    self.fault_currents_labels.append(abs(self.dss.cktelement_currents()[0]))                                                                                 
-                    
-                    # Execute the fault object deactivation command   
-                    self.dss.text(fault_obj_deactivate_command)                                                                                    
-                    
-                    # Increment count of simulations performed
-                    count_ll+=1
+        if not return_dataset:
+            return
                     
-        # Convert the list of 2D dataset matrices into 3D matrix and standarize it 
-        final_dataset_ll= self.standardize(np.stack(self.dataset_ll))  
+        # Standarize the LL samples
+        final_dataset_ll= self.standardize(self.get_fault_type_dataset('LL'))  
         
         # Return LL Dataset only (Only needed if partial dataset need to be exported)  
         return final_dataset_ll 
     
-    
-    def fault_simulation_llg(self):
+    def fault_simulation_llg(self,shard=slice(None)):
         """Perform LLG Fault Simulation
+           - shard: slice of the LLG scenarios to simulate (all of them by default)
         """
-        
-        llg_nodes=[]
-
-        for fault_node1, fault_node2 in itertools.permutations(self.feeder.nodes, 2):
-            if fault_node1.split('.')[0] == fault_node2.split('.')[0] and fault_node1.split('.')[1] != fault_node2.split('.')[1] and int(fault_node1.split('.')[1]) < int(fault_node2.split('.')[1])  :
-                llg_nodes.append((fault_node1+'.'+fault_node1.split('.')[1], fault_node2+'.0'))
-                
-        # Keep track of number of simulations (for debugging purpose)
-        count_llg=0
-        
-        for llg_node in tqdm(llg_nodes,desc="LLG Fault Simulation"):
-            self.dss.circuit_set_active_bus(llg_node[0].split(".")[0])
-            fault_name= llg_node[0].split('.')[0]+'_'+llg_node[0].split('.')[1]+llg_node[1].split('.')[1]+'g'
-            if len(self.dss.bus_nodes())==3:
-                for idx,fr in enumerate(self.fault_information.fault_resistances):
-                                        
-                    fault_obj=f'Fault.{fault_name}_{str(idx)}'
-                    fault_command = f'New Fault.{fault_name}_{str(idx)} Bus1={llg_node[0]} Bus2={llg_node[1]} Phases=2 r={fr} '                
-                    fault_obj_deactivate_command=f'Fault.{fault_name}_{str(idx)}.enabled=NO'                                                   
-                    self.dss.text(fault_command)                                                                                                    
-                    self.dss.text(f'Solve mode=direct')                                                                                            
-                    self.dataset.append(self.get_features())                                                                                    
-                    self.dataset_llg.append(self.get_features())
-                    self.fault_detection_labels.append(1)
-                    self.fault_class_labels.append(self.fault_class_map['LLG'])                                                                                                                        
-                    self.fault_location_labels.append(self.feeder.bus_id_map[llg_node[0].split('.')[0]])                                       
-                    self.fault_resistance_labels.append(fr)                                                                                    
-                    self.dss.circuit_set_active_element(fault_obj)
-                    self.fault_currents_labels.append(abs(self.dss.cktelement_currents()[0]))                                                                                  
-                    # Execute the fault object deactivation command   
-                    self.dss.text(fault_obj_deactivate_command)                                                                                            
-                    # Increment count of simulations performed
-                    count_llg+=1                                                                
+        self.simulate_scenarios(self.get_scenarios('LLG')[shard],desc="LLG Fault Simulation")
     
-    def fault_simulation_lll(self):
+    def fault_simulation_lll(self,shard=slice(None)):
         """Perform LLL fault simulation
+           - shard: slice of the LLL scenarios to simulate (all of them by default)
         """
-        lll_nodes=[]
-
-        for bus_name in self.feeder.bus_list:
-            self.dss.circuit_set_active_bus(bus_name)
-            if len(self.dss.bus_nodes())==3:
-                lll_nodes.append((bus_name+".1.2.3", bus_name+".4.4.4"))
-    
-        count_lll=0
-
-        for lll_node in tqdm(lll_nodes,desc="LLL Fault Simulation"):
-            self.dss.circuit_set_active_bus(lll_node[0].split(".")[0])
-        
-            fault_name= lll_node[0].split('.')[0]+'_'+'123'
-       
-            if len(self.dss.bus_nodes())==3:
-                for idx,fr in enumerate(self.fault_information.fault_resistances):
-        
-                    fault_obj=f'Fault.{fault_name}_{str(idx)}'
-                    fault_command = f'New Fault.{fault_name}_{str(idx)} Bus1={lll_node[0]} Bus2={lll_node[1]} Phases=3 r={fr} '               
-                    fault_obj_deactivate_command=f'Fault.{fault_name}_{str(idx)}.enabled=NO'                                                   
-                    
-                    self.dss.text(fault_command)                                                                                                    
-                    self.dss.text(f'Solve mode=direct')
-                    self.dataset.append(self.get_features())                                                                                    
-                    self.dataset_lll.append(self.get_features())
-                    self.fault_detection_labels.append(1)
-                    self.fault_class_labels.append(self.fault_class_map['LLL'])                                                                                                                        
-                    self.fault_location_labels.append(self.feeder.bus_id_map[lll_node[0].split('.')[0]])                                       
-                    self.fault_resistance_labels.append(fr)                                                                                    
-                    self.dss.circuit_set_active_element(fault_obj)
-                    self.fault_currents_labels.append(abs(self.dss.cktelement_currents()[0]))                                                                                  
-                    # Execute the fault object deactivation command   
-                    self.dss.text(fault_obj_deactivate_command)                                                                                            
-                    # Increment count of simulations performed
-                    count_lll+=1                                                                                                                                       
-               
+        self.simulate_scenarios(self.get_scenarios('LLL')[shard],desc="LLL Fault Simulation")
     
-    def fault_simulation_lllg(self):
+    def fault_simulation_lllg(self,shard=slice(None)):
         """Perfrom LLLG Fault Simulation
+           - shard: slice of the LLLG scenarios to simulate (all of them by default)
         """
-        lllg_nodes=[]
-
-        for bus_name in self.feeder.bus_list:
-            self.dss.circuit_set_active_bus(bus_name)
-            if len(self.dss.bus_nodes())==3:
-                lllg_nodes.append(bus_name+".1.2.3")
-                
-            
-        count_lllg=0
-
-        for lllg_node in tqdm(lllg_nodes,desc="LLLG Fault Simulation"):
-            self.dss.circuit_set_active_bus(lllg_node.split(".")[0])
-            
-            fault_name= lllg_node.split('.')[0]+'_'+'123g'
-                        
-            if len(self.dss.bus_nodes())==3:
-                for idx,fr in enumerate(self.fault_information.fault_resistances):
-                                        
-                    fault_obj=f'Fault.{fault_name}_{str(idx)}'
-                    fault_command = f'New Fault.{fault_name}_{str(idx)} Bus1={lllg_node} Phases=3 r={fr} '                                     
-                    fault_obj_deactivate_command=f'Fault.{fault_name}_{str(idx)}.enabled=NO'    
-                    
-                    
-                    self.dss.text(fault_command)                                                                                                    
-                    self.dss.text(f'Solve mode=direct')
-                    self.dataset.append(self.get_features())                                                                                    
-                    self.dataset_lllg.append(self.get_features())
-                    self.fault_detection_labels.append(1)
-                    self.fault_class_labels.append(self.fault_class_map['LLLG'])                                                                                                                        
-                    self.fault_location_labels.append(self.feeder.bus_id_map[lllg_node.split('.')[0]])                                       
-                    self.fault_resistance_labels.append(fr)                                                                                    
-                    self.dss.circuit_set_active_element(fault_obj)
-                    self.fault_currents_labels.append(abs(self.dss.cktelement_currents()[0]))                                                                                  
-                    # Execute the fault object deactivation command   
-                    self.dss.text(fault_obj_deactivate_command)                                                                                            
-                    # Increment count of simulations performed
-                    count_lllg+=1                                                                                          
+        self.simulate_scenarios(self.get_scenarios('LLLG')[shard],desc="LLLG Fault Simulation")
                     
-    def non_fault_simulation(self):
-            
-        lds= self.fault_information.load_values 
-        loads=self.feeder.connected_loads_name
-        
-        for ld in tqdm(lds,desc="Non Fault Event Simulation"):
-            for load in loads:
-                self.dss.text(f'{load}.KW={str(ld)}')  
-                                
-            self.dss.text(f'Solve mode=direct')                                                                                            
-            self.dataset_non_fault.append(self.get_features())
-            self.dataset.append(self.get_features())                                                                                   
-           
-            self.fault_detection_labels.append(0)
-            self.fault_class_labels.append(self.fault_class_map['Non_Fault']) 
-            self.fault_location_labels.append(-100)                                                                                                                               
-            self.fault_resistance_labels.append(0)
-            self.fault_currents_labels.append(0)                                                                                               
-                                                                                         
+    def non_fault_simulation(self,shard=slice(None)):
+        """Perform a simulation for non-fault events
+           - shard: slice of the non-fault scenarios (load values) to simulate (all of them by default)
+        """
+        self.simulate_scenarios(self.get_scenarios('Non_Fault')[shard],desc="Non Fault Event Simulation")
     
-    def get_dataset(self,print_info=True):
-        """Return the dataset
+    def get_dataset(self,print_info=True,standardize=True):
+        """Return the dataset and the labels of the simulated samples
+           - standardize: standardize the dataset in place with the statistics collected during the simulation,
+             set to False if the dataset was already standardized (see checkpoint.standardize_with_checkpoint) or is standardized lazily
         """
+        results=self.get_results()
+        dataset=results['dataset']
+        if standardize:
+            with timed('standardization'):
+                self.statistics.transform(dataset,out=dataset)
+        fault_detection_labels,fault_location_labels,fault_class_labels=results['fault_detection_labels'],results['fault_location_labels'],results['fault_class_labels']
+        fault_resistance_labels,fault_currents_labels=results['fault_resistance_labels'],results['fault_currents_labels']
+        
         if print_info:
             print('Dataset Information:')
             print('---------------------')
             
-            print(f'Dataset Shape:{self.standardize(np.stack(self.dataset)).shape} \n',color='yellow')
+            print(f'Dataset Shape:{dataset.shape}',color='yellow')
+            print(f'Feature Channels: {get_feature_channels(self.feature_channels)}',color='yellow')
+            print(f'Skipped Solves: {self.skipped_solves} (repeated scenarios copied from the last solve)',color='yellow')
+            if self.fault_sweep!='no':
+                print(f'Fault Sweep: {self.sweep_fallbacks} fault locations solved sample by sample (check of the sweep above the tolerance {self.sweep_tolerance:.3g})',color='yellow')
+            if self.fault_sweep=='validate':
+                print(f'Fault Sweep Validation: largest error {self.sweep_max_error:.3g} (tolerance {self.sweep_tolerance:.3g})',color='yellow')
+            print('')
             
             print("Fault Detection Label Information",color='green',format='bold')
             print('---------------------------------',color='green')
-            print(f"Count: {len(self.fault_detection_labels)}", tag='Fault Detection', tag_color='green', color='white')
-            print(f"Class Count: {len(set(self.fault_detection_labels))}", tag='Fault Detection', tag_color='green', color='white')
-            print(f"Per Class Count: {Counter(self.fault_detection_labels)} \n", tag='Fault Detection', tag_color='green', color='white')
+            print(f"Count: {len(fault_detection_labels)}", tag='Fault Detection', tag_color='green', color='white')
+            print(f"Class Count: {len(set(fault_detection_labels))}", tag='Fault Detection', tag_color='green', color='white')
+            print(f"Per Class Count: {Counter(fault_detection_labels)} \n", tag='Fault Detection', tag_color='green', color='white')
             
             print("Fault Location Label Information",color='purple',format='bold')
             print('---------------------------------',color='purple')
-            print(f"Count: {len(self.fault_location_labels)}", tag='Fault Location', tag_color='purple', color='white')
-            print(f"Class Count: {len(set(self.fault_location_labels))}", tag='Fault Location', tag_color='purple', color='white')
-            print(f"Per Class Count: {Counter(self.fault_location_labels)}\n", tag='Fault Location', tag_color='purple', color='white')
+            print(f"Count: {len(fault_location_labels)}", tag='Fault Location', tag_color='purple', color='white')
+            print(f"Class Count: {len(set(fault_location_labels))}", tag='Fault Location', tag_color='purple', color='white')
+            print(f"Per Class Count: {Counter(fault_location_labels)}\n", tag='Fault Location', tag_color='purple', color='white')
             
             
             print("Fault Class Label Information",color='blue',format='bold')
             print('---------------------------------',color='blue')
-            print(f"Count: {len(self.fault_class_labels)}", tag='Fault Class', tag_color='blue', color='white')
-            print(f"Class Count: {len(set(self.fault_class_labels))}", tag='Fault Class', tag_color='blue', color='white')
-            print(f"Per Class Count: {Counter(self.fault_class_labels)}\n", tag='Fault Class', tag_color='blue', color='white')
+            print(f"Count: {len(fault_class_labels)}", tag='Fault Class', tag_color='blue', color='white')
+            print(f"Class Count: {len(set(fault_class_labels))}", tag='Fault Class', tag_color='blue', color='white')
+            print(f"Per Class Count: {Counter(fault_class_labels)}\n", tag='Fault Class', tag_color='blue', color='white')
             
             print("Fault Resistance Label Information",color='cyan',format='bold')
             print('---------------------------------',color='cyan')
-            print(f"Count: {len(self.fault_resistance_labels)}", tag='Fault Resistance', tag_color='cyan', color='white')
-            print(f"Max Resistance: {max(self.fault_resistance_labels)}", tag='Fault Resistance', tag_color='cyan', color='white')
-            print(f"Min Resistance: {min(self.fault_resistance_labels)}\n", tag='Fault Resistance', tag_color='cyan', color='white')
+            print(f"Count: {len(fault_resistance_labels)}", tag='Fault Resistance', tag_color='cyan', color='white')
+            print(f"Max Resistance: {max(fault_resistance_labels)}", tag='Fault Resistance', tag_color='cyan', color='white')
+            print(f"Min Resistance: {min(fault_resistance_labels)}\n", tag='Fault Resistance', tag_color='cyan', color='white')
             
             
             print("Fault Current Label Information",color='red',format='bold')
             print('---------------------------------',color='red')
-            print(f"Count: {len(self.fault_currents_labels)}", tag='Fault Current', tag_color='red', color='white')
-            print(f"Max Current: {max(self.fault_currents_labels)}", tag='Fault Current', tag_color='red', color='white')
-            print(f"Min Current: {min(self.fault_currents_labels)}\n", tag='Fault Current', tag_color='red', color='white')
+            print(f"Count: {len(fault_currents_labels)}", tag='Fault Current', tag_color='red', color='white')
+            print(f"Max Current: {max(fault_currents_labels)}", tag='Fault Current', tag_color='red', color='white')
+            print(f"Min Current: {min(fault_currents_labels)}\n", tag='Fault Current', tag_color='red', color='white')
                         
-        return self.standardize(np.stack(self.dataset)),self.fault_detection_labels,self.fault_location_labels,self.fault_class_labels,self.fault_resistance_labels,self.fault_currents_labels
\ No newline at end of file
+        return dataset,fault_detection_labels,fault_location_labels,fault_class_labels,fault_resistance_labels,fault_currents_labels
\ No newline at end of file
@@ -0,0 +1,50 @@
+#Imports
+# Additional Library Imports
+import numpy as np
+
+# Resistance of the probe faults solved to measure the transfer impedances of a fault location
+PROBE_RESISTANCE=1.0
+
+
+def get_fault_branches(fault_type,node1,node2):
+    """Branches of the Fault element of a fault type (see scenarios.FAULT_SETTINGS), each branch is a resistance r between two nodes of the bus
+        - branches: list of (node, node) pairs, node 0 is the ground
+        - conductance_factor: conductance of each branch is conductance_factor/r
+        - current_weights: terminal 1, conductor 1 current of the Fault element (the fault current label) as a sum of branch currents
+       The LLL fault (three phases to the floating node 4) is replaced by the equivalent delta of resistances 3r between the phases
+    """
+    if fault_type=='LG':
+        return [(node1,0)],1.0,[1.0]
+    if fault_type=='LL':
+        return [(node1,node2)],1.0,[1.0]
+    if fault_type=='LLG':
+        return [(node1,node2),(node1,0)],1.0,[1.0,0.0]
+    if fault_type=='LLL':
+        return [(1,2),(2,3),(1,3)],1/3,[1.0,0.0,1.0]                                                                     # Current of phase 1 to node 4 = currents of phase 1 to phases 2 and 3
+    if fault_type=='LLLG':
+        return [(1,0),(2,0),(3,0)],1.0,[1.0,0.0,0.0]
+    raise ValueError(f'No fault branches for the fault type {fault_type}')
+
+
+def sweep_fault_resistances(base_voltages,transfer_impedances,incidence,conductance_factor,current_weights,resistances):
+    """Node voltages and fault current of a fault location for a vector of fault resistances, without solving the power flow
+       The power flow of Solve mode=direct is linear (loads are admittances), so by the compensation theorem
+       V = V0 - Z A i_b with (I + A^T Z A G) A^T V = A^T V0 and i_b = G A^T V
+        - base_voltages: complex voltages V0 of the nodes without fault (num_nodes,)
+        - transfer_impedances: Z A, voltage change of the nodes for a unit current in each branch (num_nodes, num_branches)
+        - incidence: A, +1/-1 for the two nodes of each branch (num_nodes, num_branches), zero rows for the ground
+        - resistances: fault resistances of the samples (num_samples,)
+       Returns the complex node voltages (num_samples, num_nodes) and the complex fault currents (num_samples,)
+    """
+    conductances=conductance_factor/np.asarray(resistances,dtype=np.float64)
+    branch_impedances=incidence.T@transfer_impedances                                                                    # A^T Z A (num_branches, num_branches)
+    branch_voltages_base=incidence.T@base_voltages                                                                       # A^T V0
+    num_branches=len(branch_voltages_base)
+
+    # (I + A^T Z A G) u = A^T V0 for all the resistances at once
+    systems=np.eye(num_branches)+branch_impedances[None,:,:]*conductances[:,None,None]
+    branch_voltages=np.linalg.solve(systems,np.broadcast_to(branch_voltages_base,(len(conductances),num_branches))[...,None])[...,0]
+    branch_currents=branch_voltages*conductances[:,None]
+
+    voltages=base_voltages[None,:]-branch_currents@transfer_impedances.T
+    return voltages,branch_currents@np.asarray(current_weights)
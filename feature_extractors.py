@@ -0,0 +1,199 @@
+#Imports
+# Python Imports
+from collections import deque
+
+# Additional Library Imports
+import numpy as np
+import scipy.sparse as sp
+
+# Channels of the voltage features of every bus (see FaultSimulation.fill_features)
+VOLTAGE_CHANNELS=['vmag_a','vang_a','vmag_b','vang_b','vmag_c','vang_c']
+
+# Column of each phase (node 1, 2, 3 of a bus) in the channels of a phase quantity
+PHASE_COLUMNS={1:0,2:1,3:2}
+
+# Symmetrical components of the phase voltages (Va, Vb, Vc) -> (V0, V1, V2)
+_a=np.exp(2j*np.pi/3)
+SEQUENCE_MATRIX=np.array([[1,1,1],[1,_a,_a**2],[1,_a**2,_a]])/3
+
+
+class SequenceVoltages:
+    """Magnitude (in per unit) of the zero, positive and negative sequence voltages of the three-phase buses
+       Computed from the node voltages of the voltage features, the channels of the other buses are 0
+    """
+    channels=['v0_pu','v1_pu','v2_pu']
+    needs_circuit_voltages=False                                                                                        # Computed from the voltages of the feature nodes (also by the fault sweep)
+
+    def __init__(self,fault_simulator):
+        dss=fault_simulator.dss
+        feeder=fault_simulator.feeder
+        rows,positions,bases=[],[],[]
+        for bus_id,bus in enumerate(feeder.bus_list):
+            nodes=[f'{bus}.{phase}' for phase in PHASE_COLUMNS]
+            if all(node in fault_simulator.feature_node_index for node in nodes):
+                dss.circuit_set_active_bus(bus)
+                rows.append(bus_id)
+                positions.append([fault_simulator.feature_node_index[node] for node in nodes])
+                bases.append(1000*dss.bus_kv_base())                                                                    # Line to neutral voltage base of the bus
+        self.rows=np.array(rows,dtype=np.int64)
+        self.positions=np.array(positions,dtype=np.int64).reshape(-1,3)
+        self.bases=np.array(bases,dtype=np.float64)
+
+    def fill(self,fault_simulator,node_voltages,out):
+        phase_voltages=node_voltages[...,self.positions]/self.bases[:,None]                                             # (..., three-phase buses, 3) in per unit
+        out[...,self.rows,:]=np.abs(phase_voltages@SEQUENCE_MATRIX.T)
+
+
+class BranchNetwork:
+    """Admittance matrices of the branches feeding each bus, to compute the branch currents from the node voltages
+        - Each bus is fed by the power delivery elements between it and its parent in a breadth-first walk of the elements
+          from the first bus of the circuit (the source bus of the bundled feeders)
+        - The primitive admittance matrices (Yprim) of these elements are read once and stacked in a block diagonal matrix,
+          so the currents of all their conductors are a single sparse product with the node voltages of each solve
+        - The currents flowing into each bus are summed by phase at the terminals of its feeding elements
+    """
+
+    def __init__(self,fault_simulator):
+        dss=fault_simulator.dss
+        bus_id_map=fault_simulator.feeder.bus_id_map
+
+        # Terminals (bus, nodes of the conductors) and Yprim of the power delivery elements between two buses of the feeder
+        elements=[]
+        element=dss.pdelements_first()
+        while element:
+            bus_names=dss.cktelement_read_bus_names()
+            buses=[bus_name.split('.')[0].lower() for bus_name in bus_names]
+            if len(set(buses))>1 and all(bus in bus_id_map for bus in buses):
+                node_order=list(dss.cktelement_node_order())
+                num_conductors=len(node_order)//len(buses)
+                yprim=np.asarray(dss.cktelement_y_prim(),dtype=np.float64).view(np.complex128).reshape(len(node_order),len(node_order))
+                elements.append({'buses':buses,'nodes':[node_order[terminal*num_conductors:(terminal+1)*num_conductors] for terminal in range(len(buses))],
+                                 'yprim':yprim})
+            element=dss.pdelements_next()
+
+        # Breadth-first walk from the first bus, the elements between a bus and its parent feed the bus
+        bus_elements={}
+        for idx,element in enumerate(elements):
+            for bus in element['buses']:
+                bus_elements.setdefault(bus,[]).append(idx)
+        root=fault_simulator.feeder.bus_list[0]
+        parents={root:None}
+        queue=deque([root])
+        while queue:
+            bus=queue.popleft()
+            for idx in bus_elements.get(bus,[]):
+                for neighbor in elements[idx]['buses']:
+                    if neighbor not in parents:
+                        parents[neighbor]=bus
+                        queue.append(neighbor)
+
+        # Conductors of the feeding elements (in the order of their Yprim) and the ones at the terminal of the fed bus
+        blocks,self.conductor_nodes=[],[]
+        bus_rows,phase_cols,selected=[],[],[]
+        for element in elements:
+            fed_terminals=[terminal for terminal,bus in enumerate(element['buses']) if parents.get(bus) in element['buses'] and parents[bus]!=bus]
+            if not fed_terminals:
+                continue
+            offset=len(self.conductor_nodes)
+            for terminal,(bus,nodes) in enumerate(zip(element['buses'],element['nodes'])):
+                for conductor,node in enumerate(nodes):
+                    if terminal in fed_terminals and node in PHASE_COLUMNS:
+                        selected.append(offset+len(nodes)*terminal+conductor)
+                        bus_rows.append(bus_id_map[bus])
+                        phase_cols.append(PHASE_COLUMNS[node])
+                    self.conductor_nodes.append(f'{bus}.{node}' if node!=0 else None)                                 # Node 0 is the ground
+            blocks.append(sp.csr_matrix(element['yprim']))
+        self.admittance=sp.block_diag(blocks,format='csr') if blocks else sp.csr_matrix((0,0),dtype=np.complex128)
+        self.selected=np.array(selected,dtype=np.int64)
+        self.bus_rows=np.array(bus_rows,dtype=np.int64)
+        self.phase_cols=np.array(phase_cols,dtype=np.int64)
+        self.num_buses=len(fault_simulator.feeder.bus_list)
+        self.circuit_node_names=None
+        self.solved=(None,None)                                                                                         # (voltage read, bus currents and voltages) of the last computation
+
+    def get_bus_currents(self,fault_simulator):
+        """Current flowing into each phase of each bus through its feeding elements (complex, in A) and the voltage of the
+           conductors they flow through, for the last voltages read by fault_simulator (computed once per read)
+        """
+        if self.solved[0]==fault_simulator.voltage_reads:
+            return self.solved[1]
+
+        # Position of the conductors in the node order of the circuit (changes when a fault adds a node to a bus)
+        if fault_simulator.circuit_node_names is not self.circuit_node_names:
+            circuit_node_index={node:idx for idx,node in enumerate(fault_simulator.circuit_node_names)}
+            ground=len(fault_simulator.circuit_node_names)
+            self.conductor_positions=np.array([ground if node is None else circuit_node_index.get(node,ground) for node in self.conductor_nodes],dtype=np.int64)
+            self.circuit_node_names=fault_simulator.circuit_node_names
+
+        voltages=np.append(fault_simulator.circuit_voltages,0)[self.conductor_positions]
+        currents=-(self.admittance@voltages)[self.selected]                                                             # Yprim gives the currents flowing into the element at its terminals
+        self.solved=(fault_simulator.voltage_reads,(currents,voltages[self.selected]))
+        return self.solved[1]
+
+
+def get_branch_network(fault_simulator):
+    if fault_simulator.branch_network is None:
+        fault_simulator.branch_network=BranchNetwork(fault_simulator)
+    return fault_simulator.branch_network
+
+
+class BranchCurrents:
+    """Magnitude (in A) of the current flowing into each phase of each bus through the branches feeding it (see BranchNetwork)
+    """
+    channels=['i_a','i_b','i_c']
+    needs_circuit_voltages=True                                                                                         # Needs the voltages of all the nodes of the circuit (not computed by the fault sweep)
+
+    def __init__(self,fault_simulator):
+        self.network=get_branch_network(fault_simulator)
+
+    def fill(self,fault_simulator,node_voltages,out):
+        currents,_=self.network.get_bus_currents(fault_simulator)
+        bus_currents=np.zeros((self.network.num_buses,3),dtype=np.complex128)
+        np.add.at(bus_currents,(self.network.bus_rows,self.network.phase_cols),currents)
+        out[...]=np.abs(bus_currents)
+
+
+class BranchPowers:
+    """Active (kW) and reactive (kvar) power flowing into each bus through the branches feeding it (see BranchNetwork)
+    """
+    channels=['p_kw','q_kvar']
+    needs_circuit_voltages=True
+
+    def __init__(self,fault_simulator):
+        self.network=get_branch_network(fault_simulator)
+
+    def fill(self,fault_simulator,node_voltages,out):
+        currents,voltages=self.network.get_bus_currents(fault_simulator)
+        bus_powers=np.zeros(self.network.num_buses,dtype=np.complex128)
+        np.add.at(bus_powers,self.network.bus_rows,voltages*np.conj(currents)/1000)
+        out[...,0]=bus_powers.real
+        out[...,1]=bus_powers.imag
+
+
+# Extra channels of the features (--feature-channels), added after the voltage channels in this order
+FEATURE_EXTRACTORS={'sequence_voltages':SequenceVoltages,
+                    'branch_currents':BranchCurrents,
+                    'branch_powers':BranchPowers}
+
+
+def get_feature_channels(feature_channels=()):
+    """Names of the channels of the features with the extra channels of feature_channels (in the order of FEATURE_EXTRACTORS)
+    """
+    channels=list(VOLTAGE_CHANNELS)
+    for name,extractor in FEATURE_EXTRACTORS.items():
+        if name in feature_channels:
+            channels+=extractor.channels
+    return channels
+
+
+def build_feature_extractors(fault_simulator):
+    """Extractors of the extra channels of fault_simulator with the columns of the features they fill
+       Returns a list of (extractor, column slice)
+    """
+    extractors=[]
+    column=len(VOLTAGE_CHANNELS)
+    for name,extractor in FEATURE_EXTRACTORS.items():
+        if name in fault_simulator.feature_channels:
+            extractors.append((extractor(fault_simulator),slice(column,column+len(extractor.channels))))
+            column+=len(extractor.channels)
+    return extractors
@@ -0,0 +1,58 @@
+#Imports
+# Python Imports
+import os
+import hashlib
+import pickle
+
+# Local Imports
+import opendss_utils
+
+# Increase when the feeder information extracted from OpenDSS changes, so older cache files are not used anymore
+CACHE_VERSION=1
+FEEDER_CACHE_FOLDER='feeder_cache'
+
+
+def get_feeder_hash(feeder_name,feeder_init_dss_file,bus_to_exclude):
+    """Hash of everything the feeder information depends on
+        - The content (and relative path) of every .dss file in the folder of the feeder
+        - The main file of the feeder and the list of excluded buses
+    """
+    feeder_folder=os.path.join(opendss_utils.SCRIPT_PATH,'feeders',feeder_name)
+    feeder_hash=hashlib.sha256()
+    feeder_hash.update(f'{CACHE_VERSION}|{feeder_name}|{feeder_init_dss_file}|{sorted(bus_to_exclude)}'.encode())
+
+    for root,dirs,files in os.walk(feeder_folder):
+        dirs.sort()                                                                                                     # Walk the sub-folders in a fixed order
+        for file_name in sorted(files):
+            if not file_name.lower().endswith('.dss'):
+                continue
+            file_path=os.path.join(root,file_name)
+            feeder_hash.update(os.path.relpath(file_path,feeder_folder).encode())
+            with open(file_path,'rb') as dss_file:
+                feeder_hash.update(dss_file.read())
+    return feeder_hash.hexdigest()
+
+
+def get_feeder_cache_path(feeder_name,feeder_init_dss_file,bus_to_exclude):
+    """Path of the cache file of the feeder, a new path is returned as soon as a .dss file of the feeder changes
+    """
+    feeder_hash=get_feeder_hash(feeder_name,feeder_init_dss_file,bus_to_exclude)
+    return os.path.join(opendss_utils.SCRIPT_PATH,FEEDER_CACHE_FOLDER,f'{feeder_name}_{feeder_hash[:16]}.pkl')
+
+
+def load_feeder_cache(cache_path):
+    """Return the cached feeder information, or None if the feeder is not cached yet
+    """
+    if not os.path.exists(cache_path):
+        return None
+    with open(cache_path,'rb') as cache_file:
+        return pickle.load(cache_file)
+
+
+def save_feeder_cache(cache_path,feeder_infos):
+    """Write the feeder information to a temporary file and move it to the cache path, so an interrupted run never leaves a partial cache file
+    """
+    os.makedirs(os.path.dirname(cache_path),exist_ok=True)
+    with open(cache_path+'.tmp','wb') as cache_file:
+        pickle.dump(feeder_infos,cache_file)
+    os.replace(cache_path+'.tmp',cache_path)
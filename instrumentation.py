@@ -0,0 +1,195 @@
+#Imports
+# Python Imports
+import sys
+import time
+from contextlib import contextmanager
+
+# Additional Library Imports
+from tqdm import tqdm
+
+try:
+    import resource                                                                                                     # Peak memory (not available on Windows)
+except ImportError:
+    resource = None
+
+# Profiler of the run (None when --profile is not set, see start_profiler)
+_profiler=None
+
+
+class Profiler:
+    """Records the wall time and the number of calls of the stages of a run
+      - record/wrap/add --> Accumulate the time of a stage (context manager, function wrapper or measured time)
+      - count_solves --> Counts the power flow solves, samples the solves per second over time and prints the live summary
+      - snapshot/merge --> Moves the records of a worker process to the profiler of the main process
+      - report --> Dictionary with the stages, the solves per second over time and the peak memory
+    """
+
+    def __init__(self,live_interval=0,sample_period=1.0):
+        self.start=time.perf_counter()
+        self.stages={}                                                                                                  # Stage name -> [seconds, calls]
+        self.solves=0
+        self.timeline=[]                                                                                                # Solves per second sampled every sample_period seconds
+        self.sample_period=sample_period
+        self.live_interval=live_interval                                                                                # Seconds between two live summaries (0 disables them)
+        self.last_sample=(self.start,0)
+        self.last_summary=self.start
+
+    def add(self,name,seconds,calls=1):
+        stage=self.stages.setdefault(name,[0.0,0])
+        stage[0]+=seconds
+        stage[1]+=calls
+
+    @contextmanager
+    def record(self,name):
+        start=time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name,time.perf_counter()-start)
+
+    def wrap(self,name,function):
+        """Return function with its calls recorded as the stage name
+        """
+        def wrapper(*args,**kwargs):
+            start=time.perf_counter()
+            try:
+                return function(*args,**kwargs)
+            finally:
+                self.add(name,time.perf_counter()-start)
+        return wrapper
+
+    def count_solves(self,solves):
+        self.solves+=solves
+        now=time.perf_counter()
+        last_time,last_solves=self.last_sample
+        if now-last_time>=self.sample_period:
+            self.timeline.append({'time':round(now-self.start,3),'solves':self.solves,
+                                  'solves_per_second':round((self.solves-last_solves)/(now-last_time),3)})
+            self.last_sample=(now,self.solves)
+        if self.live_interval>0 and now-self.last_summary>=self.live_interval:
+            tqdm.write(self.summary())
+            self.last_summary=now
+
+    def snapshot(self):
+        """Return the records since the last snapshot and reset them (used by the worker processes)
+        """
+        records={'stages':self.stages,'solves':self.solves}
+        self.stages={}
+        self.solves=0
+        return records
+
+    def merge(self,records):
+        for name,(seconds,calls) in records['stages'].items():
+            self.add(name,seconds,calls)
+        self.count_solves(records['solves'])
+
+    def summary(self):
+        elapsed=time.perf_counter()-self.start
+        top_stages=sorted(self.stages.items(),key=lambda stage:-stage[1][0])[:4]
+        stages=', '.join(f'{name} {seconds:.1f}s' for name,(seconds,_) in top_stages)
+        return f'[Profile] {elapsed:.0f}s elapsed, {self.solves} solves ({self.solves/max(elapsed,1e-9):.1f}/s), {stages}'
+
+    def report(self):
+        elapsed=time.perf_counter()-self.start
+        return {'elapsed_seconds':round(elapsed,3),
+                'solves':self.solves,
+                'solves_per_second':round(self.solves/max(elapsed,1e-9),3),
+                'stages':{name:{'seconds':round(seconds,6),'calls':calls,'ms_per_call':round(1000*seconds/calls,6) if calls else None}
+                          for name,(seconds,calls) in sorted(self.stages.items(),key=lambda stage:-stage[1][0])},
+                'solves_per_second_over_time':self.timeline,
+                'peak_memory_mb':get_peak_memory_mb()}
+
+
+class InstrumentedDSS:
+    """Proxy of the DSS object recording the hot-path calls in the profiler
+       - text: compile, solve, fault and load commands (the other commands are recorded as other_commands)
+       - cktelement_currents: current readout
+       The other methods are forwarded to the DSS object without being recorded
+    """
+
+    def __init__(self,dss,profiler):
+        self._dss=dss
+        self._profiler=profiler
+
+    def text(self,command):
+        stage=get_command_stage(command)
+        start=time.perf_counter()
+        result=self._dss.text(command)
+        self._profiler.add(stage,time.perf_counter()-start)
+        if stage=='solve':
+            self._profiler.count_solves(1)
+        return result
+
+    def cktelement_currents(self):
+        start=time.perf_counter()
+        result=self._dss.cktelement_currents()
+        self._profiler.add('current_readout',time.perf_counter()-start)
+        return result
+
+    def __getattr__(self,name):
+        return getattr(self._dss,name)
+
+
+def get_command_stage(command):
+    command=command.strip().lower()
+    if command.startswith('compile'):
+        return 'compile'
+    if command.startswith('solve'):
+        return 'solve'
+    if command.startswith(('new fault.','edit fault.','fault.')):
+        return 'fault_commands'
+    if command.startswith('load.'):
+        return 'load_commands'
+    return 'other_commands'
+
+
+def get_peak_memory_mb():
+    """Peak resident memory of the process and of its (finished) worker processes, None where it is not available
+    """
+    if resource is None:
+        return None
+    unit=1/(1024*1024) if sys.platform=='darwin' else 1/1024                                                          # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return {'main_process':round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss*unit,3),
+            'worker_processes':round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss*unit,3)}
+
+
+def start_profiler(live_interval=0):
+    global _profiler
+    _profiler=Profiler(live_interval=live_interval)
+    return _profiler
+
+
+def stop_profiler():
+    """Stop recording (used between the runs of a batch runner worker, so a run without --profile is not recorded)
+    """
+    global _profiler
+    _profiler=None
+
+
+def get_profiler():
+    return _profiler
+
+
+def instrument_dss(dss):
+    """Return the DSS object wrapped in an InstrumentedDSS if the profiler is started (the DSS object itself otherwise)
+    """
+    return dss if _profiler is None else InstrumentedDSS(dss,_profiler)
+
+
+def instrument_fault_simulator(fault_simulator):
+    """Record the feature extraction of a fault simulator if the profiler is started
+    """
+    if _profiler is not None:
+        fault_simulator.get_features=_profiler.wrap('feature_extraction',fault_simulator.get_features)
+    return fault_simulator
+
+
+@contextmanager
+def timed(name):
+    """Record the time of the block as the stage name if the profiler is started
+    """
+    if _profiler is None:
+        yield
+    else:
+        with _profiler.record(name):
+            yield
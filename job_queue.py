@@ -0,0 +1,257 @@
+#Imports
+# Python Imports
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+from contextlib import contextmanager
+from dataclasses import asdict
+
+# Additional Library Imports
+import numpy as np
+from tqdm import tqdm
+
+# Local Imports
+import opendss_utils
+from opendss_utils import compile_feeder
+from fault_simulation import FaultSimulation, RESULT_ARRAYS
+from checkpoint import save_scenario_plan, load_scenario_plan
+from parallel_simulation import build_shards, simulate_shard
+from instrumentation import timed
+
+JOB_FILE='job.json'                # Settings of the run and work units, written last so workers only start on a complete queue
+PENDING_FOLDER='pending'           # One file per work unit waiting for a worker
+CLAIMED_FOLDER='claimed'           # Work units being simulated (moved from pending by the worker that claims them)
+RESULTS_FOLDER='results'           # Dataset, labels and solve counters of each simulated work unit
+
+
+def get_unit_name(unit_idx):
+    return f'unit_{unit_idx:05d}'
+
+
+def get_result_path(queue_dir,unit_name):
+    return os.path.join(queue_dir,RESULTS_FOLDER,f'{unit_name}.npz')
+
+
+def load_job(queue_dir):
+    with open(os.path.join(queue_dir,JOB_FILE)) as json_file:
+        return json.load(json_file)
+
+
+def create_queue(queue_dir,args,fault_simulator,unit_size,stale_seconds):
+    """Write the work units of the scenario table to the queue directory (or reuse the queue of a previous run of the coordinator)
+        - scenario_plan.npy: scenario table of the run, each work unit is a range of its rows
+        - pending/unit_XXXXX.json: one file per work unit
+        - job.json: feeder, fault information and simulation settings the workers create their fault simulator with
+       Returns the job
+    """
+    scenarios=fault_simulator.get_scenarios()
+    if os.path.exists(os.path.join(queue_dir,JOB_FILE)):
+        job=load_job(queue_dir)
+        if job['num_samples']!=len(scenarios) or not np.array_equal(load_scenario_plan(queue_dir),scenarios):
+            raise ValueError(f'The queue in {queue_dir} was created for other scenarios ({job["num_samples"]} samples), use another --queue-dir')
+        return job
+
+    for folder in [PENDING_FOLDER,CLAIMED_FOLDER,RESULTS_FOLDER]:
+        os.makedirs(os.path.join(queue_dir,folder),exist_ok=True)
+    save_scenario_plan(queue_dir,scenarios)
+    units=build_shards(fault_simulator,shard_samples=unit_size)
+    for unit_idx,(start,stop) in enumerate(units):
+        with open(os.path.join(queue_dir,PENDING_FOLDER,f'{get_unit_name(unit_idx)}.json'),'w') as json_file:
+            json.dump({'start':start,'stop':stop},json_file)
+
+    fault_information=fault_simulator.fault_information
+    job={'feeder_name':args.feeder,
+         'feeder_file':args.feeder_file,
+         'backend':args.backend,
+         'simulation_options':{'solve_cache':fault_simulator.solve_cache,'fault_sweep':fault_simulator.fault_sweep,
+                               'sweep_tolerance':fault_simulator.sweep_tolerance,'load_sampling':fault_simulator.load_sampling,
+                               'feature_channels':fault_simulator.feature_channels},
+         'stale_seconds':stale_seconds,
+         'num_samples':len(scenarios),
+         'units':units,
+         'feeder':asdict(fault_simulator.feeder),
+         'fault_information':{'fault_resistances':[float(value) for value in fault_information.fault_resistances],
+                              'load_values':None if fault_information.load_values is None else [float(value) for value in fault_information.load_values],
+                              'fault_load_values':None if fault_information.fault_load_values is None else [float(value) for value in fault_information.fault_load_values]}}
+    job_path=os.path.join(queue_dir,JOB_FILE)
+    with open(job_path+'.tmp','w') as json_file:
+        json.dump(job,json_file)
+    os.replace(job_path+'.tmp',job_path)
+    return job
+
+
+def claim_unit(queue_dir):
+    """Claim a pending work unit by moving its file to claimed/ (the rename is atomic, so only one worker gets each unit)
+       Returns the name of the unit, or None if no unit is pending
+    """
+    pending_folder=os.path.join(queue_dir,PENDING_FOLDER)
+    for file_name in sorted(os.listdir(pending_folder)):
+        claimed_path=os.path.join(queue_dir,CLAIMED_FOLDER,file_name)
+        try:
+            os.rename(os.path.join(pending_folder,file_name),claimed_path)
+        except FileNotFoundError:
+            continue                                                                                                    # Claimed by another worker
+        unit_name=os.path.splitext(file_name)[0]
+        if os.path.exists(get_result_path(queue_dir,unit_name)):
+            release_unit(queue_dir,unit_name)                                                                           # Requeued while its first worker was finishing it
+            continue
+        os.utime(claimed_path)
+        return unit_name
+    return None
+
+
+def release_unit(queue_dir,unit_name):
+    try:
+        os.remove(os.path.join(queue_dir,CLAIMED_FOLDER,f'{unit_name}.json'))
+    except FileNotFoundError:
+        pass                                                                                                            # Requeued by another worker meanwhile
+
+
+def requeue_stale_units(queue_dir,stale_seconds):
+    """Move the claimed work units without a heartbeat for stale_seconds (their worker stopped) back to pending/
+    """
+    claimed_folder=os.path.join(queue_dir,CLAIMED_FOLDER)
+    now=time.time()
+    for file_name in os.listdir(claimed_folder):
+        claimed_path=os.path.join(claimed_folder,file_name)
+        try:
+            if now-os.path.getmtime(claimed_path)>stale_seconds:
+                os.rename(claimed_path,os.path.join(queue_dir,PENDING_FOLDER,file_name))
+        except FileNotFoundError:
+            pass
+
+
+def get_completed_units(queue_dir,job):
+    return [unit_idx for unit_idx in range(len(job['units'])) if os.path.exists(get_result_path(queue_dir,get_unit_name(unit_idx)))]
+
+
+@contextmanager
+def heartbeat(path,interval):
+    """Touch the claim file of a work unit every interval seconds while it is simulated, so it is not requeued as stale
+    """
+    stop=threading.Event()
+    def beat():
+        while not stop.wait(interval):
+            try:
+                os.utime(path)
+            except FileNotFoundError:
+                return
+    thread=threading.Thread(target=beat,daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def write_unit_result(queue_dir,unit_name,fault_simulator):
+    """Store the dataset, labels and solve counters of a work unit in a single .npz file, written to a temporary file moved
+       over the result of the unit (a unit requeued while its first worker finishes it is never read half written)
+    """
+    result_path=get_result_path(queue_dir,unit_name)
+    tmp_path=f'{result_path}.{socket.gethostname()}.{os.getpid()}.tmp'                                                 # One temporary file per worker, two workers may write the same unit
+    with open(tmp_path,'wb') as file:
+        np.savez(file,**fault_simulator.get_results(),**fault_simulator.get_solve_counters())
+    os.replace(tmp_path,result_path)
+
+
+def run_queue_worker(queue_dir,poll_interval=5.0):
+    """Simulate the work units of the queue until all of them have a result
+        - Wait for job.json, compile the feeder and create the fault simulator of the job
+        - Claim a pending unit, simulate it (with a heartbeat on its claim file) and write its result
+        - When no unit is pending, requeue the stale claimed units and wait for the other workers
+    """
+    from main_dataset_generation import FeederInformation, FaultInformation
+
+    queue_dir=os.path.abspath(queue_dir)                                                                               # Compiling the feeder changes the working directory
+    while not os.path.exists(os.path.join(queue_dir,JOB_FILE)):
+        time.sleep(poll_interval)
+    job=load_job(queue_dir)
+    heartbeat_interval=max(1.0,job['stale_seconds']/4)
+
+    with timed('compile'):
+        dss,_=compile_feeder(job['feeder_name'],job['feeder_file'],job['backend'])
+    fault_simulator=FaultSimulation(dss,FeederInformation(**job['feeder']),FaultInformation(**job['fault_information']),
+                                    show_progress=False,**job['simulation_options'])
+    fault_simulator.scenarios=load_scenario_plan(queue_dir)
+
+    num_units=0
+    while True:
+        unit_name=claim_unit(queue_dir)
+        if unit_name is None:
+            if len(get_completed_units(queue_dir,job))==len(job['units']):
+                break
+            requeue_stale_units(queue_dir,job['stale_seconds'])
+            time.sleep(poll_interval)
+            continue
+
+        claimed_path=os.path.join(queue_dir,CLAIMED_FOLDER,f'{unit_name}.json')
+        with open(claimed_path) as json_file:
+            unit=json.load(json_file)
+        start,stop=unit['start'],unit['stop']
+        with heartbeat(claimed_path,heartbeat_interval):
+            fault_simulator.allocate(stop-start)
+            simulate_shard(fault_simulator,(start,stop))
+            write_unit_result(queue_dir,unit_name,fault_simulator)
+        release_unit(queue_dir,unit_name)
+        num_units+=1
+    return num_units
+
+
+def launch_local_workers(queue_dir,num_workers,poll_interval):
+    """Start worker processes on this machine (in the directory the feeders are looked up from)
+    """
+    command=[sys.executable,os.path.abspath(__file__),'--queue-dir',queue_dir,'--poll-interval',str(poll_interval)]
+    return [subprocess.Popen(command,cwd=opendss_utils.SCRIPT_PATH) for _ in range(num_workers)]
+
+
+def run_queue_simulation(args,fault_simulator):
+    """Coordinator: write the work units of the run to args.queue_dir, wait for the workers and merge their results
+        - The results of the work units are copied into the arrays of fault_simulator at the rows of their units, so the
+          dataset and labels are the same as the ones of a serial run
+        - The samples of the units are added to the statistics in row order and their solve counters are merged, as with --workers
+        - Stale claimed units are requeued while waiting, rerunning the coordinator reuses the queue and its results
+    """
+    job=create_queue(args.queue_dir,args,fault_simulator,args.queue_unit_size,args.queue_stale_seconds)
+    workers=launch_local_workers(args.queue_dir,args.queue_local_workers,args.queue_poll_interval)
+
+    with tqdm(total=len(job['units']),desc="Queued Fault Simulation") as progress:
+        while True:
+            completed=len(get_completed_units(args.queue_dir,job))
+            progress.update(completed-progress.n)
+            if completed==len(job['units']):
+                break
+            if workers and all(worker.poll() is not None for worker in workers):
+                raise RuntimeError(f'The local workers stopped with {len(job["units"])-completed} work units left in {args.queue_dir}')
+            requeue_stale_units(args.queue_dir,job['stale_seconds'])
+            time.sleep(args.queue_poll_interval)
+    for worker in workers:
+        worker.wait()
+
+    # Merge the results of the work units in the order of the scenario table
+    if fault_simulator.dataset is None:
+        fault_simulator.allocate(fault_simulator.get_num_samples())
+    for unit_idx,(start,stop) in enumerate(job['units']):
+        unit_name=get_unit_name(unit_idx)
+        with timed('queue_merge'):
+            with np.load(get_result_path(args.queue_dir,unit_name)) as saved:
+                fault_simulator.store_results({name:saved[name] for name in RESULT_ARRAYS},start)
+                fault_simulator.merge_solve_counters({name:saved[name].item() for name in fault_simulator.get_solve_counters()})
+            fault_simulator.statistics.update_rows(fault_simulator.dataset[start:stop])
+
+
+if __name__ == "__main__":
+    argParser = argparse.ArgumentParser(description='worker of a fault simulation queue (see --queue-dir of main_dataset_generation.py)')
+    argParser.add_argument('--queue-dir', required=True, type=str,
+                           help='queue directory written by the coordinator, on a filesystem shared by all the workers')
+    argParser.add_argument('--poll-interval', default=5.0, type=float,
+                           help='number of seconds between two checks of the queue when no work unit is pending')
+    worker_args=argParser.parse_args()
+    num_units=run_queue_worker(worker_args.queue_dir,worker_args.poll_interval)
+    print(f'Simulated {num_units} work units')
@@ -1,42 +1,124 @@
 #Imports
 # Python Imports
+import os
+import random
+import shutil
 from dataclasses import dataclass
 
+# Additional Library Imports
+import numpy as np
+
 # Local Imports
 from opendss_utils import * 
-from fault_simulation import FaultSimulation
+from fault_simulation import FaultSimulation, RESULT_ARRAYS
 from arguments import parse_args
-from utils import store_feeder_info_to_json, visualize_tsne, dataset_export
+from utils import store_feeder_info_to_json, visualize_tsne, dataset_export, get_dataset_folder, store_performance_report, store_sampling_report
+from parallel_simulation import run_parallel_simulation
+from checkpoint import CHECKPOINT_FILE, run_checkpointed_simulation, remove_checkpoint
+from job_queue import run_queue_simulation
+from dataset_append import DATASET_INFO_FILE, plan_append, append_dataset, load_dataset_info
+from feature_extractors import get_feature_channels
+from sampling import sample_range, get_sampling_report, print_sampling_report
+from feeder_cache import get_feeder_cache_path, load_feeder_cache, save_feeder_cache
+from instrumentation import start_profiler, get_profiler, instrument_dss, instrument_fault_simulator, timed
+
+# Data class to store feeder related informations (module level so it can be sent to worker processes)
+@dataclass
+class FeederInformation:
+    feeder_name:str
+    bus_list: list
+    bus_list_1_phase: list
+    bus_list_2_phases: list
+    bus_list_3_phases: list
+    edge_list_by_bus_id: list[tuple[int]]
+    edge_list_by_bus_name: list[tuple[str]]
+    nodes:list[str]
+    nodes_by_name:list[str]
+    bus_id_map: dict
+    neighborhood_dict_1_hop_by_bus_name:dict
+    neighborhood_dict_2_hop_by_bus_name:dict
+    bus_with_loads_connected:list
+    connected_loads_name:list[str]
 
-def initialize():
+# Data class to store the fault resistances and load values
+@dataclass
+class FaultInformation:
+     fault_resistances:list
+     load_values:list
+     fault_load_values:list=None                                                                                        # Load value of each fault resistance with --joint-sampling yes (the loads of the faults are not changed if None)
+
+def initialize(argv=None,circuit=None):
     """
-     - Get the arguments passed in through argument parse
+     - Get the arguments passed in through argument parse (or argv)
      - Dump the arguments to a json file
-     - Initialize the dss object
+     - Initialize the dss object (or reuse the one of circuit, see main)
     """
     
     # Handle the arguments passed in 
-    argument_parser=parse_args()       
+    argument_parser=parse_args(argv)       
     argument_parser.dump_json()
     args=argument_parser.get_args()
     
-    # Initialize the OpenDSS object and get the file path
-    dss, dss_file=OpenDSS(args.feeder,args.feeder_file).get_dss_obj()
+    # Start recording the stages of the run
+    if args.profile:
+        start_profiler(live_interval=args.profile_interval)
     
-    # Compile the dss file and solve power flow for the first time 
-    dss.text(f"compile [{dss_file}]")
-    dss.text(f"solve")
+    # Initialize the OpenDSS object, compile the dss file and solve power flow for the first time 
+    circuit_key=(args.feeder,args.feeder_file,args.backend)
+    if circuit is not None and circuit.get('key')==circuit_key:
+        # Circuit compiled by an earlier run of the same worker, the pooled Fault elements are disabled and the loads restored
+        os.chdir(circuit['feeder_folder'])
+        dss=circuit['dss']
+        circuit['runs']+=1
+    else:
+        with timed('compile'):
+            dss,_=compile_feeder(args.feeder,args.feeder_file,args.backend)
+        if circuit is not None:
+            circuit.clear()
+            circuit.update({'key':circuit_key,'dss':dss,'feeder_folder':os.getcwd(),'feeder_infos':None,'fault_pool':{},'runs':1})
     
-    return args,dss
+    return args,instrument_dss(dss)
     
-def generate_feeder_infos(args,dss,store_info=False):
+def generate_feeder_infos(args,dss,store_info=False,circuit=None):
     """Generate necessary information for fault simulation
         - Gets the bus list of the feeder system (after exclusion of extra buses)
         - Get bus list by number of phases 
         - Get connectivity information of the feeder system
         - Get the one-hop bus names for each bus
         - Get the two-hop bus names for each bus
+    With --feeder-cache yes the information is loaded from the feeder cache when the .dss files of the feeder are unchanged
+    The information is kept in circuit (see main) and reused by the next runs on the same circuit
     """    
+    # Look up the feeder cache (keyed on the .dss files of the feeder and the excluded buses)
+    feeder_infos=None if circuit is None else circuit['feeder_infos']
+    if feeder_infos is None and args.feeder_cache=='yes':
+        cache_path=get_feeder_cache_path(args.feeder,args.feeder_file,exclude_buses(args.feeder,[])[0])
+        feeder_infos=load_feeder_cache(cache_path)
+        
+    if feeder_infos is None:
+        feeder_infos=query_feeder_infos(args,dss)
+        if args.feeder_cache=='yes':
+            save_feeder_cache(cache_path,feeder_infos)
+    if circuit is not None:
+        circuit['feeder_infos']=feeder_infos
+   
+    if store_info:
+        # Store the info related to the feeder system to a json file
+        store_feeder_info_to_json(args,feeder_infos)
+        
+    # Construct the feeder object which contains the all the information related to feeder
+    feeder = FeederInformation(args.feeder,feeder_infos['bus_list'],
+                                feeder_infos['bus_list_1_phase'], feeder_infos['bus_list_2_phases'],feeder_infos['bus_list_3_phases']
+                               ,feeder_infos['edge_list_by_bus_id'],feeder_infos['edge_list_by_bus_name'],feeder_infos['nodes'],feeder_infos['nodes_by_name'],feeder_infos['bus_id_map'],
+                               feeder_infos['neighborhood_dict_1_hop_by_bus_name'],feeder_infos['neighborhood_dict_2_hop_by_bus_name'],
+                               feeder_infos['bus_with_loads_connected'],feeder_infos['connected_loads_name'])
+    return feeder
+
+
+def query_feeder_infos(args,dss):
+    """Query the information related to the feeder system from OpenDSS
+       Returns a dictionary with the bus lists, the connectivity information, the nodes and the neighborhoods
+    """
     # Get name of all the buses that is returned by py_dss_interface
     bus_list_before_exclusion = dss.circuit_all_bus_names() 
       
@@ -72,47 +154,35 @@ def generate_feeder_infos(args,dss,store_info=False):
                   'edge_list_by_bus_name':edge_list_by_bus_name,
                   'bus_id_map':bus_id_map,
                   'bus_with_loads_connected':bus_with_loads_connected,
-                  'connected_loads_name':connected_loads_name}
-   
-    if store_info:
-        # Store the info related to the feeder system to a json file
-        store_feeder_info_to_json(args,feeder_infos)
-        
-    # Create data class to store feeder related informations    
-    @dataclass
-    class FeederInformation:
-        feeder_name:str
-        bus_list: list
-        bus_list_1_phase: list
-        bus_list_2_phases: list
-        bus_list_3_phases: list
-        edge_list_by_bus_id: list[tuple[int]]
-        edge_list_by_bus_name: list[tuple[str]]
-        nodes:list[str]
-        nodes_by_name:list[str]
-        bus_id_map: dict
-        neighborhood_dict_1_hop_by_bus_name:dict
-        neighborhood_dict_2_hop_by_bus_name:dict
-        bus_with_loads_connected:list
-        connected_loads_name:list[str]
-        
-                
-    # Construct the feeder object which contains the all the information related to feeder
-    feeder = FeederInformation(args.feeder,bus_list,
-                                bus_list_1_phase, bus_list_2_phases,bus_list_3_phases
-                               ,edge_list_by_bus_id,edge_list_by_bus_name,nodes,nodes_by_name,bus_id_map,
-                               neighborhood_dict_1_hop_by_bus_name,neighborhood_dict_2_hop_by_bus_name,
-                               bus_with_loads_connected,connected_loads_name)
-    return feeder
+                  'connected_loads_name':connected_loads_name,
+                  'nodes':nodes,
+                  'nodes_by_name':nodes_by_name,
+                  'neighborhood_dict_1_hop_by_bus_name':neighborhood_dict_1_hop_by_bus_name,
+                  'neighborhood_dict_2_hop_by_bus_name':neighborhood_dict_2_hop_by_bus_name}
+    return feeder_infos
 
 
 def generate_fault_infos(args):
     """ Generate additional information necessary for fault simulation
         - Get the fault resistance values for fault simulation
         - Get the load values for fault simulation 
+        - With --joint-sampling yes, sample the fault resistances together with a load value for each of them
+        - Print the coverage of the sampled ranges and store it in sampling_report.json
     """
-    # Get fault resistance values
-    fault_resistances=get_resistance_values(args,viz=False,num_bins=20,decimal_precision=2)
+    # Seed the random number generators so the sampled values can be reproduced
+    if args.seed is not None:
+        random.seed(args.seed)
+        np.random.seed(args.seed)
+        
+    # Get fault resistance values (with a load value for each of them, drawn from a two-dimensional design, with --joint-sampling yes)
+    fault_load_values=None
+    resistance_bounds=(args.fault_resistance_lower_end,args.fault_resistance_upper_end)
+    load_bounds=(args.load_value_KW_lower_end,args.load_value_KW_upper_end)
+    if args.joint_sampling=='yes':
+        joint_samples=sample_range(args.sampling,args.number_of_samples_for_each_node,[resistance_bounds[0],load_bounds[0]],[resistance_bounds[1],load_bounds[1]])
+        fault_resistances,fault_load_values=list(joint_samples[:,0]),list(joint_samples[:,1])
+    else:
+        fault_resistances=get_resistance_values(args,viz=False,num_bins=20,decimal_precision=2)
 
     
     # Factors 
@@ -121,51 +191,118 @@ def generate_fault_infos(args):
              '37Bus':38*3,
              '123Bus':128*3}
     
-    # Get load values 
+    # Get load values (from their own random stream, so a larger --number-of-samples-for-each-node extends the load values
+    # of a smaller one in append mode instead of shifting them by the number of fault resistance draws)
+    if args.seed is not None:
+        np.random.seed([args.seed,1])
     load_values=get_load_values(args,factors,decimal_precision=2)
     
-    # Create data class to generate 
-    @dataclass
-    class FaultInformation:
-         fault_resistances:list
-         load_values:list
-         
-    fault_information= FaultInformation(fault_resistances,load_values)
+    # Coverage of the sampled ranges (a fixed fault resistance and unchanged load values are not sampled)
+    report=get_sampling_report(args.sampling,{'fault_resistance':(fault_resistances,*resistance_bounds) if args.fault_resistance_type=='variable' else None,
+                                              'load_value':(load_values,*load_bounds) if load_values is not None else None,
+                                              'fault_resistance_x_load_value':(np.column_stack([fault_resistances,fault_load_values]),*zip(resistance_bounds,load_bounds)) if fault_load_values is not None else None})
+    print_sampling_report(report)
+    store_sampling_report(args,report)
+    
+    fault_information= FaultInformation(fault_resistances,load_values,fault_load_values)
     return fault_information
          
-def main():
+def main(argv=None,circuit=None):
+    """Generate the dataset of a run and return its number of samples
+        - argv: arguments of the run (the command line if None)
+        - circuit: dictionary a worker of the batch runner (see script.py) keeps between its runs, filled by the first run
+          of a feeder with the compiled DSS object, the feeder information and the pooled Fault elements, which the next
+          runs of the same feeder reuse instead of compiling the feeder and querying its topology again
+    """
     # Initialize the DSS object and also get the arguments passed in 
-    args, dss=initialize()
+    args, dss=initialize(argv,circuit)
     
     # Collect the feeder infos
-    feeder=generate_feeder_infos(args,dss,store_info=True)
+    feeder=generate_feeder_infos(args,dss,store_info=True,circuit=circuit)
     fault_information=generate_fault_infos(args)
     
-    # Get the fault simulator object 
-    fault_simulator=FaultSimulation(dss,feeder,fault_information)
+    # Get the fault simulator object (the samples are written straight to the dataset folder in memmap output mode)
+    checkpointing=args.checkpoint_every>0 or args.resume
+    output_folder=get_dataset_folder(args) if args.output_mode=='memmap' or checkpointing else None
+    if args.append and output_folder is not None:
+        output_folder=get_dataset_folder(args,os.path.join('dataset','append'))                                        # The new samples are added to the dataset files once simulated
+    fault_simulator=instrument_fault_simulator(FaultSimulation(dss,feeder,fault_information,output_folder=output_folder,
+                                                               solve_cache=args.solve_cache=='yes',fault_sweep=args.fault_sweep,sweep_tolerance=args.fault_sweep_tolerance,
+                                                               load_sampling=args.load_sampling,feature_channels=args.feature_channels))
+    if circuit is not None:
+        fault_simulator.fault_pool=circuit['fault_pool']                                                                # The Fault elements created by the earlier runs are edited instead of created again
+    
+    # Simulate only the scenarios of this run which are missing from the existing dataset
+    if args.append:
+        fault_simulator.scenarios=plan_append(get_dataset_folder(args),fault_simulator.get_scenarios(),feeder.bus_id_map,get_feature_channels(args.feature_channels))
+        print(f'Append mode: {len(fault_simulator.scenarios)} scenarios missing from the dataset')
+        if len(fault_simulator.scenarios)==0:
+            return 0
+    
+    # A resumed run whose dataset was exported (and its checkpoint removed) has nothing left to simulate
+    if args.resume and not os.path.exists(os.path.join(output_folder,CHECKPOINT_FILE)) and os.path.exists(os.path.join(output_folder,DATASET_INFO_FILE)):
+        num_samples=load_dataset_info(output_folder)['num_samples']
+        print(f'Resume: the dataset in {output_folder} is complete ({num_samples} samples)')
+        return num_samples
     
     # Simulate Faults
-    fault_simulator.fault_simulation_lg()
-    fault_simulator.fault_simulation_ll()
-    fault_simulator.fault_simulation_llg()
-    fault_simulator.fault_simulation_lll()
-    fault_simulator.fault_simulation_lllg()
-    fault_simulator.non_fault_simulation()
-    
-    dataset,fault_detection_labels,fault_location_labels,fault_class_labels,fault_resistance_labels,fault_currents_labels=fault_simulator.get_dataset(print_info=True)
-    
-    visualize_tsne(args,dataset,fault_class_labels,savefigure=False)
-    
-    dataset_export(args,dataset,
-                   feeder.edge_list_by_bus_id,
-                   fault_detection_labels,
-                   fault_location_labels,
-                   fault_class_labels,
-                   fault_resistance_labels,
-                   fault_currents_labels,
-                   feeder.neighborhood_dict_1_hop_by_bus_name,
-                   feeder.neighborhood_dict_2_hop_by_bus_name,
-                   feeder.bus_id_map)
+    if checkpointing:
+        # Simulate shard by shard with periodic checkpoints (the dataset is also standardized there)
+        run_checkpointed_simulation(args,fault_simulator)
+    elif args.queue_dir is not None:
+        # Write the scenarios as work units to the queue directory and merge the results of the workers
+        run_queue_simulation(args,fault_simulator)
+    elif args.workers>1:
+        # Shard the scenarios over worker processes, each one with its own copy of the feeder
+        run_parallel_simulation(args,fault_simulator,args.workers)
+    else:
+        # Simulate every row of the scenario table (all the fault types and the non-fault events)
+        fault_simulator.simulate_scenarios(fault_simulator.get_scenarios())
+    
+    dataset,fault_detection_labels,fault_location_labels,fault_class_labels,fault_resistance_labels,fault_currents_labels=fault_simulator.get_dataset(print_info=True,standardize=args.standardization=='in-place' and not checkpointing and not args.append)
+    
+    # With lazy standardization dataset.npy keeps the raw features, the visualization uses a standardized copy
+    with timed('tsne'):
+        visualize_tsne(args,dataset if args.standardization=='in-place' and not args.append else fault_simulator.statistics.transform(dataset),fault_class_labels,savefigure=False)
+    
+    if args.append:
+        # Add the new samples to the dataset files and merge their statistics into the ones of the dataset
+        num_samples=append_dataset(get_dataset_folder(args),fault_simulator.get_results(),fault_simulator.get_scenarios(),fault_simulator.statistics)
+        print(f'Append mode: the dataset has {num_samples} samples')
+        if output_folder is not None:
+            # Close the memory-mapped arrays of the new samples before removing their files
+            del dataset,fault_detection_labels,fault_location_labels,fault_class_labels,fault_resistance_labels,fault_currents_labels
+            for name in RESULT_ARRAYS:
+                setattr(fault_simulator,name,None)
+            shutil.rmtree(output_folder)
+    else:
+        dataset_export(args,dataset,
+                       feeder.edge_list_by_bus_id,
+                       fault_detection_labels,
+                       fault_location_labels,
+                       fault_class_labels,
+                       fault_resistance_labels,
+                       fault_currents_labels,
+                       feeder.neighborhood_dict_1_hop_by_bus_name,
+                       feeder.neighborhood_dict_2_hop_by_bus_name,
+                       feeder.bus_id_map,
+                       statistics=fault_simulator.statistics,
+                       dataset_format=args.dataset_format,
+                       shard_size=args.shard_size,
+                       standardized=args.standardization=='in-place',
+                       feature_dtype=args.feature_dtype,
+                       compact_labels=args.compact_labels=='yes',
+                       compression=args.compression=='yes',
+                       k_hops=args.k_hops,
+                       feature_channels=get_feature_channels(args.feature_channels),
+                       scenarios=fault_simulator.get_scenarios())
+        if checkpointing:
+            remove_checkpoint(output_folder)                                                                            # The dataset is complete, the resume state is no longer needed
+    
+    # Write the performance report of the run
+    if get_profiler() is not None:
+        store_performance_report(args,get_profiler().report())
+    return fault_simulator.get_num_samples()
     
 if __name__ == "__main__":
     main()
@@ -0,0 +1,114 @@
+#Imports
+# Python Imports
+import os
+
+# Additional Library Imports
+import numpy as np
+
+# File the statistics are saved to, next to dataset.npy
+STATISTICS_FILE='standardization_stats.npz'
+
+
+class RunningStatistics:
+    """Per-bus, per-feature mean and variance of the dataset, collected while the samples are simulated
+      - update --> Adds one sample (Welford update) or a batch of samples (Chan merge of the batch statistics)
+      - update_rows --> Adds samples one by one in row order, giving the same statistics as a serial simulation
+      - merge --> Merges the statistics of another set of samples (e.g. a shard simulated by a worker process)
+      - transform --> Standardizes samples with the collected statistics (in place or into a new array)
+      - save/load --> Stores the statistics next to dataset.npy so they can be reused at training time
+    The standardization is the same as fitting a StandardScaler() on the samples of each bus
+    """
+
+    def __init__(self,feature_shape):
+        self.count=0
+        self.shift=np.zeros(feature_shape,dtype=np.float64)                                                              # First sample, the statistics are collected on the samples minus the shift
+        self.shifted_mean=np.zeros(feature_shape,dtype=np.float64)                                                       # (near constant features like the angles would lose precision otherwise)
+        self.m2=np.zeros(feature_shape,dtype=np.float64)                                                                 # Sum of the squared differences to the mean
+
+    def update(self,samples):
+        """Add a single sample (same shape as the statistics) or a batch of samples (first axis is the sample axis)
+        """
+        samples=np.asarray(samples,dtype=np.float64)
+        if samples.shape==self.shift.shape:
+            if self.count==0:
+                self.shift=samples.copy()
+            # Welford update with a single sample
+            self.count+=1
+            delta=(samples-self.shift)-self.shifted_mean
+            self.shifted_mean+=delta/self.count
+            self.m2+=delta*((samples-self.shift)-self.shifted_mean)
+        elif len(samples)>0:
+            if self.count==0:
+                self.shift=samples[0].copy()
+            batch_mean=(samples-self.shift).mean(axis=0)
+            self._merge(len(samples),batch_mean,(((samples-self.shift)-batch_mean)**2).sum(axis=0))
+
+    def update_rows(self,samples):
+        """Add the samples (first axis is the sample axis) one by one with the Welford update of a single sample
+           The statistics are then the same, to the last bit, as the ones of a simulation which added each sample as it was
+           solved, which a batch update or a merge of the statistics of the shards only matches up to rounding
+        """
+        for sample in samples:
+            self.update(sample)
+
+    def merge(self,other):
+        """Merge the statistics of another RunningStatistics object
+        """
+        if other.count>0:
+            if self.count==0:
+                self.shift=other.shift.copy()
+            self._merge(other.count,other.shifted_mean+(other.shift-self.shift),other.m2)
+
+    def _merge(self,count,shifted_mean,m2):
+        # Chan et al. parallel combination of two sets of statistics
+        total=self.count+count
+        delta=shifted_mean-self.shifted_mean
+        self.shifted_mean=self.shifted_mean+delta*(count/total)
+        self.m2=self.m2+m2+delta**2*(self.count*count/total)
+        self.count=total
+
+    @property
+    def mean(self):
+        return self.shift+self.shifted_mean
+
+    @property
+    def var(self):
+        return self.m2/self.count if self.count>0 else np.zeros_like(self.m2)
+
+    @property
+    def scale(self):
+        """Standard deviation used for the standardization, set to 1 for (near) constant features like StandardScaler()
+        """
+        var=self.var
+        eps=np.finfo(np.float64).eps
+        constant=var<=self.count*eps*var+(self.count*self.mean*eps)**2
+        return np.where(constant,1.0,np.sqrt(var))
+
+    def transform(self,samples,out=None,buses=None,chunk_size=4096):
+        """Standardize samples (num_samples, num_buses, num_features)
+           - out: array to write the standardized samples into (pass samples to standardize in place), a new array by default
+           - buses: indices of the buses to standardize (all of them by default), the other buses of out are left unchanged
+           - chunk_size: number of samples standardized at once, so a memory-mapped dataset is never loaded as a whole
+        """
+        if out is None:
+            out=np.array(samples,dtype=np.float64)
+        buses=slice(None) if buses is None else buses
+        shift,shifted_mean,scale=self.shift[buses],self.shifted_mean[buses],self.scale[buses]
+        for start in range(0,len(samples),chunk_size):
+            rows=slice(start,start+chunk_size)
+            out[rows,buses]=((samples[rows,buses]-shift)-shifted_mean)/scale
+        return out
+
+    def save(self,folder,file_name=STATISTICS_FILE):
+        np.savez(os.path.join(folder,file_name),count=self.count,mean=self.mean,var=self.var,scale=self.scale,
+                 shift=self.shift,shifted_mean=self.shifted_mean,m2=self.m2)
+
+    @classmethod
+    def load(cls,folder,file_name=STATISTICS_FILE):
+        saved=np.load(os.path.join(folder,file_name))
+        statistics=cls(saved['mean'].shape)
+        statistics.count=int(saved['count'])
+        statistics.shift=saved['shift']
+        statistics.shifted_mean=saved['shifted_mean']
+        statistics.m2=saved['m2']
+        return statistics
@@ -5,25 +5,124 @@ import py_dss_interface
 import os 
 import pathlib
 import random
-from collections import defaultdict
 
 
 # Additional Imports
 import numpy as np
 import seaborn as sns
 import matplotlib.pyplot as plt
-import networkx as nx
+
+# Local Imports
+from sparse_topology import get_k_hop_buses
+from sampling import sample_range
  
+# Directory the feeders are looked up from, resolved at import because compiling a feeder changes the working directory
+SCRIPT_PATH = os.path.dirname(os.path.abspath('__file__'))
+
+# Bindings the OpenDSS object can be created with (--backend)
+DSS_BACKENDS=['py_dss_interface','dss_python']
+
 class OpenDSS():
-    """Interfacing to OpenDSS with py_dss_interface
+    """Interfacing to OpenDSS with py_dss_interface (default) or DSS-Python
     """
-    def __init__(self,feeder_name,feeder_init_dss_file):
-        self.script_path = os.path.dirname(os.path.abspath('__file__'))                      
+    def __init__(self,feeder_name,feeder_init_dss_file,backend='py_dss_interface'):
+        self.script_path = SCRIPT_PATH                      
         self.dss_file = pathlib.Path(self.script_path).joinpath("feeders",feeder_name, feeder_init_dss_file )
-        self.dss=py_dss_interface.DSSDLL()
+        self.dss=py_dss_interface.DSSDLL() if backend=='py_dss_interface' else DSSPythonBackend()
         
     def get_dss_obj(self):
         return self.dss, self.dss_file
+
+class DSSPythonBackend():
+    """DSS-Python (the in-process engine OpenDSSDirect.py is built on) behind the DSSDLL methods used by the dataset generation
+       - compile/solve and the other commands: text
+       - active bus/element: circuit_set_active_bus, circuit_set_active_element, bus_nodes, bus_kv_base, bus_load_list, bus_all_pde_active_bus
+       - circuit-wide queries: circuit_all_bus_names, circuit_all_node_names, circuit_all_bus_vmag_pu, circuit_all_bus_volts
+       - loads: loads_all_names, loads_write_idx, loads_read_kw, loads_write_kw
+       - power delivery elements: pdelements_first, pdelements_next, cktelement_read_bus_names, cktelement_node_order,
+         cktelement_y_prim, cktelement_currents
+       The voltages and currents are returned as numpy arrays (no conversion to Python lists)
+    """
+    def __init__(self):
+        try:
+            from dss import DSS
+        except ImportError:
+            raise ImportError("The dss_python backend needs DSS-Python (pip install dss_python)") from None
+        self.engine=DSS
+        self.engine.AllowEditor=False                                                                                   # Show/Export commands of the feeder files must not open an editor
+        self.circuit=self.engine.ActiveCircuit
+        
+    def text(self,command):
+        self.engine.Text.Command=command
+        return self.engine.Text.Result
+    
+    def circuit_all_bus_names(self):
+        return list(self.circuit.AllBusNames)
+    
+    def circuit_all_node_names(self):
+        return list(self.circuit.AllNodeNames)
+    
+    def circuit_all_bus_vmag_pu(self):
+        return self.circuit.AllBusVmagPu
+    
+    def circuit_all_bus_volts(self):
+        return self.circuit.AllBusVolts
+    
+    def circuit_set_active_bus(self,bus):
+        return self.circuit.SetActiveBus(bus)
+    
+    def circuit_set_active_element(self,element):
+        return self.circuit.SetActiveElement(element)
+    
+    def bus_nodes(self):
+        return self.circuit.ActiveBus.Nodes.tolist()
+    
+    def bus_kv_base(self):
+        return self.circuit.ActiveBus.kVBase
+    
+    def bus_load_list(self):
+        return [load for load in self.circuit.ActiveBus.LoadList if load]                                               # DSS-Python pads the element lists with an empty name
+    
+    def bus_all_pde_active_bus(self):
+        return [element for element in self.circuit.ActiveBus.AllPDEatBus if element]
+    
+    def loads_all_names(self):
+        return list(self.circuit.Loads.AllNames)
+    
+    def loads_write_idx(self,idx):
+        self.circuit.Loads.idx=idx
+    
+    def loads_read_kw(self):
+        return self.circuit.Loads.kW
+    
+    def loads_write_kw(self,kw):
+        self.circuit.Loads.kW=kw
+    
+    def pdelements_first(self):
+        return self.circuit.PDElements.First
+    
+    def pdelements_next(self):
+        return self.circuit.PDElements.Next
+    
+    def cktelement_read_bus_names(self):
+        return list(self.circuit.ActiveCktElement.BusNames)
+    
+    def cktelement_node_order(self):
+        return self.circuit.ActiveCktElement.NodeOrder
+    
+    def cktelement_y_prim(self):
+        return self.circuit.ActiveCktElement.Yprim
+    
+    def cktelement_currents(self):
+        return self.circuit.ActiveCktElement.Currents
+
+def compile_feeder(feeder_name,feeder_init_dss_file,backend='py_dss_interface'):
+    """Create a new OpenDSS object, compile the feeder and solve the power flow for the first time
+    """
+    dss, dss_file=OpenDSS(feeder_name,feeder_init_dss_file,backend).get_dss_obj()
+    dss.text(f"compile [{dss_file}]")
+    dss.text(f"solve")
+    return dss, dss_file
     
 def exclude_buses(feeder_name,bus_list):
     """Exclude pre-specified buses
@@ -39,6 +138,8 @@ def exclude_buses(feeder_name,bus_list):
         bus_to_exclude =['610','300_open','94_open','150']
     elif feeder_name=="8500-Node":
         bus_to_exclude =['sourcebus']
+    else:                               # Other feeder systems (e.g. the synthetic feeders of the benchmark) --> No exclusion
+        bus_to_exclude =[]
         
     updated_bus_list = [bus for bus in bus_list if bus not in bus_to_exclude]
     return bus_to_exclude,updated_bus_list
@@ -96,6 +197,8 @@ def get_connectivity_info(dss,bus_list):
     """Returns graph connectivity information in edge list format. In 2 formats
      - Edge list by bus name which provides information of edge between two bus
      - Edge list by bus id 
+    The power delivery elements are walked once and two buses are connected if they are terminals of the same element.
+    The edges are listed in the order of bus_list (by first bus, then by second bus)
     """
     
     edge_list_by_bus_name=[]                                                                                                       
@@ -104,15 +207,21 @@ def get_connectivity_info(dss,bus_list):
     bus_ids =list(range(len(bus_list)))    
     bus_id_map = dict(zip(bus_list, bus_ids))                                                                        
     
+    neighbor_ids={bus:set() for bus in bus_list}                                                                        # Ids of the buses sharing a power delivery element with each bus
+    element=dss.pdelements_first()                                                                                      # Set the first power delivery element to be active
+    while element:
+        element_buses={bus_name.split('.')[0].lower() for bus_name in dss.cktelement_read_bus_names()}                  # Buses at the terminals of the element (without the node suffix)
+        element_bus_ids={bus_id_map[bus] for bus in element_buses if bus in bus_id_map}                                 # Keep only the buses of bus_list
+        for bus in element_buses:
+            if bus in bus_id_map:
+                neighbor_ids[bus].update(element_bus_ids)
+        element=dss.pdelements_next()                                                                                   # Move to the next power delivery element
+                
     for active_bus1 in bus_list:                                                                                        # Enumerate over all the buses 
-        dss.circuit_set_active_bus(active_bus1)                                                                         # Set a particular bus to be active
-        pde_bus1= dss.bus_all_pde_active_bus()                                                                          # For a particular bus get the power delivery element to it as a list 
-        for active_bus2 in bus_list:                                                                                    # Enumerate over all the buses again
-            dss.circuit_set_active_bus(active_bus2)                                                                     # Set a particular bus to be active
-            pde_bus2 = dss.bus_all_pde_active_bus()                                                                     # For a particular bus get the the power delivery element to it as a list 
-            if any(element in  pde_bus1 for element in  pde_bus2) and active_bus1!=active_bus2:                         # If there is a common power delivery element and two buses are not the same
-                edge_list_by_bus_name.append((active_bus1,active_bus2))                                                            
-                edge_list_by_bus_id.append((bus_id_map[active_bus1],bus_id_map[active_bus2]))                                      
+        for bus_id2 in sorted(neighbor_ids[active_bus1]-{bus_id_map[active_bus1]}):                                     # Enumerate over the connected buses in the order of bus_list
+            active_bus2=bus_list[bus_id2]
+            edge_list_by_bus_name.append((active_bus1,active_bus2))                                                            
+            edge_list_by_bus_id.append((bus_id_map[active_bus1],bus_id2))                                      
                 
     return edge_list_by_bus_id,edge_list_by_bus_name,bus_id_map
 
@@ -122,6 +231,7 @@ def get_resistance_values(args,viz=False,**kwargs):
        Two ways are specified for generating the resistance values: fixed and variable
        - fixed: returns the same value repeated for number of sampels 
        - variable: Assuming data is generated for three-phase (node) bus, for each phase (node) a random seed is set and resistance value is sampled from a uniform distribution
+         (or stratified over the range with --sampling lhs, sobol or halton, see sampling.sample_range)
     If viz is set to True it will create a histogram of sampled values and save the image to --folder
     """
     if args.fault_resistance_type=="fixed":
@@ -143,10 +253,13 @@ def get_resistance_values(args,viz=False,**kwargs):
         
         fault_resistances=[]
         
-        # Set a random seed 
-        np.random.seed(random.randint(1,1000))
-        # Generate fault resistance value by sampling from a uniform distribution
-        fault_resistance_samples_per_node= list(np.round(np.random.uniform(lower_bound,upper_bound,number_of_samples), decimals=decimal_precision))
+        if args.sampling=='random':
+            # Set a random seed 
+            np.random.seed(random.randint(1,1000))
+            # Generate fault resistance value by sampling from a uniform distribution
+            fault_resistance_samples_per_node= list(np.round(np.random.uniform(lower_bound,upper_bound,number_of_samples), decimals=decimal_precision))
+        else:
+            fault_resistance_samples_per_node= list(sample_range(args.sampling,number_of_samples,lower_bound,upper_bound,decimal_precision)[:,0])
         fault_resistances.extend(fault_resistance_samples_per_node)  
                 
     if viz==True:
@@ -177,46 +290,24 @@ def get_load_values(args,factors,**kwargs):
         # Extract number of samples 
         number_of_samples=args.number_of_samples_for_each_node
         
-        # Generate load values by sampling from a uniform distribution
-        lds= list(np.round(np.random.uniform(upper_bound_KW,lower_bound_KW,number_of_samples*factors[args.feeder]),decimals=decimal_precision))                                                       
+        # Generate load values by sampling from a uniform distribution (or stratified over the range, see sampling.sample_range)
+        if args.sampling=='random':
+            lds= list(np.round(np.random.uniform(upper_bound_KW,lower_bound_KW,number_of_samples*factors[args.feeder]),decimals=decimal_precision))                                                       
+        else:
+            lds= list(sample_range(args.sampling,number_of_samples*factors[args.feeder],upper_bound_KW,lower_bound_KW,decimal_precision)[:,0])
         
         return lds
 
 def get_one_hop_buses(edge_list_by_bus_name):
     """Generate bus list within one-hop for each bus in the feeder system
     """
-    neighborhood_dict_1_hop_by_bus_name= defaultdict(set)
-    # Iterate over each edge and add the neighboring nodes
-    for node1, node2 in edge_list_by_bus_name:
-        neighborhood_dict_1_hop_by_bus_name[node1].add(node2)
-        neighborhood_dict_1_hop_by_bus_name[node2].add(node1)
-
-    # Convert the sets to lists 
-    neighborhood_dict_1_hop_by_bus_name = {node: list(neighborhood.union({node})) for node, neighborhood in neighborhood_dict_1_hop_by_bus_name.items()}
-    
-    return neighborhood_dict_1_hop_by_bus_name
+    return get_k_hop_buses(edge_list_by_bus_name,1)
 
 
 def get_two_hop_buses(edge_list_by_bus_name):
-    """Generate bus list within two-hop for each bus in the feeder system
+    """Generate bus list within two-hop for each bus in the feeder system (sparse boolean matrix product, see sparse_topology)
     """
-    # Create an empty graph
-    graph = nx.Graph()
-
-    # Add edges from the edge_list_by_bus_name
-    graph.add_edges_from(edge_list_by_bus_name)
-
-    # Get the 1-hop and 2-hop neighbors for every node
-    neighborhood_dict_2_hop_by_bus_name = {}
-    for node in graph.nodes():
-        neighbors = set(graph.neighbors(node))
-        neighborhood_dict_2_hop_by_bus_name[node] = neighbors.copy()
-        for neighbor in neighbors:
-            neighborhood_dict_2_hop_by_bus_name[node].update(set(graph.neighbors(neighbor)))
-
-    neighborhood_dict_2_hop_by_bus_name = {node: list(neighborhood.union({node})) for node, neighborhood in neighborhood_dict_2_hop_by_bus_name.items()}
-
-    return neighborhood_dict_2_hop_by_bus_name
+    return get_k_hop_buses(edge_list_by_bus_name,2)
 
 
 def get_nodes(dss,bus_list):
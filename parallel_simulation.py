@@ -0,0 +1,99 @@
+#Imports
+# Python Imports
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Additional Library Imports
+from tqdm import tqdm
+
+# Local Imports
+import opendss_utils
+from opendss_utils import compile_feeder
+from fault_simulation import FaultSimulation
+from instrumentation import start_profiler, get_profiler, instrument_dss, instrument_fault_simulator, timed
+
+# State of a worker process (one OpenDSS instance per worker)
+_worker={}
+
+
+def build_shards(fault_simulator,num_shards=None,shard_samples=None):
+    """Split the scenario table into contiguous shards
+        - num_shards: number of shards
+        - shard_samples: number of samples of each shard, used instead of num_shards
+       Returns a list of (start, stop) rows of the scenario table in the order of the serial simulation,
+       the rows of the scenario table being the rows of the dataset
+    """
+    num_samples=fault_simulator.get_num_samples()
+    if shard_samples is None:
+        shard_samples=max(1,-(-num_samples//num_shards))                                                                # Ceil division so that there are at most num_shards shards
+    return [(start,min(start+shard_samples,num_samples)) for start in range(0,num_samples,shard_samples)]
+
+
+def _init_worker(script_path,feeder_name,feeder_file,backend,feeder,fault_information,scenarios,simulation_options,profile):
+    """Compile a copy of the feeder in the worker process (with the OpenDSS backend of the main process) and create its fault simulator
+       - simulation_options: solve cache and fault sweep settings of the fault simulator of the main process
+       - profile: record the stages of the worker (they are sent back with the results of each shard)
+    """
+    # The worker starts in the working directory of the main process, which is the feeder folder once the feeder is compiled
+    opendss_utils.SCRIPT_PATH=script_path
+    if profile:
+        start_profiler()
+    with timed('compile'):
+        dss,_=compile_feeder(feeder_name,feeder_file,backend)
+    dss=instrument_dss(dss)
+    fault_simulator=instrument_fault_simulator(FaultSimulation(dss,feeder,fault_information,show_progress=False,**simulation_options))
+    fault_simulator.scenarios=scenarios                                                                             # Reuse the scenario table built by the main process
+
+    _worker['fault_simulator']=fault_simulator
+
+
+def _run_shard(shard):
+    """Simulate a single shard in a worker process and return its dataset and label arrays,
+       the solve counters (solves skipped by the solve cache and largest error of the fault sweep validation) and the records of the profiler (None without --profile)
+    """
+    start,stop=shard
+    fault_simulator=_worker['fault_simulator']
+    fault_simulator.allocate(stop-start)
+    simulate_shard(fault_simulator,shard)                                                                            # The loads changed by non-fault events are restored at the end of the shard
+    return fault_simulator.get_results(),fault_simulator.get_solve_counters(),get_profiler().snapshot() if get_profiler() is not None else None
+
+
+def simulate_shard(fault_simulator,shard):
+    """Simulate a shard, its samples are written starting at the current row of fault_simulator
+    """
+    start,stop=shard
+    fault_simulator.simulate_scenarios(fault_simulator.get_scenarios()[start:stop])
+
+
+def run_parallel_simulation(args,fault_simulator,workers,num_shards_per_worker=4,shards=None,on_shard_done=None):
+    """Simulate all the fault types (and the non-fault events) over a pool of worker processes
+        - The scenario table is split into shards (or the given shards are simulated)
+        - Each worker process compiles its own copy of the feeder and simulates the shards it receives
+        - The results are written into the arrays of fault_simulator at the row of their shard,
+          so the dataset and label arrays are the same as in a serial run
+        - The samples of each shard are added to the statistics of fault_simulator in row order (see RunningStatistics.update_rows),
+          so the standardized dataset is also the same as in a serial run
+        - on_shard_done is called with each shard once its results are written (used for checkpointing)
+    """
+    if fault_simulator.dataset is None:
+        fault_simulator.allocate(fault_simulator.get_num_samples())
+    if shards is None:
+        shards=build_shards(fault_simulator,workers*num_shards_per_worker)
+
+    # Spawn the worker processes so that each of them loads its own OpenDSS library
+    context=multiprocessing.get_context('spawn')
+    simulation_options={'solve_cache':fault_simulator.solve_cache,'fault_sweep':fault_simulator.fault_sweep,'sweep_tolerance':fault_simulator.sweep_tolerance,
+                        'load_sampling':fault_simulator.load_sampling,'feature_channels':fault_simulator.feature_channels}
+    initargs=(opendss_utils.SCRIPT_PATH,args.feeder,args.feeder_file,args.backend,fault_simulator.feeder,fault_simulator.fault_information,fault_simulator.get_scenarios(),simulation_options,get_profiler() is not None)
+
+    with ProcessPoolExecutor(max_workers=workers,mp_context=context,initializer=_init_worker,initargs=initargs) as executor:
+        # executor.map returns the results in the order of the shards
+        for shard,(results,solve_counters,records) in tqdm(zip(shards,executor.map(_run_shard,shards)),desc="Parallel Fault Simulation",total=len(shards)):
+            fault_simulator.store_results(results,shard[0])
+            with timed('statistics'):
+                fault_simulator.statistics.update_rows(fault_simulator.dataset[shard[0]:shard[1]])
+            fault_simulator.merge_solve_counters(solve_counters)
+            if records is not None:
+                get_profiler().merge(records)
+            if on_shard_done is not None:
+                on_shard_done(shard)
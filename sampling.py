@@ -0,0 +1,94 @@
+#Imports
+# Python Imports
+import warnings
+
+# Additional Library Imports
+import numpy as np
+from scipy.stats import qmc
+from print_color import print
+
+# Samplers of the fault resistances and load values (see --sampling)
+SAMPLERS=['random','lhs','sobol','halton']
+
+
+def sample_unit_hypercube(sampler,num_samples,dimensions=1):
+    """Draw num_samples points of the unit hypercube [0, 1)^dimensions
+        - random: independent uniform draws
+        - lhs: Latin hypercube, each of the num_samples equal strata of each dimension holds exactly one point
+        - sobol, halton: scrambled low-discrepancy sequences (Sobol keeps its balance properties for powers of two)
+       The samplers are seeded from the global NumPy generator, so --seed reproduces them
+       Returns an array of shape (num_samples, dimensions)
+    """
+    rng=np.random.default_rng(np.random.randint(2**31))
+    if sampler=='random':
+        return rng.uniform(size=(num_samples,dimensions))
+    if sampler=='lhs':
+        engine=qmc.LatinHypercube(d=dimensions,seed=rng)
+    elif sampler=='sobol':
+        engine=qmc.Sobol(d=dimensions,seed=rng)
+    elif sampler=='halton':
+        engine=qmc.Halton(d=dimensions,seed=rng)
+    else:
+        raise ValueError(f'Unknown sampler {sampler}, expected one of {SAMPLERS}')
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore',UserWarning)                                                                    # Sobol warns when num_samples is not a power of two
+        return engine.random(num_samples)
+
+
+def sample_range(sampler,num_samples,lower_bounds,upper_bounds,decimal_precision=2):
+    """Sample num_samples points between the lower and upper bounds of each dimension, rounded to decimal_precision
+       Returns an array of shape (num_samples, number of bounds)
+    """
+    lower_bounds=np.atleast_1d(np.asarray(lower_bounds,dtype=np.float64))
+    upper_bounds=np.atleast_1d(np.asarray(upper_bounds,dtype=np.float64))
+    samples=qmc.scale(sample_unit_hypercube(sampler,num_samples,len(lower_bounds)),lower_bounds,upper_bounds)
+    return np.round(samples,decimals=decimal_precision)
+
+
+def get_coverage(samples,lower_bounds,upper_bounds):
+    """Coverage of the sampled range by samples of shape (num_samples, dimensions), computed on the values scaled to [0, 1]
+        - discrepancy: centered L2 discrepancy of the points (lower is more uniform)
+        - strata_coverage: fraction of the num_samples equal strata of each dimension holding a point (smallest over the
+          dimensions, 1 for a Latin hypercube, about 0.63 for random draws)
+        - max_gap: largest interval of a dimension without a point, as a fraction of the range
+    """
+    samples=np.asarray(samples,dtype=np.float64).reshape(len(samples),-1)
+    lower_bounds=np.atleast_1d(np.asarray(lower_bounds,dtype=np.float64))
+    upper_bounds=np.atleast_1d(np.asarray(upper_bounds,dtype=np.float64))
+    span=np.where(upper_bounds>lower_bounds,upper_bounds-lower_bounds,1.0)
+    unit=np.clip((samples-lower_bounds)/span,0,1)
+    num_samples=len(unit)
+    if num_samples==0:
+        return {'num_samples':0,'discrepancy':None,'strata_coverage':0.0,'max_gap':1.0}
+
+    strata=np.minimum((unit*num_samples).astype(np.int64),num_samples-1)
+    strata_coverage=min(len(np.unique(strata[:,dim]))/num_samples for dim in range(unit.shape[1]))
+    edges=np.sort(unit,axis=0)
+    gaps=np.diff(np.concatenate([np.zeros((1,unit.shape[1])),edges,np.ones((1,unit.shape[1]))]),axis=0)
+    return {'num_samples':int(num_samples),
+            'discrepancy':float(qmc.discrepancy(unit,method='CD')),
+            'strata_coverage':float(strata_coverage),
+            'max_gap':float(gaps.max())}
+
+
+def get_sampling_report(sampler,sampled_values):
+    """Coverage (see get_coverage) of each sampled quantity of a run
+       - sampled_values: dictionary of name --> (samples, lower bounds, upper bounds), None for a quantity which is not sampled
+    """
+    report={'sampler':sampler}
+    for name,values in sampled_values.items():
+        report[name]=None if values is None else get_coverage(*values)
+    return report
+
+
+def print_sampling_report(report):
+    print('Sampling Coverage',color='yellow',format='bold')
+    print('---------------------------------',color='yellow')
+    for name,coverage in report.items():
+        if name=='sampler' or coverage is None:
+            continue
+        discrepancy='n/a' if coverage['discrepancy'] is None else f"{coverage['discrepancy']:.3g}"
+        print(f"{coverage['num_samples']} samples ({report['sampler']}), discrepancy {discrepancy}, "
+              f"strata coverage {coverage['strata_coverage']:.1%}, max gap {coverage['max_gap']:.1%} of the range",
+              tag=name, tag_color='yellow', color='white')
+    print('')
@@ -0,0 +1,79 @@
+#Imports
+# Additional Library Imports
+import numpy as np
+
+# Dictionary that maps fault types to a integer number (also the order in which the fault types are simulated)
+FAULT_CLASS_MAP={'LG':0,'LL':1,'LLG':2,'LLL':3,'LLLG':4,'Non_Fault':5}
+FAULT_TYPES=list(FAULT_CLASS_MAP)
+
+# Settings of the Fault element of each fault type (r is appended with the fault resistance)
+FAULT_SETTINGS={'LG':'Bus1={bus}.{node1} Phases=1',
+                'LL':'Bus1={bus}.{node1} Bus2={bus}.{node2} Phases=1',
+                'LLG':'Bus1={bus}.{node1}.{node1} Bus2={bus}.{node2}.0 Phases=2',
+                'LLL':'Bus1={bus}.1.2.3 Bus2={bus}.4.4.4 Phases=3',
+                'LLLG':'Bus1={bus}.1.2.3 Phases=3'}
+
+# One row of the scenario table for each simulated sample
+SCENARIO_DTYPE=np.dtype([('fault_class',np.int8),                                                                        # Fault type (see FAULT_CLASS_MAP)
+                         ('bus_id',np.int32),                                                                            # Faulted bus (index in feeder.bus_list, -1 for non-fault events)
+                         ('node1',np.int8),                                                                              # Faulted nodes of the bus (LG: node1, LL/LLG: node1 and node2)
+                         ('node2',np.int8),
+                         ('resistance',np.float64),                                                                      # Fault resistance (0 for non-fault events)
+                         ('load_value',np.float64),                                                                      # Load value of the non-fault events (0 for faults, except with --joint-sampling yes)
+                         ('fault_location',np.int32)])                                                                   # Fault location label (bus_id, -100 for non-fault events)
+
+
+def build_scenario_table(feeder,fault_information):
+    """Build the scenarios of all the fault types, in the order they are simulated
+        - LG: every node of the three-phase buses
+        - LL/LLG: every pair of nodes (lower node first) of the three-phase buses
+        - LLL/LLLG: every three-phase bus
+        - Non_Fault: every load value
+       Every fault location is repeated for each fault resistance (with its load value if fault_information.fault_load_values is set)
+       Returns a structured array with SCENARIO_DTYPE
+    """
+    resistances=np.asarray(fault_information.fault_resistances,dtype=np.float64)
+    fault_load_values=np.zeros_like(resistances) if fault_information.fault_load_values is None else np.asarray(fault_information.fault_load_values,dtype=np.float64)
+    three_phase_buses=set(feeder.bus_list_3_phases)
+
+    # Nodes of each three-phase bus in the order they are returned by OpenDSS
+    bus_nodes={}
+    for node in feeder.nodes:
+        bus,phase=node.rsplit('.',1)
+        if bus in three_phase_buses:
+            bus_nodes.setdefault(bus,[]).append(int(phase))
+
+    # (bus id, node1, node2) of the fault locations of each fault type
+    locations={fault_type:[] for fault_type in FAULT_SETTINGS}
+    for bus,nodes in bus_nodes.items():
+        bus_id=feeder.bus_id_map[bus]
+        node_pairs=[(bus_id,node1,node2) for node1 in nodes for node2 in nodes if node1<node2]
+        locations['LG'].extend((bus_id,node,0) for node in nodes)
+        locations['LL'].extend(node_pairs)
+        locations['LLG'].extend(node_pairs)
+        locations['LLL'].append((bus_id,0,0))
+        locations['LLLG'].append((bus_id,0,0))
+
+    tables=[]
+    for fault_type,fault_locations in locations.items():
+        fault_locations=np.array(fault_locations,dtype=np.int64).reshape(-1,3)
+        table=np.zeros(len(fault_locations)*len(resistances),dtype=SCENARIO_DTYPE)
+        table['fault_class']=FAULT_CLASS_MAP[fault_type]
+        table['bus_id']=np.repeat(fault_locations[:,0],len(resistances))
+        table['node1']=np.repeat(fault_locations[:,1],len(resistances))
+        table['node2']=np.repeat(fault_locations[:,2],len(resistances))
+        table['resistance']=np.tile(resistances,len(fault_locations))
+        table['load_value']=np.tile(fault_load_values,len(fault_locations))
+        table['fault_location']=table['bus_id']
+        tables.append(table)
+
+    # Non-fault events (no load values when --change-load-values is 'no')
+    load_values=np.asarray(fault_information.load_values if fault_information.load_values is not None else [],dtype=np.float64)
+    table=np.zeros(len(load_values),dtype=SCENARIO_DTYPE)
+    table['fault_class']=FAULT_CLASS_MAP['Non_Fault']
+    table['bus_id']=-1
+    table['load_value']=load_values
+    table['fault_location']=-100
+    tables.append(table)
+
+    return np.concatenate(tables)
@@ -1,84 +1,179 @@
-import subprocess
-
-FEEDER_SYSTEM='8500-Node' # Change to select different feeder systems
-
-if FEEDER_SYSTEM=="8500-Node":
-    command = [
-        'python', 'main_dataset_generation.py',
-        '--feeder', '8500-Node',
-        '--feeder-file', 'RUN_8500Node.dss',
-        '--folder', 'initial',
-        '--fault-resistance-type','variable',
-        '--fault-resistance-value','20',
-        '--fault-resistance-lower-end', '0.05',
-        '--fault-resistance-upper-end','20',
-        '--number-of-samples-for-each-node','1',
-        '--change-load-values','yes',
-        '--load-value-KW-lower-end','20',
-        '--load-value-KW-upper-end','80'
-    ] 
-
-elif FEEDER_SYSTEM=="123Bus":
-    command = [
-        'python', 'main_dataset_generation.py',
-        '--feeder', '123Bus',
-        '--feeder-file', 'IEEE123Master.dss',
-        '--folder', '123Bus_Dataset',
-        '--fault-resistance-type','variable',
-        '--fault-resistance-value','20',
-        '--fault-resistance-lower-end', '0.05',
-        '--fault-resistance-upper-end','20',
-        '--number-of-samples-for-each-node','10',
-        '--change-load-values','yes',
-        '--load-value-KW-lower-end','20',
-        '--load-value-KW-upper-end','80'
-    ]
-    
-elif FEEDER_SYSTEM=="37Bus":
-       command = [
-        'python', 'main_dataset_generation.py',
-        '--feeder', '37Bus',
-        '--feeder-file', 'ieee37.dss',
-        '--fault-resistance-type','fixed',
-        '--fault-resistance-value','20',
-        '--fault-resistance-lower-end', '0.05',
-        '--fault-resistance-upper-end', '20',
-        '--folder', '37Bus_Dataset',
-        '--number-of-samples-for-each-node','10',
-        '--change-load-values','yes',
-        '--load-value-KW-lower-end','20',
-        '--load-value-KW-upper-end','80'
-    ]
-elif FEEDER_SYSTEM=="34Bus":
-        command = [
-        'python', 'main_dataset_generation.py',
-        '--feeder', '34Bus',
-        '--feeder-file', 'Run_IEEE34Mod1.dss',
-        '--fault-resistance-type','fixed',
-        '--fault-resistance-value','20',
-        '--fault-resistance-lower-end', '0.05',
-        '--fault-resistance-upper-end', '20',
-        '--folder', '34Bus_Dataset' ,
-        '--number-of-samples-for-each-node','10',
-        '--change-load-values','yes',
-        '--load-value-KW-lower-end','20',
-        '--load-value-KW-upper-end','80'   
-    ]
-        
-elif FEEDER_SYSTEM=="13Bus":
-     command = [
-        'python','main_dataset_generation.py',
-        '--feeder', '13Bus',
-        '--feeder-file', 'IEEE13Nodeckt.dss',
-        '--fault-resistance-type','fixed',
-        '--fault-resistance-value','20',
-        '--fault-resistance-lower-end', '0.05',
-        '--fault-resistance-upper-end', '20',
-        '--folder', '13Bus_Dataset' ,
-        '--number-of-samples-for-each-node','10',
-        '--change-load-values','yes',
-        '--load-value-KW-lower-end','20',
-        '--load-value-KW-upper-end','80'  
-    ]
-    
-subprocess.run(command)
+#Imports
+# Python Imports
+import os
+import json
+import time
+import argparse
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import redirect_stdout, redirect_stderr
+
+# Additional Library Imports
+from tqdm import tqdm
+from print_color import print
+
+# Local Imports
+import opendss_utils
+from main_dataset_generation import main
+from instrumentation import stop_profiler
+
+# Compiled circuit of the worker process, kept between the jobs of the same feeder (see main_dataset_generation.main)
+_worker={'circuit':{}}
+
+
+def get_batch_args():
+    argParser = argparse.ArgumentParser(description='generate the datasets of several feeders and parameter sets over a pool of worker processes')
+    argParser.add_argument('--config', default='batch_config.json', type=str,
+                           help='JSON file with the jobs of the batch (see batch_config.json)')
+    argParser.add_argument('--jobs', default=None, nargs='+', type=str,
+                           help='names of the jobs of the config to run (all of them by default)')
+    argParser.add_argument('--workers', default=None, type=int,
+                           help='number of worker processes (the workers of the config by default)')
+    argParser.add_argument('--report', default='batch_report.json', type=str,
+                           help='JSON file the status, number of samples and time of each job are written to')
+    return argParser.parse_args()
+
+
+def get_job_argv(options):
+    """Command line arguments of main_dataset_generation.py for a dictionary of options
+        - {"feeder": "13Bus"} --> ['--feeder', '13Bus']
+        - true adds the flag alone (e.g. {"profile": true}), false and null leave the option out
+        - a list gives several values (e.g. {"backends": ["py_dss_interface", "dss_python"]})
+    """
+    argv=[]
+    for name,value in options.items():
+        if value is True:
+            argv.append(f'--{name}')
+        elif value is False or value is None:
+            continue
+        elif isinstance(value,list):
+            argv+=[f'--{name}']+[str(item) for item in value]
+        else:
+            argv+=[f'--{name}',str(value)]
+    return argv
+
+
+def load_batch_config(config_path,job_names=None):
+    """Jobs of the config, each one with its name, the arguments of its run (the defaults of the config updated with
+       the args of the job) and the key of its circuit
+       The jobs of the same feeder are ordered one after the other, so a worker is likely to take the next job of the
+       feeder it has compiled
+    """
+    with open(config_path) as json_file:
+        config=json.load(json_file)
+    jobs=[]
+    for job in config['jobs']:
+        if job_names is not None and job['name'] not in job_names:
+            continue
+        options={**config.get('defaults',{}),**job['args']}
+        jobs.append({'name':job['name'],
+                     'argv':get_job_argv(options),
+                     'folder':os.path.splitext(options.get('folder','initial_folder'))[0],
+                     'circuit_key':(options.get('feeder','123Bus'),options.get('feeder-file','IEEE123Master.dss'),options.get('backend','py_dss_interface'))})
+
+    names=[job['name'] for job in jobs]
+    if job_names is not None and set(job_names)-set(names):
+        raise ValueError(f'No job named {sorted(set(job_names)-set(names))} in {config_path}')
+    if len(set(names))!=len(names):
+        raise ValueError(f'The job names of {config_path} must be unique')
+    folders=[job['folder'] for job in jobs]
+    if len(set(folders))!=len(folders):
+        raise ValueError(f'Each job of {config_path} needs its own --folder')
+
+    circuit_order={}
+    for job in jobs:
+        circuit_order.setdefault(job['circuit_key'],len(circuit_order))
+    jobs.sort(key=lambda job:circuit_order[job['circuit_key']])
+    return config,jobs
+
+
+def _init_worker(script_path):
+    opendss_utils.SCRIPT_PATH=script_path
+
+
+def _run_job(job,log_folder):
+    """Run a job in the worker process with its output written to log_folder/<name>.log
+       A failed job (including invalid arguments) is reported instead of stopping the worker, its circuit is compiled again by the next job
+    """
+    # The folder of the run is created relative to the working directory, which is the feeder folder once a feeder is compiled
+    os.chdir(opendss_utils.SCRIPT_PATH)
+    circuit=_worker['circuit']
+    result={'name':job['name'],'worker':os.getpid(),'log':os.path.join(log_folder,f"{job['name']}.log")}
+    start=time.perf_counter()
+    with open(os.path.join(opendss_utils.SCRIPT_PATH,result['log']),'w') as log_file:
+        try:
+            with redirect_stdout(log_file), redirect_stderr(log_file):
+                num_samples=main(job['argv'],circuit)
+            result.update({'status':'done','num_samples':int(num_samples),'reused_circuit':circuit['runs']>1})
+        except (Exception,SystemExit):
+            circuit.clear()                                                                                             # The loads and Fault elements of the circuit may not be restored
+            log_file.write(traceback.format_exc())
+            result.update({'status':'failed','error':traceback.format_exc(limit=3)})
+        finally:
+            stop_profiler()
+    result['seconds']=round(time.perf_counter()-start,3)
+    return result
+
+
+def run_batch(jobs,workers,log_folder='batch_logs'):
+    """Run the jobs over a pool of worker processes and return their results in the order they finished
+        - Each worker compiles the feeder of its first job and reuses the compiled circuit and the feeder information for
+          its next jobs of the same feeder (the circuit is compiled again when the feeder changes)
+        - The output of each job is written to log_folder/<name>.log, the progress of the batch is shown instead
+    """
+    os.makedirs(os.path.join(opendss_utils.SCRIPT_PATH,log_folder),exist_ok=True)
+    context=multiprocessing.get_context('spawn')                                                                      # Each worker loads its own OpenDSS library
+    results=[]
+    with ProcessPoolExecutor(max_workers=workers,mp_context=context,initializer=_init_worker,initargs=(opendss_utils.SCRIPT_PATH,)) as executor:
+        futures=[executor.submit(_run_job,job,log_folder) for job in jobs]
+        with tqdm(total=len(jobs),desc="Batch") as progress:
+            for future in as_completed(futures):
+                result=future.result()
+                results.append(result)
+                progress.update(1)
+                if result['status']=='done':
+                    progress.write(f"{result['name']}: {result['num_samples']} samples in {result['seconds']:.1f}s "
+                                   f"(worker {result['worker']}, {'reused' if result['reused_circuit'] else 'compiled'} circuit)")
+                else:
+                    progress.write(f"{result['name']}: failed after {result['seconds']:.1f}s, see {result['log']}")
+    return results
+
+
+def get_batch_report(results,workers,elapsed):
+    job_seconds=sum(result['seconds'] for result in results)
+    return {'workers':workers,
+            'elapsed_seconds':round(elapsed,3),
+            'job_seconds':round(job_seconds,3),                                                                         # Sum of the times of the jobs (the time of a serial batch)
+            'speedup':round(job_seconds/max(elapsed,1e-9),3),
+            'num_samples':sum(result.get('num_samples',0) for result in results),
+            'reused_circuits':sum(result.get('reused_circuit',False) for result in results),
+            'failed_jobs':[result['name'] for result in results if result['status']!='done'],
+            'jobs':results}
+
+
+def print_batch_report(report):
+    print('Batch Summary',color='yellow',format='bold')
+    print('---------------------------------',color='yellow')
+    for result in sorted(report['jobs'],key=lambda result:result['name']):
+        if result['status']=='done':
+            print(f"{result['num_samples']} samples, {result['seconds']:.1f}s, {'reused' if result['reused_circuit'] else 'compiled'} circuit",
+                  tag=result['name'], tag_color='yellow', color='white')
+        else:
+            print(f"failed after {result['seconds']:.1f}s, see {result['log']}", tag=result['name'], tag_color='red', color='white')
+    print(f"{len(report['jobs'])} jobs, {report['num_samples']} samples in {report['elapsed_seconds']:.1f}s with {report['workers']} workers "
+          f"({report['job_seconds']:.1f}s of jobs, speedup {report['speedup']:.2f}), {report['reused_circuits']} reused circuits",
+          tag='Total', tag_color='yellow', color='white')
+    print('')
+
+
+if __name__ == "__main__":
+    batch_args=get_batch_args()
+    config,jobs=load_batch_config(batch_args.config,batch_args.jobs)
+    workers=batch_args.workers or config.get('workers',1)
+    start=time.perf_counter()
+    results=run_batch(jobs,workers,config.get('log_folder','batch_logs'))
+    report=get_batch_report(results,workers,time.perf_counter()-start)
+    with open(batch_args.report,'w') as json_file:
+        json.dump(report,json_file,indent=4)
+    print_batch_report(report)
@@ -0,0 +1,76 @@
+#Imports
+# Python Imports
+import os
+
+# Additional Library Imports
+import numpy as np
+import scipy.sparse as sp
+
+# File the adjacency matrix and the k-hop neighborhoods are saved to, next to edge_list.npy
+TOPOLOGY_FILE='topology.npz'
+
+
+def get_adjacency_matrix(edge_list_by_bus_id,num_buses):
+    """Symmetric adjacency matrix of the feeder (CSR, bool) with the rows and columns ordered by bus id (see bus_id_map)
+       The diagonal is empty, an edge listed in one direction only is added in both directions
+    """
+    edges=np.asarray(edge_list_by_bus_id,dtype=np.int64).reshape(-1,2)
+    edges=edges[edges[:,0]!=edges[:,1]]
+    rows=np.concatenate([edges[:,0],edges[:,1]])
+    cols=np.concatenate([edges[:,1],edges[:,0]])
+    adjacency=sp.csr_matrix((np.ones(len(rows),dtype=bool),(rows,cols)),shape=(num_buses,num_buses))
+    adjacency.sum_duplicates()
+    adjacency.sort_indices()
+    return adjacency
+
+
+def get_k_hop_neighborhoods(adjacency,k):
+    """Buses within k hops of each bus (the bus itself included) for k=1..k, as CSR bool matrices
+       The neighborhoods of k+1 hops are the ones of k hops times (adjacency + identity), with the entries set back to True
+       Returns a list with the matrix of 1 hop first
+    """
+    step=(adjacency+sp.identity(adjacency.shape[0],dtype=bool,format='csr')).astype(bool).tocsr()
+    neighborhoods=[step]
+    for _ in range(1,k):
+        reach=(neighborhoods[-1]@step).tocsr()                                                                          # Boolean product: an entry is set if a path of at most k+1 hops exists
+        reach.data[:]=True
+        reach.sort_indices()
+        neighborhoods.append(reach)
+    return neighborhoods
+
+
+def get_k_hop_buses(edge_list_by_bus_name,k):
+    """Bus names within k hops of each bus (the bus itself included), for the buses of the edge list
+       The buses are keyed in the order they first appear in the edge list and their neighborhoods are listed in the same order
+    """
+    bus_names=list(dict.fromkeys(bus for edge in edge_list_by_bus_name for bus in edge))
+    bus_ids={bus:bus_id for bus_id,bus in enumerate(bus_names)}
+    edge_list_by_bus_id=[(bus_ids[bus1],bus_ids[bus2]) for bus1,bus2 in edge_list_by_bus_name]
+    neighborhoods=get_k_hop_neighborhoods(get_adjacency_matrix(edge_list_by_bus_id,len(bus_names)),k)[-1]
+    return {bus:[bus_names[neighbor] for neighbor in neighborhoods.indices[neighborhoods.indptr[bus_id]:neighborhoods.indptr[bus_id+1]]]
+            for bus_id,bus in enumerate(bus_names)}
+
+
+def save_topology(folder,edge_list_by_bus_id,bus_id_map,k_hops=2):
+    """Store the adjacency matrix and the neighborhoods of 1 to k_hops hops as CSR index arrays in topology.npz
+        - bus_names: bus name of each row (bus id order of bus_id_map)
+        - adjacency_indptr/adjacency_indices: neighbors of bus i are adjacency_indices[adjacency_indptr[i]:adjacency_indptr[i+1]]
+        - hop_<k>_indptr/hop_<k>_indices: buses within k hops of each bus (the bus itself included), same layout
+    """
+    bus_names=sorted(bus_id_map,key=bus_id_map.get)
+    adjacency=get_adjacency_matrix(edge_list_by_bus_id,len(bus_names))
+    arrays={'bus_names':np.array(bus_names,dtype=str),
+            'adjacency_indptr':adjacency.indptr.astype(np.int64),
+            'adjacency_indices':adjacency.indices.astype(np.int64)}
+    for hops,neighborhoods in enumerate(get_k_hop_neighborhoods(adjacency,k_hops),start=1):
+        arrays[f'hop_{hops}_indptr']=neighborhoods.indptr.astype(np.int64)
+        arrays[f'hop_{hops}_indices']=neighborhoods.indices.astype(np.int64)
+    np.savez(os.path.join(folder,TOPOLOGY_FILE),**arrays)
+
+
+def load_csr(topology,name):
+    """CSR bool matrix of the adjacency ('adjacency') or of a neighborhood ('hop_<k>') stored by save_topology
+    """
+    indptr,indices=topology[f'{name}_indptr'],topology[f'{name}_indices']
+    num_buses=len(indptr)-1
+    return sp.csr_matrix((np.ones(len(indices),dtype=bool),indices,indptr),shape=(num_buses,num_buses))
@@ -11,6 +11,15 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.manifold import TSNE
 
+# Local Imports
+from instrumentation import timed
+from normalization import STATISTICS_FILE
+from dataset_shards import export_shards, save_graph
+from sparse_topology import save_topology
+from dataset_append import save_dataset_info
+from checkpoint import save_scenario_plan
+from compact_storage import STORAGE_REPORT_FILE, CastError, get_storage_dtypes, get_storage_report, print_storage_report, save_cast_array
+
 
 def store_feeder_info_to_json(args,infos):
     """Store Feeeder infos in a Json file
@@ -67,6 +76,33 @@ def visualize_tsne(args,dataset,fault_class,savefigure=False):
         plt.savefig(os.path.join('../..',os.path.splitext(args.folder)[0],'tsne_viz.png'))
         
         
+def store_performance_report(args,report):
+    """Store the performance report of the run (see instrumentation.Profiler.report) in the folder of the run
+    """
+    folder_name = os.path.splitext(args.folder)[0]
+    json_path = os.path.join('../..',folder_name,'performance_report.json')
+    with open(json_path, 'w') as json_file:
+        json.dump(report, json_file, indent=4)
+        
+        
+def store_sampling_report(args,report):
+    """Store the coverage of the sampled fault resistances and load values (see sampling.get_sampling_report) in the folder of the run
+    """
+    folder_name = os.path.splitext(args.folder)[0]
+    json_path = os.path.join('../..',folder_name,'sampling_report.json')
+    with open(json_path, 'w') as json_file:
+        json.dump(report, json_file, indent=4)
+
+
+def get_dataset_folder(args,path_to_save='dataset'):
+    """Return the absolute path of the folder the dataset is exported to (created if it doesn't exist)
+       The path is relative to the feeder folder, which is the working directory once the feeder is compiled
+    """
+    dataset_folder=os.path.abspath(os.path.join('../..',args.folder,path_to_save))
+    os.makedirs(dataset_folder, exist_ok=True)
+    return dataset_folder
+
+
 def dataset_export(args,dataset,
                    edge_list_by_bus_id,
                    fault_detection_labels,
@@ -77,25 +113,83 @@ def dataset_export(args,dataset,
                    neighborhood_dict_1_hop_by_bus_name,
                    neighborhood_dict_2_hop_by_bus_name,
                    bus_id_map,
-                   path_to_save='dataset'):
+                   path_to_save='dataset',
+                   statistics=None,
+                   dataset_format='npy',
+                   shard_size=1024,
+                   standardized=True,
+                   feature_dtype='float64',
+                   compact_labels=False,
+                   compression=False,
+                   k_hops=2,
+                   feature_channels=None,
+                   scenarios=None):
+    """Write the dataset, the labels and the graph of the feeder to the dataset folder
+        - npy: dataset.npy and one .npy file per label, the dictionaries are stored as pickled object arrays
+        - sharded: shards of shard_size samples with all the arrays (see dataset_shards.export_shards), manifest.json,
+          edge_list.npy and graph.json (see dataset_shards.save_graph), compressed shards if compression is set
+        - feature_dtype/compact_labels: types the features and labels are stored with (see compact_storage.get_storage_dtypes),
+          the error of the conversions is printed and recorded in manifest.json (sharded) or storage_report.json (npy)
+       The adjacency matrix and the neighborhoods of 1 to k_hops hops are stored as CSR index arrays in topology.npz in both formats
+       (see sparse_topology.save_topology)
+       The scenario table of the samples (scenarios) is stored in scenario_plan.npy and the dataset is described in dataset_info.json
+       (with the names of the feature_channels), so it can be augmented with --append (see dataset_append)
+    """
+    
+    dataset_folder=get_dataset_folder(args,path_to_save)
+    
+    # Per-bus mean and variance of the dataset, stored next to dataset.npy so they can be reused at training time
+    if statistics is not None:
+        statistics.save(dataset_folder)
+    
+    with timed('np_save topology'):
+        save_topology(dataset_folder,edge_list_by_bus_id,bus_id_map,k_hops)
     
-    try:
-        os.mkdir(os.path.join('../..',args.folder,path_to_save))
-    except OSError as error:
-        pass
-   
-    np.save(os.path.join('../..',args.folder,path_to_save,'dataset.npy'), dataset)
-    np.save(os.path.join('../..',args.folder,path_to_save,'edge_list.npy'), edge_list_by_bus_id)
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_detection_labels.npy'), fault_detection_labels)
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_location_labels.npy'), fault_location_labels)
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_class_labels.npy'), fault_class_labels)
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_resistance_labels.npy'), fault_resistance_labels)     
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_currents_labels.npy'), fault_currents_labels)
-    np.save(os.path.join('../..',args.folder,path_to_save,'fault_currents_labels.npy'), fault_currents_labels) 
-    np.save(os.path.join('../..',args.folder,path_to_save,'1_hop_by_bus_name.npy'), neighborhood_dict_1_hop_by_bus_name) 
-    np.save(os.path.join('../..',args.folder,path_to_save,'2_hop_by_bus_name.npy'), neighborhood_dict_2_hop_by_bus_name) 
-    np.save(os.path.join('../..',args.folder,path_to_save,'bus_id_map.npy'), bus_id_map)    
- 
-   
-   
-                  
\ No newline at end of file
+    arrays={'dataset':dataset,
+            'fault_detection_labels':fault_detection_labels,
+            'fault_location_labels':fault_location_labels,
+            'fault_class_labels':fault_class_labels,
+            'fault_resistance_labels':fault_resistance_labels,
+            'fault_currents_labels':fault_currents_labels}
+    storage_dtypes=get_storage_dtypes(arrays,feature_dtype,compact_labels)
+    compact=any(storage_dtypes[name]!=array.dtype for name,array in arrays.items())
+    
+    def save_array(file_name,array,dtype=None,cast_error=None):
+        # Arrays allocated with --output-mode memmap are already stored in their .npy file
+        with timed(f'np_save {file_name}'):
+            if dtype is not None and dtype!=array.dtype:
+                save_cast_array(os.path.join(dataset_folder,file_name),array,dtype,cast_error)
+            elif isinstance(array,np.memmap):
+                array.flush()
+            else:
+                np.save(os.path.join(dataset_folder,file_name), array)
+    
+    if dataset_format=='sharded':
+        manifest=export_shards(dataset_folder,arrays,shard_size,standardized=standardized,
+                               statistics_file=STATISTICS_FILE if statistics is not None else None,
+                               dtypes=storage_dtypes,compressed=compression)
+        with timed('np_save graph'):
+            save_graph(dataset_folder,edge_list_by_bus_id,neighborhood_dict_1_hop_by_bus_name,neighborhood_dict_2_hop_by_bus_name,bus_id_map)
+        if compact:
+            print_storage_report(manifest['storage'])
+    else:
+        cast_errors={name:CastError() for name in arrays}
+        for name,array in arrays.items():
+            save_array(f'{name}.npy', array, storage_dtypes[name], cast_errors[name])
+        save_array('edge_list.npy', edge_list_by_bus_id)
+        save_array('1_hop_by_bus_name.npy', neighborhood_dict_1_hop_by_bus_name) 
+        save_array('2_hop_by_bus_name.npy', neighborhood_dict_2_hop_by_bus_name) 
+        save_array('bus_id_map.npy', bus_id_map)    
+        
+        # Types and conversion errors of the arrays stored with a smaller type
+        if compact:
+            storage_report=get_storage_report(arrays,storage_dtypes,cast_errors)
+            with open(os.path.join(dataset_folder,STORAGE_REPORT_FILE),'w') as json_file:
+                json.dump(storage_report,json_file,indent=4)
+            print_storage_report(storage_report)
+    
+    # Scenario plan and description of the dataset for append mode
+    if scenarios is not None:
+        save_scenario_plan(dataset_folder,scenarios)
+    save_dataset_info(dataset_folder,len(dataset),bus_id_map,dataset_format,standardized,feature_channels)
+